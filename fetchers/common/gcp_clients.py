@@ -0,0 +1,48 @@
+import logging
+import os
+import threading
+
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections per host, enough for the backfill worker pool
+HTTP_POOL_SIZE = int(os.environ.get("GCS_HTTP_POOL_SIZE", 16))
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_storage_client(credentials_path: str | None = None) -> storage.Client:
+    """Get the process-wide storage client, creating it on first use.
+
+    If credentials_path exists (a local service account key) it is used,
+    otherwise the default GCP credentials. Clients are cached per
+    credentials path and safe to share between threads; reusing one keeps
+    its authenticated HTTP session and TLS connections alive between calls.
+    """
+    if credentials_path and not os.path.exists(credentials_path):
+        credentials_path = None
+
+    client = _clients.get(credentials_path)
+    if client is not None:
+        return client
+
+    with _lock:
+        # Another thread may have created it while we waited
+        client = _clients.get(credentials_path)
+        if client is None:
+            if credentials_path:
+                logger.info("Using local service account key")
+                client = storage.Client.from_service_account_json(credentials_path)
+            else:
+                logger.info("Using default GCP credentials")
+                client = storage.Client()
+
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+            )
+            client._http.mount("https://", adapter)
+            _clients[credentials_path] = client
+    return client
@@ -0,0 +1,94 @@
+import gzip
+import json
+import logging
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Serialised records are buffered up to this size before being compressed
+WRITE_BUFFER_SIZE = 64 * 1024
+# Objects written concurrently by upload_ndjson_many
+BATCH_MAX_WORKERS = 8
+
+
+def iter_ndjson_chunks(
+    records: Iterable[dict], buffer_size: int = WRITE_BUFFER_SIZE
+) -> Iterable[bytes]:
+    """Serialise records to NDJSON and yield them in chunks of roughly buffer_size"""
+    buffer = bytearray()
+    for record in records:
+        buffer += json.dumps(record).encode("utf-8")
+        buffer += b"\n"
+        if len(buffer) >= buffer_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def write_ndjson_gz(fileobj, records: Iterable[dict]) -> int:
+    """Stream records as gzip-compressed NDJSON into a binary file object.
+
+    Returns the number of records written.
+    """
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+        for chunk in iter_ndjson_chunks(counted(records)):
+            gz.write(chunk)
+    return count
+
+
+def upload_ndjson(sink, name: str, records: Iterable[dict]) -> int:
+    """Stream records into a sink object as gzip-compressed NDJSON.
+
+    On GCS the object is written through a resumable upload, so memory use
+    is bounded by the chunk size regardless of how many records there are.
+    The object is stored with Content-Encoding: gzip, which GCS
+    transparently decompresses for readers that don't ask for the
+    compressed bytes.
+
+    Returns the number of records written.
+    """
+    with sink.open(name, NDJSON_CONTENT_TYPE, content_encoding="gzip") as writer:
+        count = write_ndjson_gz(writer, records)
+
+    logger.info("Streamed %s records to %s", count, sink.uri(name))
+    return count
+
+
+def upload_ndjson_many(
+    sink,
+    objects: Mapping[str, Iterable[dict]],
+    max_workers: int = BATCH_MAX_WORKERS,
+) -> tuple[dict[str, int], dict[str, str]]:
+    """Write several NDJSON objects concurrently.
+
+    Returns ({name: records written}, {name: error}) so one failed object
+    doesn't hide the others.
+    """
+    written, failed = {}, {}
+    if not objects:
+        return written, failed
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(objects))) as executor:
+        futures = {
+            name: executor.submit(upload_ndjson, sink, name, records)
+            for name, records in objects.items()
+        }
+        for name, future in futures.items():
+            try:
+                written[name] = future.result()
+            except Exception as e:
+                logger.error("Error writing %s: %s", sink.uri(name), e)
+                failed[name] = str(e)
+    return written, failed
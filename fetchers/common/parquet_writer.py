@@ -0,0 +1,57 @@
+import logging
+import os
+from collections.abc import Iterable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+# Write a Parquet copy of the raw data next to the NDJSON files
+PARQUET_ENABLED = os.environ.get("WRITE_PARQUET", "false").lower() == "true"
+PARQUET_COMPRESSION = os.environ.get("PARQUET_COMPRESSION", "zstd")
+
+
+def build_schema(columns: dict[str, str]):
+    """Build an Arrow schema from {column: type alias}, e.g. {"count": "int64"}"""
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet output (pip install pyarrow)")
+    return pa.schema([(name, pa.type_for_alias(alias)) for name, alias in columns.items()])
+
+
+def upload_parquet_partitions(
+    sink,
+    prefix: str,
+    rows: Iterable[dict],
+    columns: dict[str, str],
+    basename: str,
+    partition_column: str = "date",
+) -> list[str]:
+    """Write rows to a sink as one Parquet file per Hive-style dt= partition.
+
+    Rows are grouped by partition_column and written to
+    {prefix}/dt=YYYY-MM-DD/{basename}.parquet with the declared column
+    types, so rewriting the same basename replaces the file. Returns the
+    object names written.
+    """
+    schema = build_schema(columns)
+
+    rows_by_partition = {}
+    for row in rows:
+        rows_by_partition.setdefault(str(row[partition_column]), []).append(row)
+
+    written = []
+    for partition, partition_rows in sorted(rows_by_partition.items()):
+        table = pa.Table.from_pylist(partition_rows, schema=schema)
+        name = f"{prefix}/dt={partition}/{basename}.parquet"
+        with sink.open(name, PARQUET_CONTENT_TYPE) as writer:
+            pq.write_table(table, writer, compression=PARQUET_COMPRESSION)
+        written.append(name)
+
+    logger.info("Wrote %s Parquet partitions under %s/", len(written), prefix)
+    return written
@@ -0,0 +1,201 @@
+import abc
+import gzip
+import io
+import logging
+import os
+import threading
+
+from gcp_clients import get_storage_client
+from google.api_core.exceptions import NotFound
+
+logger = logging.getLogger(__name__)
+
+# Which sink get_sink() returns: gcs, local or memory
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "gcs")
+# Root directory of the local sink, one subdirectory per bucket
+STORAGE_LOCAL_DIR = os.environ.get("STORAGE_LOCAL_DIR", "local_storage")
+# Resumable upload chunk size, must be a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class Sink(abc.ABC):
+    """Object storage the fetchers write to.
+
+    Objects are addressed by name within the sink (e.g. "raw/file.json").
+    Data is written through a binary file object returned by open(); bytes
+    written to it are stored as-is, already encoded when content_encoding
+    is set. read() returns the decoded bytes, like GCS does for
+    gzip-encoded objects.
+    """
+
+    @abc.abstractmethod
+    def open(self, name: str, content_type: str, content_encoding: str | None = None):
+        """Binary file object that stores the object when closed"""
+
+    @abc.abstractmethod
+    def read(self, name: str) -> bytes | None:
+        """Decoded object contents, or None if the object doesn't exist"""
+
+    @abc.abstractmethod
+    def uri(self, name: str) -> str:
+        """URI of an object, for logging"""
+
+    def write(
+        self,
+        name: str,
+        data: bytes,
+        content_type: str,
+        content_encoding: str | None = None,
+    ) -> None:
+        """Store a whole object at once"""
+        with self.open(name, content_type, content_encoding) as writer:
+            writer.write(data)
+
+
+class GCSSink(Sink):
+    """Sink backed by a Cloud Storage bucket"""
+
+    def __init__(self, bucket_name: str, credentials_path: str | None = None):
+        self.bucket = get_storage_client(credentials_path).bucket(bucket_name)
+
+    def open(self, name, content_type, content_encoding=None):
+        blob = self.bucket.blob(name)
+        blob.content_encoding = content_encoding
+        # Resumable upload: memory is bounded by the chunk size
+        return blob.open(
+            "wb",
+            content_type=content_type,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            ignore_flush=True,
+        )
+
+    def read(self, name):
+        try:
+            # GCS decompresses gzip-encoded objects on download
+            return self.bucket.blob(name).download_as_bytes()
+        except NotFound:
+            return None
+
+    def uri(self, name):
+        return f"gs://{self.bucket.name}/{name}"
+
+
+class _AtomicFile(io.FileIO):
+    """File written under a temporary name and renamed into place on close"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        super().__init__(self._tmp_path, "wb")
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            os.replace(self._tmp_path, self._path)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # Don't replace a good object with a partial one
+            super().close()
+            os.remove(self._tmp_path)
+            return False
+        return super().__exit__(exc_type, exc, tb)
+
+
+class LocalSink(Sink):
+    """Sink backed by a local directory, for offline runs and benchmarks"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def open(self, name, content_type, content_encoding=None):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _AtomicFile(path)
+
+    def read(self, name):
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # Objects don't carry metadata on disk; gzip data is recognised by its magic bytes
+        if data[:2] == b"\x1f\x8b":
+            data = gzip.decompress(data)
+        return data
+
+    def uri(self, name):
+        return f"file://{os.path.abspath(self._path(name))}"
+
+
+class _MemoryFile(io.BytesIO):
+    """Buffer that stores its contents in a MemorySink when closed"""
+
+    def __init__(self, sink, name, content_type, content_encoding):
+        super().__init__()
+        self._sink = sink
+        self._name = name
+        self._content_type = content_type
+        self._content_encoding = content_encoding
+
+    def close(self):
+        if not self.closed:
+            self._sink.objects[self._name] = (
+                self.getvalue(),
+                self._content_type,
+                self._content_encoding,
+            )
+        super().close()
+
+
+class MemorySink(Sink):
+    """Sink that keeps objects in a dict, for tests and synthetic load runs"""
+
+    def __init__(self, name: str = "memory"):
+        self.name = name
+        # name -> (stored bytes, content type, content encoding)
+        self.objects = {}
+
+    def open(self, name, content_type, content_encoding=None):
+        return _MemoryFile(self, name, content_type, content_encoding)
+
+    def read(self, name):
+        if name not in self.objects:
+            return None
+        data, _, content_encoding = self.objects[name]
+        return gzip.decompress(data) if content_encoding == "gzip" else data
+
+    def uri(self, name):
+        return f"memory://{self.name}/{name}"
+
+
+_sinks = {}
+_lock = threading.Lock()
+
+
+def get_sink(bucket_name: str, credentials_path: str | None = None) -> Sink:
+    """Get the process-wide sink for a bucket, using the STORAGE_BACKEND setting.
+
+    - gcs: the Cloud Storage bucket itself
+    - local: STORAGE_LOCAL_DIR/<bucket_name>/
+    - memory: an in-process MemorySink per bucket name
+    """
+    with _lock:
+        sink = _sinks.get(bucket_name)
+        if sink is None:
+            if STORAGE_BACKEND == "gcs":
+                sink = GCSSink(bucket_name, credentials_path)
+            elif STORAGE_BACKEND == "local":
+                sink = LocalSink(os.path.join(STORAGE_LOCAL_DIR, bucket_name))
+            elif STORAGE_BACKEND == "memory":
+                sink = MemorySink(bucket_name)
+            else:
+                raise ValueError(
+                    f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected gcs, local or memory"
+                )
+            logger.info("Using %s sink for %s", STORAGE_BACKEND, bucket_name)
+            _sinks[bucket_name] = sink
+    return sink
@@ -0,0 +1,54 @@
+import gzip
+
+import pytest
+from sinks import LocalSink, MemorySink, Sink
+
+
+class OpenOnlySink(Sink):
+    def open(self, name, content_type, content_encoding=None):
+        raise OSError(f"cannot open {name}")
+
+
+class UnwritableSink(OpenOnlySink):
+    def read(self, name):
+        return None
+
+    def uri(self, name):
+        return f"memory://{name}"
+
+
+def test_sink_needs_every_method():
+    with pytest.raises(TypeError, match="read"):
+        OpenOnlySink()
+
+
+def test_write_goes_through_open():
+    with pytest.raises(OSError, match="cannot open raw/day.json"):
+        UnwritableSink().write("raw/day.json", b"{}", "application/json")
+
+
+@pytest.fixture(params=["memory", "local"])
+def sink(request, tmp_path):
+    return MemorySink() if request.param == "memory" else LocalSink(str(tmp_path))
+
+
+def test_round_trip(sink):
+    sink.write("raw/plain.json", b"{}\n", "application/json")
+    sink.write("raw/packed.json", gzip.compress(b"{}\n"), "application/json", "gzip")
+
+    assert sink.read("raw/plain.json") == b"{}\n"
+    assert sink.read("raw/packed.json") == b"{}\n"
+    assert sink.read("raw/missing.json") is None
+
+
+def test_local_sink_keeps_the_old_object_when_a_write_fails(tmp_path):
+    sink = LocalSink(str(tmp_path))
+    sink.write("raw/day.json", b"old", "application/json")
+
+    with pytest.raises(RuntimeError):
+        with sink.open("raw/day.json", "application/json") as writer:
+            writer.write(b"partial")
+            raise RuntimeError("upload interrupted")
+
+    assert sink.read("raw/day.json") == b"old"
+    assert [path.name for path in (tmp_path / "raw").iterdir()] == ["day.json"]
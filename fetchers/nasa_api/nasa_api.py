@@ -1,12 +1,22 @@
+import argparse
 import json
 import logging
 import os
-from datetime import date, datetime, timedelta, timezone
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta, timezone
 
 import requests
 from dotenv import load_dotenv
-from flask import Flask, jsonify
-from google.cloud import storage
+from flask import Flask, jsonify, request
+from urllib3.util.retry import Retry
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+
+from ndjson_writer import upload_ndjson_many
+from parquet_writer import PARQUET_ENABLED, upload_parquet_partitions
+from sinks import get_sink
 
 # Configure logging
 logging.basicConfig(
@@ -23,37 +33,286 @@ app = Flask(__name__)
 # Stockholm timezone (UTC+1 in winter, UTC+2 in summer)
 stockholm_tz = timezone(timedelta(hours=1))
 
-TODAY = date.today().strftime("%Y-%m-%d")
-YESTERDAY = (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
-NOW = datetime.now()
 API_KEY = os.environ.get("NASA_API")
 
+BUCKET_NAME = "nasa_api_bucket"
+FEED_URL = "https://api.nasa.gov/neo/rest/v1/feed"
+# The NeoWs feed endpoint rejects ranges longer than 7 days
+FEED_WINDOW_DAYS = 7
+BACKFILL_MAX_WORKERS = int(os.environ.get("BACKFILL_MAX_WORKERS", 4))
 
-@app.route("/")
-def home():
-    """Collect NASA Data"""
+# Local cache of past days' feed data, so retries and backfills don't spend
+# API quota on days we already hold
+CACHE_DIR = os.environ.get("NASA_CACHE_DIR", ".cache/nasa_feed")
+
+
+def create_session() -> requests.Session:
+    """Keep-alive session that retries 429/5xx with exponential backoff"""
+    retry = Retry(
+        total=5,
+        backoff_factor=1,  # 1s, 2s, 4s, ...
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max(BACKFILL_MAX_WORKERS, 10),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared session for NeoWs requests, sized for the backfill pool
+session = create_session()
+
+
+def yesterday() -> date:
+    """Yesterday's date, evaluated per call so long-lived containers don't go stale"""
+    return date.today() - timedelta(days=1)
+
+
+def cache_path(day: date) -> str:
+    """Path of the cache file for one day"""
+    return os.path.join(CACHE_DIR, f"{day.strftime('%Y-%m-%d')}.json")
+
+
+def read_cached_day(day: date) -> list[dict] | None:
+    """Cached feed objects for one day, or None if not cached"""
+    try:
+        with open(cache_path(day)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable cache entry for %s: %s", day, e)
+        return None
+
+
+def write_cached_day(day: date, objects: list[dict]) -> None:
+    """Cache one day's feed objects; only days before today are immutable"""
+    if day >= date.today():
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write then rename, so concurrent workers never see a partial file
+        tmp_path = f"{cache_path(day)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(objects, f)
+        os.replace(tmp_path, cache_path(day))
+    except OSError as e:
+        logger.warning("Could not cache feed data for %s: %s", day, e)
+
+
+# Typed columns for the flattened Parquet copy of the raw data
+NEO_COLUMNS = {
+    "date": "date32",
+    "id": "string",
+    "name": "string",
+    "absolute_magnitude_h": "float64",
+    "estimated_diameter_min_km": "float64",
+    "estimated_diameter_max_km": "float64",
+    "estimated_diameter_min_m": "float64",
+    "estimated_diameter_max_m": "float64",
+    "is_potentially_hazardous_asteroid": "bool",
+    "is_sentry_object": "bool",
+    "close_approach_epoch_ms": "int64",
+    "relative_velocity_kph": "float64",
+    "relative_velocity_kps": "float64",
+    "miss_distance_km": "float64",
+    "miss_distance_lunar": "float64",
+    "miss_distance_au": "float64",
+    "orbiting_body": "string",
+}
+
+
+def flatten_neo(obj: dict) -> dict:
+    """Flatten one NeoWs object into the typed NEO_COLUMNS fields"""
+    diameter = obj.get("estimated_diameter", {})
+    diameter_km = diameter.get("kilometers", {})
+    diameter_m = diameter.get("meters", {})
+
+    # The feed lists the approach on the requested date; fall back to the first
+    approaches = obj.get("close_approach_data") or [{}]
+    approach = next(
+        (a for a in approaches if a.get("close_approach_date") == obj["date"]),
+        approaches[0],
+    )
+    velocity = approach.get("relative_velocity", {})
+    miss_distance = approach.get("miss_distance", {})
+
+    def to_float(value):
+        return float(value) if value is not None else None
+
+    return {
+        "date": date.fromisoformat(obj["date"]),
+        "id": obj.get("id"),
+        "name": obj.get("name"),
+        "absolute_magnitude_h": to_float(obj.get("absolute_magnitude_h")),
+        "estimated_diameter_min_km": to_float(diameter_km.get("estimated_diameter_min")),
+        "estimated_diameter_max_km": to_float(diameter_km.get("estimated_diameter_max")),
+        "estimated_diameter_min_m": to_float(diameter_m.get("estimated_diameter_min")),
+        "estimated_diameter_max_m": to_float(diameter_m.get("estimated_diameter_max")),
+        "is_potentially_hazardous_asteroid": obj.get(
+            "is_potentially_hazardous_asteroid"
+        ),
+        "is_sentry_object": obj.get("is_sentry_object"),
+        "close_approach_epoch_ms": approach.get("epoch_date_close_approach"),
+        "relative_velocity_kph": to_float(velocity.get("kilometers_per_hour")),
+        "relative_velocity_kps": to_float(velocity.get("kilometers_per_second")),
+        "miss_distance_km": to_float(miss_distance.get("kilometers")),
+        "miss_distance_lunar": to_float(miss_distance.get("lunar")),
+        "miss_distance_au": to_float(miss_distance.get("astronomical")),
+        "orbiting_body": approach.get("orbiting_body"),
+    }
+
+
+def fetch_feed(
+    start_date: date, end_date: date, use_cache: bool = True
+) -> dict[str, list[dict]]:
+    """Fetch the NeoWs feed for a date range, keyed by date.
+
+    Past days are served from the local cache when every day in the range
+    is cached; otherwise the whole range is requested and cached.
+    """
+    days = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+
+    if use_cache:
+        cached = {day.strftime("%Y-%m-%d"): read_cached_day(day) for day in days}
+        if all(objects is not None for objects in cached.values()):
+            logger.info("Serving %s to %s from cache", start_date, end_date)
+            return cached
 
-    url = "https://api.nasa.gov/neo/rest/v1/feed"
     params = {
-        "start_date": YESTERDAY,
-        "end_date": YESTERDAY,
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "end_date": end_date.strftime("%Y-%m-%d"),
         "api_key": API_KEY,
     }
+    response = session.get(FEED_URL, params=params, timeout=30)
+    response.raise_for_status()
 
-    try:
-        logger.info("Fetching data from NASA")
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+    # Unpack the topmost dict
+    near_earth_objects_by_date = response.json().get("near_earth_objects", {})
+
+    for date_key, objects in near_earth_objects_by_date.items():
+        for obj in objects:
+            obj["date"] = date_key  # Adds date back in
+
+    if use_cache:
+        for day in days:
+            write_cached_day(
+                day, near_earth_objects_by_date.get(day.strftime("%Y-%m-%d"), [])
+            )
+    return near_earth_objects_by_date
 
-        data = response.json()
-        # Unpack the topmost dict
-        near_earth_objects_by_date = data.get("near_earth_objects", {})
 
-        todays_space_rocks = []
-        for date_key, objects in near_earth_objects_by_date.items():
-            for obj in objects:
-                obj["date"] = date_key  # Adds date back in
-                todays_space_rocks.append(obj)
+def feed_windows(
+    start_date: date, end_date: date, window_days: int = FEED_WINDOW_DAYS
+) -> list[tuple[date, date]]:
+    """Split an inclusive date range into consecutive feed-sized windows"""
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days - 1), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+
+def raw_filename(data_date: date) -> str:
+    """Name of the raw file holding one day of data.
+
+    The daily run fetches yesterday's data and names the file after the run
+    date, so a backfilled day gets the name its daily run would have used.
+    """
+    run_date = data_date + timedelta(days=1)
+    return f"nasa_raw_data{run_date.strftime('%Y%m%d')}.json"
+
+
+def backfill_window(window_start: date, window_end: date) -> tuple[list, list, list]:
+    """Fetch one feed window and upload one file per day in it"""
+    objects_by_date = fetch_feed(window_start, window_end)
+
+    # Write every day in the window, including days with no objects
+    objects_by_day = {}
+    day = window_start
+    while day <= window_end:
+        objects_by_day[day] = objects_by_date.get(day.strftime("%Y-%m-%d"), [])
+        day += timedelta(days=1)
+    return upload_days(objects_by_day)
+
+
+def backfill(
+    start_date: date, end_date: date, max_workers: int = BACKFILL_MAX_WORKERS
+) -> dict:
+    """Backfill a date range by running feed windows on a bounded worker pool"""
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+
+    windows = feed_windows(start_date, end_date)
+    logger.info(
+        "Backfilling %s to %s in %s windows with %s workers",
+        start_date,
+        end_date,
+        len(windows),
+        max_workers,
+    )
+
+    uploaded_days, failed_days, parquet_failed_days, failed_windows = [], [], [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(backfill_window, window_start, window_end): (
+                window_start,
+                window_end,
+            )
+            for window_start, window_end in windows
+        }
+        for future in as_completed(futures):
+            window_start, window_end = futures[future]
+            try:
+                uploaded, failed, parquet_failed = future.result()
+            except requests.RequestException as e:
+                logger.error(
+                    "Failed to fetch %s to %s: %s", window_start, window_end, e
+                )
+                failed_windows.append(f"{window_start}/{window_end}")
+                continue
+            uploaded_days.extend(uploaded)
+            failed_days.extend(failed)
+            parquet_failed_days.extend(parquet_failed)
+
+    logger.info(
+        "Backfill done: %s days uploaded, %s days failed, "
+        "%s days without Parquet copy, %s windows failed",
+        len(uploaded_days),
+        len(failed_days),
+        len(parquet_failed_days),
+        len(failed_windows),
+    )
+    return {
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "end_date": end_date.strftime("%Y-%m-%d"),
+        "uploaded_days": sorted(uploaded_days),
+        "failed_days": sorted(failed_days),
+        "parquet_failed_days": sorted(parquet_failed_days),
+        "failed_windows": sorted(failed_windows),
+    }
+
+
+def collect() -> dict:
+    """Fetch yesterday's NASA data and upload it to storage"""
+    day = yesterday()
+
+    todays_space_rocks = []
+    try:
+        logger.info("Fetching data from NASA")
+        for objects in fetch_feed(day, day).values():
+            todays_space_rocks.extend(objects)
 
         logger.info(
             "Successfully fetched information about %s space rocks",
@@ -61,19 +320,55 @@ def home():
         )
     except requests.RequestException as e:
         logger.error("Houston, we have a problem: %s", e)
+        # Don't overwrite the day's file with an empty one
+        return {"error": str(e), "data": [], "upload_status": "failed"}
 
-    # Upload to GCS with date-based filename (overwrites previous day's file)
-    date_str = datetime.now().strftime("%Y%m%d")
-    filename = f"nasa_raw_data{date_str}.json"
-    upload_success = upload_to_gcs(todays_space_rocks, filename)
+    # Upload with date-based filename (overwrites previous day's file)
+    _, failed, parquet_failed = upload_days({day: todays_space_rocks})
+    upload_success = not failed
 
     # Add upload status to response
-    response_data = {
+    response = {
         "data": todays_space_rocks,
         "upload_status": "success" if upload_success else "failed",
     }
+    if PARQUET_ENABLED:
+        response["parquet_status"] = "failed" if parquet_failed else "success"
+    return response
 
-    return jsonify(response_data)
+
+@app.route("/")
+def home():
+    """Collect NASA Data"""
+    return jsonify(collect())
+
+
+@app.route("/backfill")
+def backfill_route():
+    """Backfill NASA data for ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD"""
+    try:
+        start_date = date.fromisoformat(request.args["start_date"])
+        end_date = (
+            date.fromisoformat(request.args["end_date"])
+            if "end_date" in request.args
+            else yesterday()
+        )
+        max_workers = int(request.args.get("max_workers", BACKFILL_MAX_WORKERS))
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid backfill parameters: {e}"}), 400
+
+    try:
+        result = backfill(start_date, end_date, max_workers=max_workers)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    failed = (
+        result["failed_days"]
+        or result["parquet_failed_days"]
+        or result["failed_windows"]
+    )
+    status = 207 if failed else 200
+    return jsonify(result), status
 
 
 @app.route("/health")
@@ -81,42 +376,75 @@ def health():
     return {"status": "ok"}
 
 
-def upload_to_gcs(data: list[dict], filename: str) -> bool:
-    """Upload data to Google Cloud Storage as NDJSON"""
-    try:
-        # Only set service account key if running locally (file exists)
-        # On GCP, use default credentials
-        if os.path.exists("credentials.json"):
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "credentials.json"
-            logger.info("Using local service account key")
-        else:
-            logger.info("Using default GCP credentials")
+def upload_days(objects_by_day: dict[date, list[dict]]) -> tuple[list, list, list]:
+    """Upload one gzip-compressed NDJSON file per day, concurrently.
 
-        client = storage.Client()
-        bucket = client.bucket("nasa_api_bucket")
+    Returns the days uploaded, the days that failed and the uploaded days
+    whose optional Parquet copy failed, as YYYY-MM-DD. The NDJSON file is
+    the source of truth, so a day only fails when its NDJSON upload does.
+    """
+    # Local service account key if present, default GCP credentials otherwise
+    sink = get_sink(BUCKET_NAME, "credentials.json")
 
-        # Create blob with filename in /raw folder
-        blob = bucket.blob(f"raw/{filename}")
+    # Create one object per day in the /raw folder
+    files = {f"raw/{raw_filename(day)}": day for day in objects_by_day}
+    written, failed = upload_ndjson_many(
+        sink, {name: objects_by_day[day] for name, day in files.items()}
+    )
+    failed_days = {files[name] for name in failed}
+    parquet_failed_days = set()
 
-        # Convert to NDJSON format
-        ndjson_data = "\n".join(json.dumps(item) for item in data) + "\n"
+    # Optional typed, date-partitioned copy for column-selective reads
+    if PARQUET_ENABLED:
+        try:
+            upload_parquet_partitions(
+                sink,
+                "parquet",
+                (
+                    flatten_neo(obj)
+                    for day, objects in objects_by_day.items()
+                    if day not in failed_days
+                    for obj in objects
+                ),
+                NEO_COLUMNS,
+                basename="neo",
+            )
+        except Exception as e:
+            logger.error("Error writing Parquet: %s", e)
+            parquet_failed_days = set(objects_by_day) - failed_days
 
-        # Upload NDJSON data
-        blob.upload_from_string(ndjson_data, content_type="application/x-ndjson")
+    logger.info("Uploaded %s files to %s", len(written), sink.uri("raw/"))
+    return (
+        sorted(d.strftime("%Y-%m-%d") for d in objects_by_day if d not in failed_days),
+        sorted(d.strftime("%Y-%m-%d") for d in failed_days),
+        sorted(d.strftime("%Y-%m-%d") for d in parquet_failed_days),
+    )
 
-        logger.info(
-            "Successfully uploaded %s to GCS bucket: nasa_api_bucket/raw/", filename
-        )
-        return True
-    except Exception as e:
-        logger.error("Error uploading to GCS: %s", e)
-        import traceback
 
-        logger.error("Traceback: %s", traceback.format_exc())
-        return False
+def main():
+    parser = argparse.ArgumentParser(description="NASA NeoWs fetcher")
+    subparsers = parser.add_subparsers(dest="command")
 
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Fetch and upload a range of past days"
+    )
+    backfill_parser.add_argument("start_date", type=date.fromisoformat)
+    backfill_parser.add_argument(
+        "end_date", type=date.fromisoformat, nargs="?", default=yesterday()
+    )
+    backfill_parser.add_argument(
+        "--max-workers", type=int, default=BACKFILL_MAX_WORKERS
+    )
 
+    args = parser.parse_args()
+    if args.command == "backfill":
+        result = backfill(args.start_date, args.end_date, args.max_workers)
+        print(json.dumps(result, indent=2))
+        return
 
-if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
     app.run(host="0.0.0.0", port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from datetime import date
+
+import nasa_api
+import pytest
+from sinks import MemorySink
+
+
+class FailingSink(MemorySink):
+    """MemorySink that refuses to store some objects"""
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = failing
+
+    def open(self, name, content_type, content_encoding=None):
+        if name in self.failing:
+            raise OSError(f"cannot write {name}")
+        return super().open(name, content_type, content_encoding)
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = FailingSink({f"raw/{nasa_api.raw_filename(date(2024, 1, 2))}"})
+    monkeypatch.setattr(nasa_api, "get_sink", lambda *args: sink)
+    return sink
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (date(2024, 1, 1), date(2024, 1, 1), [(date(2024, 1, 1), date(2024, 1, 1))]),
+        (date(2024, 1, 1), date(2024, 1, 7), [(date(2024, 1, 1), date(2024, 1, 7))]),
+        (
+            date(2024, 1, 1),
+            date(2024, 1, 15),
+            [
+                (date(2024, 1, 1), date(2024, 1, 7)),
+                (date(2024, 1, 8), date(2024, 1, 14)),
+                (date(2024, 1, 15), date(2024, 1, 15)),
+            ],
+        ),
+        # Across a month and a leap day
+        (
+            date(2024, 2, 25),
+            date(2024, 3, 5),
+            [
+                (date(2024, 2, 25), date(2024, 3, 2)),
+                (date(2024, 3, 3), date(2024, 3, 5)),
+            ],
+        ),
+    ],
+)
+def test_feed_windows(start, end, expected):
+    assert nasa_api.feed_windows(start, end) == expected
+
+
+def test_feed_windows_cover_every_day_once():
+    start, end = date(2023, 12, 20), date(2024, 3, 10)
+    windows = nasa_api.feed_windows(start, end, window_days=5)
+
+    assert windows[0][0] == start and windows[-1][1] == end
+    assert all((b - a).days < 5 for a, b in windows)
+    # Each window starts the day after the previous one ends
+    assert all((nxt[0] - prev[1]).days == 1 for prev, nxt in zip(windows, windows[1:]))
+
+
+def test_feed_windows_empty_range():
+    assert nasa_api.feed_windows(date(2024, 1, 2), date(2024, 1, 1)) == []
+
+
+def test_raw_filename_is_named_after_the_daily_run():
+    assert nasa_api.raw_filename(date(2024, 12, 31)) == "nasa_raw_data20250101.json"
+
+
+DAYS = {date(2024, 1, 1): [], date(2024, 1, 2): [], date(2024, 1, 3): []}
+
+
+def test_upload_days_reports_failed_files(sink):
+    assert nasa_api.upload_days(DAYS) == (
+        ["2024-01-01", "2024-01-03"],
+        ["2024-01-02"],
+        [],
+    )
+    assert sorted(sink.objects) == [
+        "raw/nasa_raw_data20240102.json",
+        "raw/nasa_raw_data20240104.json",
+    ]
+
+
+def test_parquet_failure_keeps_the_uploaded_days(sink, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("parquet down")
+
+    monkeypatch.setattr(nasa_api, "PARQUET_ENABLED", True)
+    monkeypatch.setattr(nasa_api, "upload_parquet_partitions", fail)
+
+    assert nasa_api.upload_days(DAYS) == (
+        ["2024-01-01", "2024-01-03"],
+        ["2024-01-02"],
+        ["2024-01-01", "2024-01-03"],
+    )
+
+
+def test_backfill_reports_parquet_failures_separately(sink, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("parquet down")
+
+    monkeypatch.setattr(nasa_api, "PARQUET_ENABLED", True)
+    monkeypatch.setattr(nasa_api, "upload_parquet_partitions", fail)
+    monkeypatch.setattr(nasa_api, "fetch_feed", lambda start, end: {})
+
+    result = nasa_api.backfill(date(2024, 1, 1), date(2024, 1, 10), max_workers=2)
+    assert result["failed_days"] == ["2024-01-02"]
+    assert len(result["uploaded_days"]) == len(result["parquet_failed_days"]) == 9
+    assert result["failed_windows"] == []
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+from flask import Flask, jsonify
+
+# Make the fetchers and their shared modules importable
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "nasa_api"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "reddit_api"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "twitter_api"))
+
+import nasa_api
+import reddit_api
+import twitter_api
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Initialize Flask app
+app = Flask(__name__)
+
+# Fetch routines run by the orchestrator, by source name
+SOURCES = {
+    "nasa": nasa_api.collect,
+    "reddit": reddit_api.collect,
+    "twitter": twitter_api.collect,
+}
+# Seconds each source may take before it is reported as timed out
+SOURCE_TIMEOUT = float(os.environ.get("SOURCE_TIMEOUT", 300))
+
+
+def run_source(name: str, collect) -> dict:
+    """Run one fetch routine and summarise its result"""
+    started = time.perf_counter()
+    try:
+        result = collect()
+        if result.get("error"):
+            status, error = "failed", result["error"]
+        elif result.get("upload_status") != "success":
+            status, error = "failed", "upload failed"
+        else:
+            status, error = "success", None
+        records = len(result.get("data", []))
+    except Exception as e:
+        logger.exception("Source %s raised", name)
+        status, error, records = "failed", str(e), 0
+
+    return {
+        "status": status,
+        "error": error,
+        "records": records,
+        "wall_time_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_all(sources: dict = SOURCES, timeout: float = SOURCE_TIMEOUT) -> dict:
+    """Run all sources concurrently and return a combined status report.
+
+    Every source gets the same deadline, measured from the start of the run,
+    so total latency is that of the slowest source (capped at the timeout)
+    rather than the sum. A source that misses the deadline is reported as
+    timed out; its thread is left to finish in the background.
+    """
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(sources))
+    futures = {
+        name: executor.submit(run_source, name, collect)
+        for name, collect in sources.items()
+    }
+    wait(futures.values(), timeout=timeout)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    report = {}
+    for name, future in futures.items():
+        if future.done():
+            report[name] = future.result()
+        else:
+            logger.error("Source %s timed out after %ss", name, timeout)
+            report[name] = {
+                "status": "timeout",
+                "error": f"timed out after {timeout}s",
+                "records": 0,
+                "wall_time_seconds": round(time.perf_counter() - started, 3),
+            }
+
+    return {
+        "status": "success"
+        if all(r["status"] == "success" for r in report.values())
+        else "failed",
+        "wall_time_seconds": round(time.perf_counter() - started, 3),
+        "sources": report,
+    }
+
+
+@app.route("/")
+def home():
+    """Run all fetchers concurrently"""
+    report = run_all()
+    status_code = 200 if report["status"] == "success" else 500
+    return jsonify(report), status_code
+
+
+@app.route("/health")
+def health():
+    return {"status": "ok"}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "run":
+        report = run_all()
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["status"] == "success" else 1)
+
+    port = int(os.environ.get("PORT", 8080))
+    app.run(host="0.0.0.0", port=port)
+
+
+if __name__ == "__main__":
+    main()
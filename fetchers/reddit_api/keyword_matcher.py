@@ -0,0 +1,63 @@
+import re
+from collections import Counter
+
+
+class KeywordMatcher:
+    """Count keyword occurrences in one pass over each text.
+
+    All keywords are compiled into a single regex shaped like a trie of the
+    keywords, so each position is checked character by character rather
+    than against every keyword in turn. Matching is case insensitive and on
+    substrings, like `keyword in text.lower()`, so "ufo" also matches "ufos".
+
+    The pattern is a zero-width lookahead, so it is tried at every position
+    of the text and finds overlapping matches. At each position the regex
+    reports the longest keyword starting there; any shorter keywords that
+    are prefixes of it (e.g. "alien" for "aliens") are counted as well, so
+    the counts are the same as searching for each keyword separately.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({k.lower() for k in keywords if k})
+        if not self.keywords:
+            raise ValueError("KeywordMatcher needs at least one keyword")
+
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._pattern = re.compile(f"(?=({_trie_pattern(trie)}))")
+
+        # For each keyword, every keyword that is a prefix of it (itself included)
+        self._prefixes = {
+            k: [p for p in self.keywords if k.startswith(p)] for k in self.keywords
+        }
+
+    def count(self, *texts):
+        """Return a Counter of keyword occurrences across the given texts"""
+        counts = Counter()
+        for text in texts:
+            if not text:
+                continue
+            for match in self._pattern.finditer(text.lower()):
+                counts.update(self._prefixes[match.group(1)])
+        return counts
+
+
+def _trie_pattern(node):
+    """Build a regex from a trie, preferring the longest match"""
+    terminal = "" in node
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Optional (greedy) continuation when a keyword also ends here
+    if terminal:
+        pattern = f"(?:{pattern})?"
+    return pattern
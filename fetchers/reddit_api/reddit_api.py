@@ -1,12 +1,20 @@
 import json
 import logging
 import os
-from datetime import datetime, timedelta, timezone
+import sys
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
 
 import praw
 from dotenv import load_dotenv
-from flask import Flask, jsonify
-from google.cloud import storage
+from flask import Flask, jsonify, request
+from keyword_matcher import KeywordMatcher
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+
+from ndjson_writer import upload_ndjson_many
+from parquet_writer import PARQUET_ENABLED, upload_parquet_partitions
+from sinks import get_sink
 
 # Configure logging
 logging.basicConfig(
@@ -34,45 +42,140 @@ reddit = praw.Reddit(
     user_agent=user_agent
 ) if (client_id and client_secret) else None
 
-@app.route("/")
-def home():
-    """Show reddit data as JSON"""
+BUCKET_NAME = "reddit_api_bucket"
+CHECKPOINT_BLOB = "state/checkpoint.json"
+# Counts of every post already counted, one object per post date
+POSTS_PREFIX = "state/posts/"
+# How far back to crawl when there is no checkpoint, or the checkpoint is older
+DEFAULT_LOOKBACK_HOURS = int(os.environ.get("REDDIT_LOOKBACK_HOURS", 24))
+
+# Typed columns for the Parquet copy of the raw data
+PARQUET_COLUMNS = {
+    "date": "date32",
+    "count": "int64",
+    "extraction_date": "date32",
+}
+
+# Keywords to look for, comma separated
+KEYWORDS = [
+    k.strip()
+    for k in os.environ.get("REDDIT_KEYWORDS", "sighting,ufo,alien,encounter").split(",")
+    if k.strip()
+]
+keyword_matcher = KeywordMatcher(KEYWORDS)
+# Scanning comments costs one extra API request per post
+SCAN_COMMENTS = os.environ.get("REDDIT_SCAN_COMMENTS", "false").lower() == "true"
+
+
+def get_storage():
+    """Get the sink for the Reddit bucket"""
+    # Local service account key if present, default GCP credentials otherwise
+    return get_sink(BUCKET_NAME, 'keys/key.json')
+
+
+def load_checkpoint():
+    """Load the high-water mark (newest seen post), or None"""
+    data = get_storage().read(CHECKPOINT_BLOB)
+    if data is None:
+        logger.info("No checkpoint found, crawling the full lookback window")
+        return None
+    checkpoint = json.loads(data)
+    logger.info(f"Loaded checkpoint {checkpoint['fullname']} ({checkpoint['created_utc']})")
+    return checkpoint
+
+
+def save_checkpoint(checkpoint):
+    """Persist the high-water mark"""
+    get_storage().write(CHECKPOINT_BLOB, json.dumps(checkpoint).encode(), 'application/json')
+    logger.info(f"Saved checkpoint {checkpoint['fullname']} ({checkpoint['created_utc']})")
+
+
+def raw_filename(date_str):
+    """Name of the raw file holding one day's counts"""
+    return f"reddit_raw_data_{date_str.replace('-', '')}.json"
+
+
+def day_record(date_str, post_counts, extraction_date):
+    """Raw record of a day from the counts of its posts"""
+    keyword_totals = Counter()
+    for counts in post_counts.values():
+        keyword_totals.update(counts["keyword_counts"])
+    return {
+        "date": date_str,
+        "count": sum(counts["count"] for counts in post_counts.values()),
+        "keyword_counts": [
+            {"keyword": k, "count": keyword_totals[k]}
+            for k in keyword_matcher.keywords
+        ],
+        "extraction_date": extraction_date,
+        "query": KEYWORDS
+    }
+
+
+def crawl_new_posts(subreddit, since_utc, checkpoint=None):
+    """Walk the subreddit's newest posts back to since_utc or the checkpoint.
+
+    Returns the unseen posts (newest first) and whether the crawl reached
+    its boundary. Reddit listings stop after roughly 1000 posts, so a crawl
+    that runs out of posts first may have missed some.
+    """
+    last_fullname = checkpoint["fullname"] if checkpoint else None
+
+    posts = []
+    for post in subreddit.new(limit=None):
+        if post.name == last_fullname or post.created_utc < since_utc:
+            return posts, True
+        posts.append(post)
+
+    logger.warning(f"Listing ended after {len(posts)} posts before reaching the crawl boundary, older posts may be missing")
+    return posts, False
+
+
+def collect(lookback_hours=DEFAULT_LOOKBACK_HOURS, scan_comments=SCAN_COMMENTS):
+    """Crawl new r/ufo posts, count keywords by date and upload to storage"""
     if not reddit:
         logger.error("Reddit API not configured. One or more of environment variables missing.")
-        return jsonify({
+        return {
             "error": "Reddit API not configured. One or more of environment variables missing (REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, user agent)",
             "data": []
-        })
-    
-    # Keywords to look for
-    keywords = ["sighting", "ufo", "alien", "encounter"]
+        }
 
     # Subreddit
     subreddit = reddit.subreddit("ufo")
 
-    # Get recent data
-    # TODO: get data for the last 24 hours rather than the last 100 posts
-    resp = subreddit.new(limit=100)
+    # Crawl back to the requested lookback, or to the last post we have seen
+    since_utc = datetime.now().timestamp() - lookback_hours * 3600
+
+    checkpoint = load_checkpoint()
+    if checkpoint:
+        if checkpoint["created_utc"] < since_utc:
+            logger.warning(f"Checkpoint is older than the {lookback_hours}h lookback, posts in between are skipped")
+        since_utc = max(since_utc, checkpoint["created_utc"])
+
+    posts, reached_boundary = crawl_new_posts(subreddit, since_utc, checkpoint)
+    logger.info(f"Fetched {len(posts)} new posts")
 
-    # Collect data from the posts
-    posts_data = {}
-    
-    for post in resp:
+    # Collect data from the posts, by date and post
+    posts_by_date = {}
+
+    for post in posts:
         # Convert timestamp to date in the proper timezone and format as date only
         post_date = datetime.fromtimestamp(post.created_utc).date()
         post_date_as_str = str(post_date)
 
-        # Count keywords in title
-        title_lower = post.title.lower()
-        keyword_count = sum(1 for k in keywords if k in title_lower)
+        # Scan title, body and optionally comments once each
+        title_counts = keyword_matcher.count(post.title)
+        body_texts = [post.selftext]
+        if scan_comments:
+            post.comments.replace_more(limit=0)
+            body_texts += [comment.body for comment in post.comments.list()]
+        body_counts = keyword_matcher.count(*body_texts)
 
-        # Append data
-        if post_date_as_str in posts_data:
-           posts_data[post_date_as_str] += keyword_count
-        else:
-           posts_data[post_date_as_str] = keyword_count
-    data = [{"date": date, "count": count} for date, count in posts_data.items()]
-    # End of TODO - everything between is subject to change, this is simply for testing
+        posts_by_date.setdefault(post_date_as_str, {})[post.name] = {
+            # Number of distinct keywords in the title, as the model features expect
+            "count": len(title_counts),
+            "keyword_counts": dict(title_counts + body_counts),
+        }
 
     # Get current Stockholm time
     stockholm_time = datetime.now(stockholm_tz)
@@ -82,24 +185,44 @@ def home():
     # TODO: yes
     # data = []
 
+    # Merge the new posts into one file per date
+    if posts:
+        data, failed_dates = upsert_to_storage(posts_by_date, extraction_date)
+
+        # Only move the high-water mark once every day is safely stored
+        upload_success = not failed_dates
+        if upload_success:
+            newest = posts[0]
+            save_checkpoint({"fullname": newest.name, "created_utc": newest.created_utc})
+    else:
+        logger.info("No new posts since last run, skipping upload")
+        data, upload_success = [], True
+
     # Prepare data for GCS bucket
     response_data = {
-        "query":    keywords,                   # TODO: potentially add actual query here somehow?
-        "data":     data,                       # TODO: fix time zone stuff and make the proper data object above
-        "total_days":       len(posts_data),    # TODO: perhaps not necessary since we only want one day? Take look
-        "extraction_date":  extraction_date
+        "query":    KEYWORDS,                   # TODO: potentially add actual query here somehow?
+        "data":     data,                       # Totals of the days with new posts
+        "total_days":       len(data),
+        "extraction_date":  extraction_date,
+        "new_posts":        len(posts),
+        "reached_boundary": reached_boundary,
+        "upload_status":    "success" if upload_success else "failed"
     }
-    
 
-    # Upload to GCS with date-based filename (overwrites previous day's file)
-    date_str = datetime.now().strftime("%Y%m%d")
-    filename = f"reddit_raw_data_{date_str}.json"
-    upload_success = upload_to_gcs(response_data, filename)
-        
-    # Add upload status to response
-    response_data["upload_status"] = "success" if upload_success else "failed"
-        
-    return jsonify(response_data)
+    return response_data
+
+
+@app.route("/")
+def home():
+    """Show reddit data as JSON"""
+    try:
+        lookback_hours = int(request.args.get("hours", DEFAULT_LOOKBACK_HOURS))
+    except ValueError:
+        lookback_hours = 0
+    if lookback_hours <= 0:
+        return jsonify({"error": "hours must be a positive whole number", "data": []}), 400
+    scan_comments = request.args.get("comments", str(SCAN_COMMENTS)).lower() == "true"
+    return jsonify(collect(lookback_hours, scan_comments))
 
 
 @app.route("/health")
@@ -107,47 +230,67 @@ def health():
     return {"status": "ok"}
 
 
-def upload_to_gcs(data, filename):
-    """Upload data to Google Cloud Storage as JSON"""
+def upsert_to_storage(posts_by_date, extraction_date):
+    """Merge newly counted posts into one file per date and upload them as gzip-compressed NDJSON.
+
+    The counts of every post are kept under state/posts/ by post, so a post
+    counted again (e.g. after a run whose checkpoint didn't move) replaces
+    its earlier counts instead of adding to them.
+
+    Returns the merged day records and the dates that failed.
+    """
     try:
-        # Only set service account key if running locally (file exists)
-        # On GCP, use default credentials
-        if os.path.exists('keys/key.json'):
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'keys/key.json'
-            logger.info("Using local service account key")
-        else:
-            logger.info("Using default GCP credentials")
-        
-        client = storage.Client()
-        bucket = client.bucket("reddit_api_bucket")
-        
-        # Create blob with filename in /raw folder
-        blob = bucket.blob(f"raw/{filename}")
-        
-        # Convert to NDJSON format with extraction_date and query
-        ndjson_data = ""
-        for item in data.get("data", []):
-            # Add extraction_date and query to each record
-            record = {
-                **item,
-                "extraction_date": data.get("extraction_date"),
-                "query": data.get("query")
-            }
-            ndjson_data += json.dumps(record) + "\n"
-        
-        # Upload NDJSON data
-        blob.upload_from_string(
-            ndjson_data,
-            content_type='application/x-ndjson'
-        )
-        
-        logger.info(f"Successfully uploaded {filename} to GCS bucket: reddit_api_bucket/raw/")
-        return True
+        sink = get_storage()
+
+        records_by_name = {}
+        failed_dates = []
+        for date_str, new_posts in posts_by_date.items():
+            state_name = f"{POSTS_PREFIX}{date_str}.json"
+            try:
+                existing = sink.read(state_name)
+                post_counts = {**json.loads(existing or b"{}"), **new_posts}
+                sink.write(state_name, json.dumps(post_counts).encode(), "application/json")
+            except Exception as e:
+                logger.error(f"Error updating post counts of {date_str}: {e}")
+                failed_dates.append(date_str)
+                continue
+            records_by_name[f"raw/{raw_filename(date_str)}"] = [
+                day_record(date_str, post_counts, extraction_date)
+            ]
+
+        # Write all days' files concurrently
+        written, failed = upload_ndjson_many(sink, records_by_name)
+        failed_dates += [records[0]["date"] for name, records in records_by_name.items() if name in failed]
+        records = [records[0] for name, records in records_by_name.items() if name not in failed]
+
+        # Optional typed, date-partitioned copy for column-selective reads
+        # (a failure here leaves the NDJSON uploads standing)
+        if PARQUET_ENABLED:
+            try:
+                upload_parquet_partitions(
+                    sink,
+                    "parquet",
+                    (
+                        {
+                            "date": date.fromisoformat(record["date"]),
+                            "count": record["count"],
+                            "extraction_date": date.fromisoformat(record["extraction_date"])
+                        }
+                        for record in records
+                    ),
+                    PARQUET_COLUMNS,
+                    basename="reddit_counts"
+                )
+            except Exception as e:
+                logger.error(f"Error writing Parquet copy: {e}")
+
+        logger.info(f"Successfully upserted {len(written)} files into {sink.uri('raw/')}")
+        return records, sorted(failed_dates)
     except Exception as e:
-        logger.error(f"Error uploading to GCS: {e}")
+        logger.error(f"Error uploading to storage: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
-        return False
+        return [], sorted(posts_by_date)
 
 
 if __name__ == "__main__":
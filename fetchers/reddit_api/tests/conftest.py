@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The fetcher runs as a script next to ../common, so import it the same way
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+
+import pytest
+from keyword_matcher import KeywordMatcher
+
+
+def naive_count(keywords, *texts):
+    """Overlapping occurrences of each keyword, searched one keyword at a time"""
+    counts = Counter()
+    for text in texts:
+        text = (text or "").lower()
+        for keyword in {k.lower() for k in keywords}:
+            start = text.find(keyword)
+            while start != -1:
+                counts[keyword] += 1
+                start = text.find(keyword, start + 1)
+    return counts
+
+
+def test_counts_substrings_case_insensitively():
+    matcher = KeywordMatcher(["UFO", "alien"])
+    assert matcher.count("Saw a UFO. Two ufos! Aliens?") == Counter(ufo=2, alien=1)
+
+
+def test_prefix_keywords_are_all_counted():
+    matcher = KeywordMatcher(["alien", "aliens", "abduction"])
+    assert matcher.count("aliens and an alien abduction") == Counter(
+        alien=2, aliens=1, abduction=1
+    )
+
+
+def test_overlapping_matches():
+    assert KeywordMatcher(["aa"]).count("aaaa") == Counter(aa=3)
+
+
+def test_counts_across_texts_and_skips_missing_ones():
+    matcher = KeywordMatcher(["ufo"])
+    assert matcher.count("ufo", None, "", "UFO ufo") == Counter(ufo=3)
+
+
+def test_regex_characters_are_literal():
+    matcher = KeywordMatcher(["u.f.o", "c++", "(ufo)"])
+    assert matcher.count("u.f.o c++ (ufo) uxfxo c+") == Counter(
+        {"u.f.o": 1, "c++": 1, "(ufo)": 1}
+    )
+
+
+def test_needs_a_keyword():
+    with pytest.raises(ValueError):
+        KeywordMatcher(["", ""])
+
+
+def test_matches_naive_search_on_random_text():
+    rng = random.Random(0)
+    keywords = ["ab", "abc", "b", "bca", "cab", "abcab", "Ca"]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(200):
+        texts = ["".join(rng.choice("abcAB ") for _ in range(rng.randint(0, 40)))]
+        assert matcher.count(*texts) == naive_count(keywords, *texts)
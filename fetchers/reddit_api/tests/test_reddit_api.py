@@ -0,0 +1,67 @@
+import json
+
+import pytest
+import reddit_api
+from sinks import MemorySink
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = MemorySink()
+    monkeypatch.setattr(reddit_api, 'get_sink', lambda *args: sink)
+    return sink
+
+
+def post(count, **keyword_counts):
+    return {'count': count, 'keyword_counts': keyword_counts}
+
+
+def stored(sink, date_str):
+    lines = sink.read(f'raw/{reddit_api.raw_filename(date_str)}').decode('utf-8').splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_raw_filename_is_named_after_the_post_date():
+    assert reddit_api.raw_filename('2024-01-05') == 'reddit_raw_data_20240105.json'
+
+
+def test_runs_add_up_in_one_file_per_day(sink):
+    records, failed = reddit_api.upsert_to_storage(
+        {'2024-01-05': {'t3_a': post(2, ufo=3, alien=1)}, '2024-01-06': {'t3_b': post(1, ufo=1)}},
+        '2024-01-06',
+    )
+    assert failed == []
+    assert [record['date'] for record in records] == ['2024-01-05', '2024-01-06']
+
+    reddit_api.upsert_to_storage({'2024-01-06': {'t3_c': post(2, alien=2)}}, '2024-01-07')
+
+    assert sorted(name for name in sink.objects if name.startswith('raw/')) == [
+        'raw/reddit_raw_data_20240105.json',
+        'raw/reddit_raw_data_20240106.json',
+    ]
+    [day] = stored(sink, '2024-01-06')
+    assert day['count'] == 3
+    assert {k['keyword']: k['count'] for k in day['keyword_counts']}['alien'] == 2
+    assert {k['keyword']: k['count'] for k in day['keyword_counts']}['ufo'] == 1
+    assert day['extraction_date'] == '2024-01-07'
+
+
+def test_posts_counted_again_are_not_added_twice(sink):
+    reddit_api.upsert_to_storage({'2024-01-05': {'t3_a': post(2, ufo=2)}}, '2024-01-05')
+    # The checkpoint didn't move, so the next run sees the same post again
+    reddit_api.upsert_to_storage({'2024-01-05': {'t3_a': post(2, ufo=2), 't3_b': post(1, ufo=1)}}, '2024-01-05')
+
+    [day] = stored(sink, '2024-01-05')
+    assert day['count'] == 3
+
+
+@pytest.mark.parametrize('hours', ['abc', '1.5', '0', '-3'])
+def test_invalid_lookback_is_rejected(hours, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('collected with an invalid lookback')
+
+    monkeypatch.setattr(reddit_api, 'collect', fail)
+    response = reddit_api.app.test_client().get('/', query_string={'hours': hours})
+
+    assert response.status_code == 400
+    assert 'hours' in response.get_json()['error']
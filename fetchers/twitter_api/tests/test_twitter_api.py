@@ -0,0 +1,93 @@
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+import twitter_api
+from sinks import MemorySink
+
+QUERY = '#ufo'
+
+
+def iso(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def response(now, counts):
+    """Day buckets like get_recent_tweets_count returns: from now - 7 days, the first partial"""
+    window_start = now - timedelta(days=7)
+    edges = [window_start] + [
+        (window_start + timedelta(days=i)).replace(hour=0, minute=0, second=0) for i in range(1, 8)
+    ] + [now]
+    return [
+        {'start': iso(start), 'end': iso(end), 'tweet_count': counts[start.date()]}
+        for start, end in zip(edges, edges[1:])
+    ]
+
+
+def run(sink, monkeypatch, now, counts):
+    monkeypatch.setattr(twitter_api, 'get_sink', lambda *args: sink)
+    records = twitter_api.bucket_records(response(now, counts), QUERY, now.date().isoformat(), 'day')
+    records_by_filename = {}
+    for record in records:
+        records_by_filename.setdefault(twitter_api.raw_filename(record['date'], 'day'), []).append(record)
+    assert twitter_api.upsert_to_storage(records_by_filename, 'day') == []
+
+
+def stored(sink):
+    return [
+        json.loads(line)
+        for name in sorted(sink.objects)
+        for line in sink.read(name).decode('utf-8').splitlines()
+    ]
+
+
+@pytest.mark.parametrize('start, granularity, aligned', [
+    ('2024-01-01T00:00:00.000Z', 'day', True),
+    ('2024-01-01T10:00:00.000Z', 'day', False),
+    ('2024-01-01T10:00:00.000Z', 'hour', True),
+    ('2024-01-01T10:23:11.000Z', 'hour', False),
+    ('2024-01-01T10:00:00.500Z', 'hour', False),
+])
+def test_is_aligned(start, granularity, aligned):
+    assert twitter_api.is_aligned(start, granularity) is aligned
+
+
+def test_bucket_records_skip_partial_buckets():
+    now = datetime(2024, 1, 8, 10, 23, tzinfo=UTC)
+    counts = {(now - timedelta(days=d)).date(): d for d in range(8)}
+
+    records = twitter_api.bucket_records(response(now, counts), QUERY, '2024-01-08', 'day')
+
+    # Not the partial first bucket (2024-01-01 from 10:23); the one of the day
+    # the run happens on is kept and replaced by the next runs
+    assert [record['date'] for record in records] == [f'2024-01-0{d}' for d in range(2, 9)]
+    assert [record['count'] for record in records] == [6, 5, 4, 3, 2, 1, 0]
+    assert all(record['start'].endswith('T00:00:00.000Z') for record in records)
+
+
+def test_daily_runs_count_each_day_once(monkeypatch):
+    sink = MemorySink()
+    first = datetime(2024, 1, 8, 10, 23, tzinfo=UTC)
+    counts = {(first - timedelta(days=d)).date(): 100 + d for d in range(-2, 9)}
+
+    for day in range(3):
+        run(sink, monkeypatch, first + timedelta(days=day), counts)
+
+    records = stored(sink)
+    assert [record['date'] for record in records] == [f'2024-01-{d:02}' for d in range(2, 11)]
+    assert all(record['count'] == counts[datetime.fromisoformat(record['date']).date()] for record in records)
+
+
+def test_upsert_replaces_counts_and_drops_stored_partial_buckets(monkeypatch):
+    sink = MemorySink()
+    monkeypatch.setattr(twitter_api, 'get_sink', lambda *args: sink)
+    name = twitter_api.raw_filename('2024-01-02', 'day')
+
+    # An earlier run stored the day's partial first bucket next to the full one
+    partial = {'date': '2024-01-02', 'count': 4, 'start': '2024-01-02T10:23:00.000Z'}
+    full = {'date': '2024-01-02', 'count': 10, 'start': '2024-01-02T00:00:00.000Z'}
+    sink.write(f'raw/{name}', '\n'.join(json.dumps(r) for r in (partial, full)).encode('utf-8'), 'application/x-ndjson')
+
+    newer = {**full, 'count': 12}
+    assert twitter_api.upsert_to_storage({name: [newer]}, 'day') == []
+    assert stored(sink) == [newer]
@@ -1,12 +1,18 @@
 import json
 import logging
 import os
-from datetime import datetime, timedelta, timezone
+import sys
+from datetime import UTC, date, datetime, timedelta, timezone
 
 import tweepy
 from dotenv import load_dotenv
-from flask import Flask, jsonify
-from google.cloud import storage
+from flask import Flask, jsonify, request
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+
+from ndjson_writer import upload_ndjson_many
+from parquet_writer import PARQUET_ENABLED, upload_parquet_partitions
+from sinks import get_sink
 
 # Configure logging
 logging.basicConfig(
@@ -28,55 +34,143 @@ stockholm_tz = timezone(timedelta(hours=1))
 bearer_token = os.environ.get("X_BEARER")
 client = tweepy.Client(bearer_token=bearer_token) if bearer_token else None
 
-@app.route('/')
-def home():
-    """Show Twitter data as JSON"""
+BUCKET_NAME = 'twitter_api_bucket'
+GRANULARITIES = ("day", "hour")
+
+# Typed columns for the Parquet copy of the raw data
+PARQUET_COLUMNS = {
+    "date": "date32",
+    "count": "int64",
+    "start": "timestamp[ms]",
+    "end": "timestamp[ms]",
+    "granularity": "string",
+    "extraction_date": "date32",
+}
+
+
+def parquet_row(record):
+    """Typed Parquet row for one count record (timestamps in UTC)"""
+    def utc(value):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+    return {
+        "date": date.fromisoformat(record["date"]),
+        "count": record["count"],
+        "start": utc(record["start"]),
+        "end": utc(record["end"]),
+        "granularity": record["granularity"],
+        "extraction_date": date.fromisoformat(record["extraction_date"])
+    }
+
+
+def is_aligned(start, granularity):
+    """Whether a bucket starts on a (UTC) day or hour boundary like the API's full buckets"""
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start.replace('Z', '+00:00'))
+    start = start.astimezone(UTC)
+    if start.minute or start.second or start.microsecond:
+        return False
+    return granularity == "hour" or start.hour == 0
+
+
+def bucket_records(buckets, query, extraction_date, granularity):
+    """Turn complete count buckets into records keyed by bucket start"""
+    now = datetime.now(stockholm_tz)
+
+    records = []
+    for bucket in buckets:
+        start = datetime.fromisoformat(bucket["start"].replace('Z', '+00:00'))
+        end = datetime.fromisoformat(bucket["end"].replace('Z', '+00:00'))
+
+        # The newest bucket is still filling up, it is picked up by a later run
+        if end > now:
+            continue
+
+        # The oldest bucket starts exactly 7 days ago, mid-day or mid-hour, and
+        # only holds part of its period; the full one came from earlier runs
+        if not is_aligned(start, granularity):
+            continue
+
+        # Convert API date to Stockholm timezone and format as date only
+        stockholm_date = start.astimezone(stockholm_tz).strftime("%Y-%m-%d")
+
+        records.append({
+            "date": stockholm_date,
+            "count": bucket["tweet_count"],
+            "start": bucket["start"],
+            "end": bucket["end"],
+            "granularity": granularity,
+            "extraction_date": extraction_date,
+            "query": query
+        })
+    return records
+
+
+def raw_filename(date_str, granularity):
+    """Name of the raw file holding one day's buckets"""
+    compact_date = date_str.replace("-", "")
+    if granularity == "hour":
+        return f"hourly/twitter_hourly_data_{compact_date}.json"
+    return f"twitter_raw_data_{compact_date}.json"
+
+
+def collect(granularity="day"):
+    """Fetch the last 7 days of tweet counts and upsert them into storage"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
     if not client:
-        return jsonify({
+        return {
             "error": "Twitter API not configured. X_BEARER environment variable missing.",
             "data": []
-        })
-    
+        }
 
-    # Simple query for UFO tweets - get only today's data
+    # Simple query for UFO tweets
     query = '#ufo OR #alien lang:en -is:retweet'
     
     # Get recent tweet counts (last 7 days)
-    resp = client.get_recent_tweets_count(query=query, granularity="day")
-    
-    # Get the most recent complete day of data
-    # This ensures we don't get partial data for "today"
-    data = []
-    if resp.data:
-        # Get the most recent day (last in the list)
-        most_recent = resp.data[-1]
-        
-        # Convert API date to Stockholm timezone and format as date only
-        api_date = datetime.fromisoformat(most_recent["start"].replace('Z', '+00:00'))
-        stockholm_date = api_date.astimezone(stockholm_tz)
-        formatted_date = stockholm_date.strftime("%Y-%m-%d")
-        
-        data = [{"date": formatted_date, "count": most_recent["tweet_count"]}]
+    resp = client.get_recent_tweets_count(query=query, granularity=granularity)
     
     # Get current Stockholm time
     stockholm_time = datetime.now(stockholm_tz)
+    extraction_date = stockholm_time.strftime("%Y-%m-%d")
+
+    # Keep every complete bucket. Each run rewrites the whole 7-day window,
+    # so a day missed by one run is recovered by the next at no extra cost.
+    data = bucket_records(resp.data or [], query, extraction_date, granularity)
+
+    records_by_date = {}
+    for record in data:
+        records_by_date.setdefault(record["date"], []).append(record)
+
+    # One file per day, upserted by bucket start
+    failed_files = upsert_to_storage(
+        {
+            raw_filename(date_str, granularity): records
+            for date_str, records in records_by_date.items()
+        },
+        granularity
+    )
     
     response_data = {
         "query": query,
         "data": data,
-        "total_days": len(data),
-        "extraction_date": stockholm_time.strftime("%Y-%m-%d")
+        "granularity": granularity,
+        "total_days": len(records_by_date),
+        "extraction_date": extraction_date,
+        "upload_status": "failed" if failed_files else "success"
     }
     
-    # Upload to GCS with date-based filename (overwrites previous day's file)
-    date_str = datetime.now().strftime("%Y%m%d")
-    filename = f"twitter_raw_data_{date_str}.json"
-    upload_success = upload_to_gcs(response_data, filename)
-    
-    # Add upload status to response
-    response_data["upload_status"] = "success" if upload_success else "failed"
-    
-    return jsonify(response_data)
+    return response_data
+
+
+@app.route('/')
+def home():
+    """Show Twitter data as JSON"""
+    try:
+        return jsonify(collect(request.args.get("granularity", "day")))
+    except ValueError as e:
+        return jsonify({"error": str(e), "data": []}), 400
 
 
 @app.route('/health')
@@ -84,47 +178,63 @@ def health():
     return {"status": "ok"}
 
 
-def upload_to_gcs(data, filename):
-    """Upload data to Google Cloud Storage as JSON"""
+def upsert_to_storage(records_by_filename, granularity):
+    """Merge records into per-day files by bucket start and upload them as gzip-compressed NDJSON.
+
+    Returns the filenames that failed.
+    """
     try:
-        # Only set service account key if running locally (file exists)
-        # On GCP, use default credentials
-        if os.path.exists('keys/key.json'):
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'keys/key.json'
-            logger.info("Using local service account key")
-        else:
-            logger.info("Using default GCP credentials")
-        
-        client = storage.Client()
-        bucket = client.bucket('twitter_api_bucket')
-        
-        # Create blob with filename in /raw folder
-        blob = bucket.blob(f"raw/{filename}")
-        
-        # Convert to NDJSON format with extraction_date and query
-        ndjson_data = ""
-        for item in data.get("data", []):
-            # Add extraction_date and query to each record
-            record = {
-                **item,
-                "extraction_date": data.get("extraction_date"),
-                "query": data.get("query")
-            }
-            ndjson_data += json.dumps(record) + "\n"
-        
-        # Upload NDJSON data
-        blob.upload_from_string(
-            ndjson_data,
-            content_type='application/x-ndjson'
-        )
+        # Local service account key if present, default GCP credentials otherwise
+        sink = get_sink(BUCKET_NAME, 'keys/key.json')
+
+        merged_by_name = {}
+        for filename, records in records_by_filename.items():
+            name = f"raw/{filename}"
+
+            # Existing buckets are kept unless this run has a newer count for them.
+            # Older files have no bucket start and held partial-day snapshots, and
+            # earlier runs stored the partial first bucket of the window under its
+            # unaligned start, so those records are replaced.
+            merged = {}
+            existing = sink.read(name)
+            for line in (existing or b"").decode("utf-8").splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    if "start" in record and is_aligned(record["start"], granularity):
+                        merged[record["start"]] = record
+            for record in records:
+                merged[record["start"]] = record
+            merged_by_name[name] = [merged[key] for key in sorted(merged)]
+
+        # Write all days' files concurrently
+        written, failed = upload_ndjson_many(sink, merged_by_name)
+
+        # Optional typed, date-partitioned copy for column-selective reads
+        # (a failure here leaves the NDJSON uploads standing)
+        if PARQUET_ENABLED:
+            try:
+                upload_parquet_partitions(
+                    sink,
+                    "parquet/hourly" if granularity == "hour" else "parquet",
+                    (
+                        parquet_row(record)
+                        for name, merged in merged_by_name.items()
+                        if name not in failed
+                        for record in merged
+                    ),
+                    PARQUET_COLUMNS,
+                    basename=f"twitter_{granularity}_counts"
+                )
+            except Exception as e:
+                logger.error(f"Error writing Parquet copy: {e}")
         
-        logger.info(f"Successfully uploaded {filename} to GCS bucket: twitter_api_bucket/raw/")
-        return True
+        logger.info(f"Successfully upserted {len(written)} files into {sink.uri('raw/')}")
+        return [name.removeprefix("raw/") for name in failed]
     except Exception as e:
-        logger.error(f"Error uploading to GCS: {e}")
+        logger.error(f"Error uploading to storage: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
-        return False
+        return list(records_by_filename)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
@@ -1,6 +1,8 @@
 import json
 import logging
 import os
+import sys
+import threading
 
 import pandas as pd
 import plotly.graph_objs as go
@@ -11,6 +13,10 @@ from flask import Flask
 from google.cloud import bigquery
 from google.oauth2 import service_account
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'models', 'c_models', 'data_loader'))
+
+from query_cache import cached_query
+
 # Load environment variables
 load_dotenv()
 
@@ -20,21 +26,34 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+_bigquery_client = None
+_bigquery_client_lock = threading.Lock()
+
 def get_bigquery_client():
-    """Initialize BigQuery client with authentication."""
+    """Get the BigQuery client, creating it with authentication on first use.
 
-    project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
-    
-    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-        credentials = service_account.Credentials.from_service_account_file(
-            os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        )
-        client = bigquery.Client(credentials=credentials, project=project_id)
-    else:
-        # Use default credentials (for Cloud Run)
-        client = bigquery.Client(project=project_id)
+    The client is shared by all requests so the credentials file is read,
+    and the authenticated session set up, only once per process.
+    """
+    global _bigquery_client
+
+    if _bigquery_client is not None:
+        return _bigquery_client
+
+    with _bigquery_client_lock:
+        if _bigquery_client is None:
+            project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
+            
+            if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+                credentials = service_account.Credentials.from_service_account_file(
+                    os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+                )
+                _bigquery_client = bigquery.Client(credentials=credentials, project=project_id)
+            else:
+                # Use default credentials (for Cloud Run)
+                _bigquery_client = bigquery.Client(project=project_id)
     
-    return client
+    return _bigquery_client
 
 def fetch_data_from_bigquery(table_id=None, limit=100):
     """Fetch data from BigQuery table."""
@@ -52,7 +71,7 @@ def fetch_data_from_bigquery(table_id=None, limit=100):
         """
         
         logger.info(f"Fetching data from {table_id}")
-        df = client.query(query).to_dataframe()
+        df = cached_query(client, query)
         logger.info(f"Retrieved {len(df)} rows")
         
         return df
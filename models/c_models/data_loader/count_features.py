@@ -0,0 +1,370 @@
+import io
+import json
+import logging
+import math
+import os
+from collections import deque
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_LOCATION = os.getenv('COUNT_FEATURE_STORE', 'data/count_features')
+STATE_FILE = 'state.json'
+HISTORY_PREFIX = 'history/'
+
+SERIES = ('reddit_count', 'twitter_count')
+LAGS = (1, 7)
+WINDOWS = (7, 28)
+EWMA_SPANS = (7, 28)
+HISTORY_DAYS = max(max(LAGS), max(WINDOWS))
+
+
+def feature_columns(series=SERIES) -> list:
+    """Names of the features kept for each series, in a fixed order."""
+    columns = []
+    for name in series:
+        columns += [f'{name}_lag_{lag}' for lag in LAGS]
+        for window in WINDOWS:
+            columns += [f'{name}_mean_{window}d', f'{name}_var_{window}d']
+        columns += [f'{name}_ewma_{span}d' for span in EWMA_SPANS]
+    return columns
+
+
+def parse_days(values) -> pd.Series:
+    """
+    Calendar days of dates, strings or timestamps, as datetime.date values.
+
+    Parsed at day resolution, so dates past 2262 (the nanosecond timestamp
+    limit of pandas 2) work too.
+    """
+    values = pd.Series(values)
+    days = np.asarray(values.astype(str).str[:10], dtype='datetime64[D]')
+    return pd.Series(days.astype(object), index=values.index)
+
+
+class SeriesState:
+    """
+    Running window state for one daily series.
+
+    Keeps the last HISTORY_DAYS values plus a sum, sum of squares and count
+    per window and one value per EWMA span, so pushing a day and reading
+    the features are both O(1) regardless of history length. Missing days
+    are pushed as NaN and skipped by the statistics.
+    """
+
+    def __init__(self, values=None, sums=None, sumsqs=None, counts=None, ewmas=None):
+        self.values = deque(values or [], maxlen=HISTORY_DAYS)  # newest first
+        self.sums = sums or {w: 0.0 for w in WINDOWS}
+        self.sumsqs = sumsqs or {w: 0.0 for w in WINDOWS}
+        self.counts = counts or {w: 0 for w in WINDOWS}
+        self.ewmas = ewmas or {s: None for s in EWMA_SPANS}
+
+    def push(self, value: float):
+        """Add the next day's value (NaN if missing)."""
+        present = not math.isnan(value)
+        for window in WINDOWS:
+            # The value falling out of the window once this one is added
+            if len(self.values) >= window:
+                leaving = self.values[window - 1]
+                if not math.isnan(leaving):
+                    self.sums[window] -= leaving
+                    self.sumsqs[window] -= leaving * leaving
+                    self.counts[window] -= 1
+            if present:
+                self.sums[window] += value
+                self.sumsqs[window] += value * value
+                self.counts[window] += 1
+        if present:
+            for span in EWMA_SPANS:
+                ewma = self.ewmas[span]
+                self.ewmas[span] = value if ewma is None else ewma + 2 / (span + 1) * (value - ewma)
+        self.values.appendleft(value)
+
+    def features(self) -> list:
+        """Features for the day after the last pushed one, in feature_columns order.
+
+        Values that have no history yet (lags before the series starts, empty
+        windows) are 0.
+        """
+        features = []
+        for lag in LAGS:
+            value = self.values[lag - 1] if len(self.values) >= lag else math.nan
+            features.append(0.0 if math.isnan(value) else value)
+        for window in WINDOWS:
+            n = self.counts[window]
+            mean = self.sums[window] / n if n else 0.0
+            # Sample variance, like pandas' rolling().var()
+            var = max(self.sumsqs[window] - n * mean * mean, 0.0) / (n - 1) if n > 1 else 0.0
+            features += [mean, var]
+        features += [self.ewmas[span] or 0.0 for span in EWMA_SPANS]
+        return features
+
+    def to_dict(self) -> dict:
+        return {
+            'values': [None if math.isnan(v) else v for v in self.values],
+            'sums': self.sums,
+            'sumsqs': self.sumsqs,
+            'counts': self.counts,
+            'ewmas': self.ewmas,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            values=[math.nan if v is None else v for v in data['values']],
+            sums={int(k): v for k, v in data['sums'].items()},
+            sumsqs={int(k): v for k, v in data['sumsqs'].items()},
+            counts={int(k): v for k, v in data['counts'].items()},
+            ewmas={int(k): v for k, v in data['ewmas'].items()},
+        )
+
+
+class CountFeatureStore:
+    """
+    Lag, rolling and EWMA features of the count series, persisted between runs.
+
+    The store holds the running state after the last absorbed day plus the
+    feature rows emitted so far. Each feature row for a day only uses counts
+    from earlier days, so it can be used both for training and for
+    predicting that day. Location is a directory or a gs://bucket/prefix.
+
+    Rows from updates that aren't persisted are kept in memory and served
+    with the saved history until the next persisted update writes them.
+    """
+
+    def __init__(self, location: str = STORE_LOCATION, series=SERIES):
+        self.location = location.rstrip('/')
+        self.series = tuple(series)
+        self.columns = feature_columns(self.series)
+        self.last_date = None
+        self.states = {name: SeriesState() for name in self.series}
+        self.unsaved = []  # feature frames of updates not written yet
+        self._bucket = None
+
+    # Storage: plain files or GCS objects under the location
+
+    def _gcs(self):
+        if self._bucket is None:
+            from gcp_clients import get_storage_client
+
+            bucket_name, _, self._prefix = self.location[len('gs://'):].partition('/')
+            self._bucket = get_storage_client().bucket(bucket_name)
+        return self._bucket
+
+    def _path(self, name: str) -> str:
+        if self.location.startswith('gs://'):
+            self._gcs()
+            return f'{self._prefix}/{name}' if self._prefix else name
+        return os.path.join(self.location, name)
+
+    def _read(self, name: str):
+        if self.location.startswith('gs://'):
+            blob = self._gcs().blob(self._path(name))
+            return blob.download_as_bytes() if blob.exists() else None
+        try:
+            with open(self._path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: str, data: bytes):
+        if self.location.startswith('gs://'):
+            self._gcs().blob(self._path(name)).upload_from_string(data)
+            return
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(f'{path}.tmp', path)
+
+    def _history_parts(self) -> list:
+        if self.location.startswith('gs://'):
+            prefix = self._path(HISTORY_PREFIX)
+            names = [blob.name[len(prefix):] for blob in self._gcs().list_blobs(prefix=prefix)]
+        else:
+            try:
+                names = os.listdir(self._path(HISTORY_PREFIX))
+            except FileNotFoundError:
+                names = []
+        return sorted(name for name in names if name.endswith('.parquet'))
+
+    # State
+
+    def load(self):
+        """Load the saved state, if any. Returns self."""
+        data = self._read(STATE_FILE)
+        if data is not None:
+            state = json.loads(data)
+            self.last_date = date.fromisoformat(state['last_date']) if state['last_date'] else None
+            self.states = {
+                name: SeriesState.from_dict(state['series'][name]) if name in state['series'] else SeriesState()
+                for name in self.series
+            }
+        return self
+
+    def save(self):
+        state = {
+            'last_date': self.last_date.isoformat() if self.last_date else None,
+            'series': {name: self.states[name].to_dict() for name in self.series},
+        }
+        self._write(STATE_FILE, json.dumps(state).encode('utf-8'))
+
+    def next_features(self) -> list:
+        """Features for the day after last_date."""
+        return [value for name in self.series for value in self.states[name].features()]
+
+    def update(self, df: pd.DataFrame, date_column: str = 'date', persist: bool = True) -> pd.DataFrame:
+        """
+        Absorb the days after last_date from a frame of counts.
+
+        Days up to last_date are skipped (already absorbed), so each run only
+        does work for its new days. Missing days in between are treated as
+        unknown counts.
+
+        Args:
+            df: Frame with the date column and one column per series
+            date_column: Name of the date column
+            persist: Save the new feature rows and state to the store location
+
+        Returns:
+            pandas.DataFrame: The feature rows emitted for the new days
+        """
+        days = parse_days(df[date_column])
+        counts = df[list(self.series)].astype('float64').set_axis(days).sort_index()
+        counts = counts[~counts.index.duplicated(keep='last')]
+        if self.last_date is not None:
+            counts = counts[counts.index > self.last_date]
+        if counts.empty:
+            return pd.DataFrame(columns=[date_column, *self.columns])
+
+        rows, row_dates = [], []
+        day = self.last_date + timedelta(days=1) if self.last_date else counts.index[0]
+        for current, values in zip(counts.index, counts.itertuples(index=False)):
+            # Days missing from the input are pushed as unknown
+            while day < current:
+                for name in self.series:
+                    self.states[name].push(math.nan)
+                day += timedelta(days=1)
+            rows.append(self.next_features())
+            row_dates.append(current)
+            for name, value in zip(self.series, values):
+                self.states[name].push(value)
+            day = current + timedelta(days=1)
+        self.last_date = counts.index[-1]
+
+        features = pd.DataFrame(rows, columns=self.columns)
+        features.insert(0, date_column, row_dates)
+        if not persist:
+            self.unsaved.append(features)
+            return features
+
+        # Write the rows of earlier in-memory updates too, so the history has no gaps
+        rows = pd.concat([*self.unsaved, features], ignore_index=True) if self.unsaved else features
+        buffer = io.BytesIO()
+        rows.to_parquet(buffer, index=False)
+        self._write(f'{HISTORY_PREFIX}{rows[date_column].iloc[0]}_{row_dates[-1]}.parquet', buffer.getvalue())
+        self.unsaved = []
+        self.save()
+        logger.info(f"Absorbed {len(features)} new days into count features (last date {self.last_date})")
+        return features
+
+    def history(self, start_date=None, end_date=None, date_column: str = 'date') -> pd.DataFrame:
+        """Feature rows emitted so far (saved or in memory), optionally limited to a date range."""
+        frames = []
+        for name in self._history_parts():
+            first, _, last = name[:-len('.parquet')].partition('_')
+            if (start_date and last < str(start_date)) or (end_date and first > str(end_date)):
+                continue
+            frames.append(pd.read_parquet(io.BytesIO(self._read(f'{HISTORY_PREFIX}{name}'))))
+        for features in self.unsaved:
+            days = features[date_column]
+            frames.append(features[(days >= (start_date or days.min())) & (days <= (end_date or days.max()))])
+        if not frames:
+            return pd.DataFrame(columns=[date_column, *self.columns])
+        history = pd.concat(frames, ignore_index=True)
+        return history.drop_duplicates(date_column, keep='last').sort_values(date_column, ignore_index=True)
+
+    def features_for(self, dates, date_column: str = 'date') -> pd.DataFrame:
+        """
+        Feature rows for the given dates.
+
+        Absorbed days come from the history; days after last_date are
+        computed from the current state, treating the days in between as
+        unknown. Absorbed days without a row (before the store's history, or
+        missing from the absorbed data) get zeros, with a warning.
+        """
+        days = parse_days(dates)
+        known = days[days <= self.last_date] if self.last_date else days.iloc[:0]
+        rows = {}
+        if len(known):
+            history = self.history(known.min(), known.max(), date_column)
+            rows = {row[0]: list(row[1:]) for row in history.itertuples(index=False)}
+
+        missing = []
+        for day in sorted(set(days) - set(rows)):
+            if self.last_date is None or day <= self.last_date:
+                rows[day] = [0.0] * len(self.columns)
+                missing.append(day)
+                continue
+            # Advance a copy of the state over the unknown days in between
+            states = {name: SeriesState.from_dict(state.to_dict()) for name, state in self.states.items()}
+            for _ in range((day - self.last_date).days - 1):
+                for state in states.values():
+                    state.push(math.nan)
+            rows[day] = [value for name in self.series for value in states[name].features()]
+        if missing:
+            logger.warning(f"No count features for {len(missing)} days ({missing[0]} to {missing[-1]}), using zeros")
+
+        features = pd.DataFrame([rows[day] for day in days], columns=self.columns)
+        features.insert(0, date_column, list(days))
+        return features
+
+
+def add_count_features(df: pd.DataFrame, store: CountFeatureStore = None, date_column: str = 'date') -> pd.DataFrame:
+    """
+    Join the count features onto a frame by date.
+
+    Frames carrying the count columns (training data) first update the
+    store with any new days; frames without them (inference) only read it.
+    Without a store, the features are computed from the frame itself.
+    """
+    if store is None:
+        features = CountFeatureStore(location='').update(df, date_column, persist=False)
+    else:
+        if all(name in df.columns for name in store.series):
+            store.update(df, date_column)
+        features = store.features_for(df[date_column], date_column)
+
+    days = parse_days(df[date_column])
+    features = features.drop_duplicates(date_column).set_index(date_column)
+    joined = features.reindex(days.values).reset_index(drop=True)
+    joined.index = df.index
+    return pd.concat([df, joined], axis=1)
+
+
+
+def refresh_count_features(table_id: str, store: CountFeatureStore, date_column: str = 'date',
+                           persist: bool = True, **kwargs):
+    """
+    Absorb the days after the store's last date from a BigQuery table.
+
+    Only the date and count columns of the new days are queried.
+
+    Args:
+        table_id: Full table ID (project.dataset.table)
+        store: Loaded CountFeatureStore
+        persist: Save the new days to the store location (False only updates
+            the store in memory)
+        **kwargs: Passed to load_data_from_bigquery (project_id, credentials_path)
+    """
+    from data_loader import load_data_from_bigquery
+
+    start_date = store.last_date + timedelta(days=1) if store.last_date else None
+    df = load_data_from_bigquery(
+        table_id, columns=[date_column, *store.series], start_date=start_date,
+        date_column=date_column, use_cache=False, **kwargs,
+    )
+    return store.update(df, date_column, persist=persist)
@@ -1,22 +1,91 @@
+import logging
 import os
+import re
 
 from dotenv import load_dotenv
+from gcp_clients import get_bigquery_client, get_bigquery_read_client
 from google.cloud import bigquery
-from google.oauth2 import service_account
+from query_cache import cached_query
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-def load_data_from_bigquery(table_id: str, project_id: str = None, limit: int = None, credentials_path: str = None):
+# Column and table names can't be query parameters, so they are validated
+# and backtick-quoted instead of being formatted into the SQL as given
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+TABLE_ID = re.compile(r'^[A-Za-z0-9_.:-]+$')
+
+
+def quote_identifier(name: str) -> str:
+    """Backtick-quote a column name, rejecting anything that isn't a plain identifier."""
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return f"`{name}`"
+
+
+def build_query(table_id: str, columns=None, start_date=None, end_date=None,
+                date_column: str = 'date', limit: int = None):
+    """
+    Build a parameterised SELECT for a table.
+
+    Args:
+        table_id: Full table ID (project.dataset.table) or just table name
+        columns: Columns to select (optional, all columns if not provided)
+        start_date: Earliest date to include, inclusive (optional)
+        end_date: Latest date to include, inclusive (optional)
+        date_column: Column the date range applies to
+        limit: Maximum number of rows to return (optional)
+
+    Returns:
+        tuple: (query string, list of bigquery.ScalarQueryParameter)
+    """
+    if not TABLE_ID.match(table_id):
+        raise ValueError(f"Invalid table ID: {table_id!r}")
+
+    select = ', '.join(quote_identifier(col) for col in columns) if columns else '*'
+    query = f"SELECT {select} FROM `{table_id}`"
+    params = []
+
+    predicates = []
+    if start_date is not None:
+        predicates.append(f"{quote_identifier(date_column)} >= @start_date")
+        params.append(bigquery.ScalarQueryParameter('start_date', 'DATE', start_date))
+    if end_date is not None:
+        predicates.append(f"{quote_identifier(date_column)} <= @end_date")
+        params.append(bigquery.ScalarQueryParameter('end_date', 'DATE', end_date))
+    if predicates:
+        query += " WHERE " + " AND ".join(predicates)
+
+    if limit:
+        query += " LIMIT @limit"
+        params.append(bigquery.ScalarQueryParameter('limit', 'INT64', int(limit)))
+
+    return query, params
+
+
+def load_data_from_bigquery(table_id: str, project_id: str = None, limit: int = None, credentials_path: str = None,
+                            columns=None, start_date=None, end_date=None, date_column: str = 'date',
+                            use_cache: bool = True):
     """
     Load data from BigQuery table for model training.
-    
+
+    Only the requested columns and dates are scanned, and results are
+    downloaded as Arrow record batches through the Storage Read API when
+    google-cloud-bigquery-storage is installed. Results are cached locally
+    as Parquet until the table changes (see query_cache.py).
+
     Args:
         table_id: Full table ID (project.dataset.table) or just table name
         project_id: Google Cloud project ID (optional, uses env var if not provided)
         limit: Maximum number of rows to return (optional)
         credentials_path: Path to service account JSON file (optional)
-    
+        columns: Columns to load (optional, all columns if not provided)
+        start_date: Earliest date to load, inclusive (optional)
+        end_date: Latest date to load, inclusive (optional)
+        date_column: Column the date range applies to
+        use_cache: Set to False to bypass the local query cache
+
     Returns:
         pandas.DataFrame: The loaded data
     """
@@ -25,31 +94,50 @@ def load_data_from_bigquery(table_id: str, project_id: str = None, limit: int =
         project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
         if not project_id:
             raise ValueError("Project ID must be provided or set in GOOGLE_CLOUD_PROJECT environment variable")
-    
-    # Initialize credentials
-    credentials = None
-    if credentials_path:
-        credentials = service_account.Credentials.from_service_account_file(credentials_path)
-    elif os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-        credentials = service_account.Credentials.from_service_account_file(os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
-    elif os.getenv('GOOGLE_CREDENTIALS_JSON'):
-        import json
-        credentials_json = json.loads(os.getenv('GOOGLE_CREDENTIALS_JSON'))
-        credentials = service_account.Credentials.from_service_account_info(credentials_json)
-    
-    # Initialize BigQuery client
-    if credentials:
-        client = bigquery.Client(project=project_id, credentials=credentials)
-    else:
-        client = bigquery.Client(project=project_id)
-    
+
+    # Reuse the process-wide BigQuery clients
+    client = get_bigquery_client(project_id, credentials_path)
+    read_client = get_bigquery_read_client(credentials_path)
+
     # Build query
-    query = f"SELECT * FROM `{table_id}`"
-    if limit:
-        query += f" LIMIT {limit}"
-    
-    # Execute query and return DataFrame
-    return client.query(query).to_dataframe()
+    query, params = build_query(table_id, columns, start_date, end_date, date_column, limit)
+    job_config = bigquery.QueryJobConfig(query_parameters=params)
+
+    def to_dataframe(job):
+        return job.result().to_dataframe(bqstorage_client=read_client, create_bqstorage_client=read_client is not None)
+
+    # Execute query (or read the cached result) and return DataFrame
+    df = cached_query(client, query, job_config, to_dataframe, use_cache)
+    logger.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
+    return df
+
+
+def iter_data_from_bigquery(table_id: str, batch_size: int = 10000, project_id: str = None, credentials_path: str = None,
+                            columns=None, start_date=None, end_date=None, date_column: str = 'date'):
+    """
+    Stream a table from BigQuery as DataFrames of at most batch_size rows.
+
+    Takes the same column and date arguments as load_data_from_bigquery, but
+    never holds more than a batch (per download stream) in memory. Results
+    are not cached.
+
+    Yields:
+        pandas.DataFrame: The next batch of rows
+    """
+    if not project_id:
+        project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
+        if not project_id:
+            raise ValueError("Project ID must be provided or set in GOOGLE_CLOUD_PROJECT environment variable")
+
+    client = get_bigquery_client(project_id, credentials_path)
+    read_client = get_bigquery_read_client(credentials_path)
+
+    query, params = build_query(table_id, columns, start_date, end_date, date_column)
+    rows = client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=params)).result(page_size=batch_size)
+    for df in rows.to_dataframe_iterable(bqstorage_client=read_client):
+        # Storage Read API streams can return larger blocks than page_size
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from count_features import feature_columns
+
+# Single source of truth for the training_combined columns used by the
+# models. Training and inference both select features through this list, so
+# column order is identical by construction.
+DATE_COLUMN = 'date'
+
+NASA_FEATURE_COLUMNS = (
+    'avg_relative_velocity', 'max_relative_velocity', 'min_relative_velocity',
+    'avg_miss_distance', 'max_miss_distance', 'min_miss_distance',
+    'avg_estimated_diameter_max', 'max_estimated_diameter_max', 'min_estimated_diameter_max',
+    'avg_estimated_diameter_min', 'max_estimated_diameter_min', 'min_estimated_diameter_min',
+    'avg_estimated_diameter',
+    'avg_absolute_magnitude', 'max_absolute_magnitude', 'min_absolute_magnitude',
+    'total_asteroids', 'total_hazardous_asteroids', 'total_sentry_objects',
+)
+
+# Lag, rolling and EWMA features of the targets (see count_features.py)
+COUNT_FEATURE_COLUMNS = tuple(feature_columns())
+
+FEATURE_COLUMNS = NASA_FEATURE_COLUMNS + COUNT_FEATURE_COLUMNS
+
+TARGET_COLUMNS = ('reddit_count', 'twitter_count')
+
+# Features are all float32 so they share one block and scikit-learn's
+# trees (which split on float32) use them without converting; counts are
+# far below 2**24 so they stay exact
+FEATURE_DTYPE = np.float32
+TARGET_DTYPE = np.int32
+
+
+def apply_schema(df: pd.DataFrame, include_targets: bool = True) -> pd.DataFrame:
+    """
+    Select the schema columns in order and cast them to their declared dtypes.
+
+    Anything else in the frame (e.g. the unnamed index column of a CSV
+    export) is dropped.
+
+    Args:
+        df: Frame loaded from BigQuery, Parquet or CSV
+        include_targets: Keep and cast the target columns too
+
+    Returns:
+        pandas.DataFrame: date (if present), features, then targets
+    """
+    columns = list(FEATURE_COLUMNS) + (list(TARGET_COLUMNS) if include_targets else [])
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        hint = " (join them with count_features.add_count_features first)" if set(missing) & set(COUNT_FEATURE_COLUMNS) else ""
+        raise ValueError(f"Missing columns: {missing}{hint}")
+
+    # Cast all features to float32 in one conversion rather than per column
+    features = pd.DataFrame(
+        np.ascontiguousarray(df[list(FEATURE_COLUMNS)].to_numpy(dtype=FEATURE_DTYPE)),
+        columns=list(FEATURE_COLUMNS),
+        index=df.index,
+        copy=False,
+    )
+    parts = [features]
+    if DATE_COLUMN in df.columns:
+        parts.insert(0, df[[DATE_COLUMN]])
+    if include_targets:
+        parts.append(df[list(TARGET_COLUMNS)].astype(TARGET_DTYPE))
+    return pd.concat(parts, axis=1)
+
+
+def feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Features of a schema frame as a C-contiguous float32 array, in schema order."""
+    return np.ascontiguousarray(df[list(FEATURE_COLUMNS)].to_numpy(dtype=FEATURE_DTYPE))
+
+
+def target_vector(df: pd.DataFrame, target_col: str) -> np.ndarray:
+    """One target column as a contiguous array."""
+    if target_col not in TARGET_COLUMNS:
+        raise ValueError(f"Unknown target column: {target_col}")
+    return np.ascontiguousarray(df[target_col].to_numpy(dtype=TARGET_DTYPE))
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import threading
+
+from google.cloud import bigquery, storage
+from google.oauth2 import service_account
+
+try:
+    from google.cloud import bigquery_storage
+except ImportError:  # Storage Read API is optional; queries fall back to REST
+    bigquery_storage = None
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def load_credentials(credentials_path: str = None):
+    """
+    Load service account credentials.
+
+    Checks, in order: credentials_path, GOOGLE_APPLICATION_CREDENTIALS and
+    GOOGLE_CREDENTIALS_JSON. Returns None to use the default credentials.
+    """
+    if credentials_path:
+        return service_account.Credentials.from_service_account_file(credentials_path)
+    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+        return service_account.Credentials.from_service_account_file(os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    if os.getenv('GOOGLE_CREDENTIALS_JSON'):
+        credentials_json = json.loads(os.getenv('GOOGLE_CREDENTIALS_JSON'))
+        return service_account.Credentials.from_service_account_info(credentials_json)
+    return None
+
+
+def _get_client(client_class, project_id: str = None, credentials_path: str = None):
+    """Get a cached client, creating it (and loading credentials) on first use."""
+    if not project_id:
+        project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
+
+    key = (client_class, project_id, credentials_path)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        # Another thread may have created it while we waited
+        client = _clients.get(key)
+        if client is None:
+            logger.info(f"Creating {client_class.__module__}.{client_class.__name__} for project {project_id}")
+            credentials = load_credentials(credentials_path)
+            client = client_class(project=project_id, credentials=credentials)
+            _clients[key] = client
+    return client
+
+
+def get_bigquery_client(project_id: str = None, credentials_path: str = None) -> bigquery.Client:
+    """
+    Get the process-wide BigQuery client.
+
+    Clients are created lazily, cached per project and credentials, and safe
+    to share between threads. Reusing them keeps the authenticated HTTP
+    session and its keep-alive connections, so requests skip the credential
+    file read, token exchange and TLS handshake.
+    """
+    return _get_client(bigquery.Client, project_id, credentials_path)
+
+
+def get_storage_client(project_id: str = None, credentials_path: str = None) -> storage.Client:
+    """Get the process-wide Cloud Storage client (see get_bigquery_client)."""
+    return _get_client(storage.Client, project_id, credentials_path)
+
+
+def get_bigquery_read_client(credentials_path: str = None):
+    """
+    Get the process-wide BigQuery Storage Read API client.
+
+    Query results are streamed through it as Arrow record batches. Returns
+    None when google-cloud-bigquery-storage is not installed, in which case
+    results are downloaded page by page over REST.
+    """
+    if bigquery_storage is None:
+        return None
+
+    key = (bigquery_storage.BigQueryReadClient, None, credentials_path)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            logger.info("Creating BigQuery Storage Read API client")
+            client = bigquery_storage.BigQueryReadClient(credentials=load_credentials(credentials_path))
+            _clients[key] = client
+    return client
@@ -0,0 +1,357 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, header length (uint32 LE), JSON header, then one block
+# per array, each starting on an ALIGNMENT boundary so uncompressed arrays
+# can be used in place from a memory map
+MAGIC = b'CMODEL\x00\x01'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+ARTIFACT_SUFFIX = '.artifact'
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_artifact(path: str, kind: str, arrays: dict, metadata: dict = None, compress: bool = False):
+    """
+    Write arrays and a small JSON header to an artifact file.
+
+    Args:
+        path: Output file (written atomically)
+        kind: Model kind the arrays describe ('forest' or 'linear')
+        arrays: Name to NumPy array
+        metadata: JSON-serialisable extras (targets, feature columns, ...)
+        compress: zlib-compress each array; smaller files, but they are
+            decompressed into private memory on load instead of mapped
+    """
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        data = array.tobytes()
+        if compress:
+            data = zlib.compress(data, 6)
+        blocks.append(data)
+        specs[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'nbytes': len(data),
+            'compression': 'zlib' if compress else None,
+        }
+
+    # Offsets depend on the header size, which depends on the offsets'
+    # digits; leave room by assuming the widest header first
+    header = {'format_version': FORMAT_VERSION, 'kind': kind, 'metadata': metadata or {}, 'arrays': specs}
+    for spec in specs.values():
+        spec['offset'] = 0
+    header_size = len(json.dumps(header).encode('utf-8')) + 32 * len(specs)
+    offset = _aligned(len(MAGIC) + 4 + header_size)
+    for spec in specs.values():
+        spec['offset'] = offset
+        offset = _aligned(offset + spec['nbytes'])
+    encoded = json.dumps(header).encode('utf-8').ljust(header_size)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+        for spec, data in zip(specs.values(), blocks):
+            f.seek(spec['offset'])
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(source):
+    """
+    Read an artifact from a file path or from bytes.
+
+    Files are memory-mapped: uncompressed arrays are read-only views of the
+    page cache, so every process loading the same file shares one copy and
+    loading does no work up front.
+
+    Returns:
+        tuple: (header dict, dict of arrays)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = memoryview(source)
+    else:
+        with open(source, 'rb') as f:
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a model artifact")
+    (header_size,) = struct.unpack('<I', buffer[len(MAGIC):len(MAGIC) + 4])
+    header = json.loads(bytes(buffer[len(MAGIC) + 4:len(MAGIC) + 4 + header_size]))
+    if header['format_version'] > FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact version: {header['format_version']}")
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        data = buffer[spec['offset']:spec['offset'] + spec['nbytes']]
+        if spec['compression'] == 'zlib':
+            data = zlib.decompress(data)
+        arrays[name] = np.frombuffer(data, dtype=np.dtype(spec['dtype'])).reshape(spec['shape'])
+    return header, arrays
+
+
+class ForestModel:
+    """
+    Random Forest / Extra Trees regressor compiled to flat NumPy arrays.
+
+    The nodes of all trees are stored back to back: children (absolute
+    [left, right] pairs), split feature, threshold, where missing values go
+    and node value, plus the index of each tree's root. Leaves are compiled
+    into nodes that lead back to themselves, so a leaf is simply a node that
+    no longer moves. Prediction walks every (tree, row) pair down together,
+    one level per step, dropping pairs as they reach their leaf.
+    """
+
+    kind = 'forest'
+
+    # Rows traversed at once; bounds the (trees x rows) index arrays
+    CHUNK_ROWS = 4096
+
+    def __init__(self, arrays: dict, metadata: dict = None):
+        if 'left' in arrays:
+            arrays = self._compile_leaves(arrays)
+        self.arrays = arrays
+        self.metadata = metadata or {}
+        self._children = arrays['children'].reshape(-1)
+
+    @staticmethod
+    def _compile_leaves(arrays: dict) -> dict:
+        """
+        Convert scikit-learn's layout (-1 children at leaves) to self-looping leaves.
+
+        Also upgrades version 1 artifacts on load; those don't record where
+        missing values go, so they send them right.
+        """
+        nodes = np.arange(len(arrays['left']), dtype=np.int32)
+        leaf = arrays['left'] == -1
+        return {
+            'roots': arrays['roots'],
+            'children': np.column_stack([
+                np.where(leaf, nodes, arrays['left']), np.where(leaf, nodes, arrays['right']),
+            ]).astype(np.int32),
+            'feature': np.where(leaf, 0, arrays['feature']).astype(np.int32),
+            'threshold': np.where(leaf, np.inf, arrays['threshold']),
+            'missing_left': arrays.get('missing_left', np.zeros(len(nodes), dtype=bool)).astype(bool),
+            'value': arrays['value'],
+        }
+
+    @classmethod
+    def from_estimator(cls, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        def children(attribute):
+            return np.concatenate([
+                np.where(child == -1, -1, child + offset)
+                for child, offset in zip((getattr(tree, attribute) for tree in trees), offsets)
+            ]).astype(np.int32)
+
+        arrays = cls._compile_leaves({
+            'roots': offsets.astype(np.int32),
+            'left': children('children_left'),
+            'right': children('children_right'),
+            'feature': np.concatenate([tree.feature for tree in trees]),
+            # float64 as in scikit-learn, so every split decides the same way
+            'threshold': np.concatenate([tree.threshold for tree in trees]),
+            # Before scikit-learn 1.3 missing values always went right
+            'missing_left': np.concatenate([
+                getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)) for tree in trees
+            ]),
+            'value': np.concatenate([tree.value[:, :, 0] for tree in trees]),
+        })
+        metadata = {
+            'n_features': int(model.n_features_in_),
+            'n_outputs': int(model.n_outputs_),
+            'max_depth': int(max(tree.max_depth for tree in trees)),
+        }
+        return cls(arrays, metadata)
+
+    def leaves(self, X) -> np.ndarray:
+        """Leaf node index of every (tree, row) pair, shape (n_trees, n_rows)."""
+        roots, feature = self.arrays['roots'], self.arrays['feature']
+        threshold, missing_left = self.arrays['threshold'], self.arrays['missing_left']
+        n_rows, n_features = X.shape
+        has_missing = bool(np.isnan(X).any())
+
+        flat_X = X.ravel()
+        node = np.repeat(roots, n_rows)
+        # Position of each pair's row in flat_X, and of the pair in the result
+        row_offset = np.tile(np.arange(n_rows) * n_features, len(roots))
+        pending = np.arange(len(node))
+        leaf = np.empty_like(node)
+        while len(node):
+            x = flat_X.take(row_offset + feature.take(node))
+            goes_right = x > threshold.take(node)
+            if has_missing:
+                missing = np.isnan(x)
+                goes_right[missing] = ~missing_left.take(node[missing])
+            step = self._children.take(2 * node + goes_right)
+            done = step == node
+            if done.any():
+                leaf[pending[done]] = node[done]
+                moving = ~done
+                pending, row_offset, step = pending[moving], row_offset[moving], step[moving]
+            node = step
+        return leaf.reshape(len(roots), n_rows)
+
+    def predict(self, X):
+        # Trees split on float32 features, compared against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        value = self.arrays['value']
+
+        prediction = np.empty((len(X), value.shape[1]))
+        for start in range(0, len(X), self.CHUNK_ROWS):
+            leaves = self.leaves(X[start:start + self.CHUNK_ROWS])
+            prediction[start:start + leaves.shape[1]] = value.take(leaves, axis=0).mean(axis=0)
+
+        return prediction[:, 0] if self.metadata['n_outputs'] == 1 else prediction
+
+
+class LinearModel:
+    """
+    Linear model compiled to a single affine transform, X @ weights + bias.
+
+    Covers Ridge, Lasso, ElasticNet and SGDRegressor, alone, wrapped in
+    MultiOutputRegressor and/or behind a StandardScaler in a Pipeline; the
+    scaling is folded into the weights and bias.
+    """
+
+    kind = 'linear'
+
+    def __init__(self, arrays: dict, metadata: dict = None):
+        if 'coef' in arrays:
+            arrays = self._fuse(arrays['mean'], arrays['scale'], arrays['coef'], arrays['intercept'])
+        self.arrays = arrays
+        self.metadata = metadata or {}
+
+    @staticmethod
+    def _fuse(mean, scale, coef, intercept) -> dict:
+        """((X - mean) / scale) @ coef.T + intercept as X @ weights + bias."""
+        weights = (coef / scale).T
+        return {
+            'weights': np.ascontiguousarray(weights, dtype=np.float64),
+            'bias': (intercept - mean @ weights).astype(np.float64),
+        }
+
+    @classmethod
+    def from_estimator(cls, model):
+        from sklearn.multioutput import MultiOutputRegressor
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = None
+        if isinstance(model, Pipeline):
+            *transforms, (_, model) = model.steps
+            if len(transforms) > 1 or (transforms and not isinstance(transforms[0][1], StandardScaler)):
+                raise TypeError("Only a StandardScaler can precede the linear model")
+            scaler = transforms[0][1] if transforms else None
+
+        if isinstance(model, MultiOutputRegressor):
+            coef = np.vstack([np.ravel(estimator.coef_) for estimator in model.estimators_])
+            intercept = np.array([np.ravel(estimator.intercept_)[0] for estimator in model.estimators_])
+            single_output = False
+        elif hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+            coef = np.atleast_2d(model.coef_)
+            intercept = np.broadcast_to(np.ravel(model.intercept_), (len(coef),)).copy()
+            single_output = np.ndim(model.coef_) == 1
+        else:
+            raise TypeError(f"Unsupported model: {type(model).__name__}")
+
+        n_features = coef.shape[1]
+        mean = np.zeros(n_features)
+        scale = np.ones(n_features)
+        if scaler is not None:
+            # mean_ is set even with with_mean=False, but isn't subtracted then
+            if scaler.with_mean and scaler.mean_ is not None:
+                mean = scaler.mean_
+            if scaler.with_std and scaler.scale_ is not None:
+                scale = scaler.scale_
+
+        arrays = cls._fuse(mean.astype(np.float64), scale.astype(np.float64), coef.astype(np.float64), intercept.astype(np.float64))
+        metadata = {'n_features': int(n_features), 'single_output': bool(single_output)}
+        return cls(arrays, metadata)
+
+    def predict(self, X):
+        prediction = np.asarray(X, dtype=np.float64) @ self.arrays['weights'] + self.arrays['bias']
+        return prediction[:, 0] if self.metadata['single_output'] else prediction
+
+
+KINDS = {model.kind: model for model in (ForestModel, LinearModel)}
+
+
+def export_model(model):
+    """Convert a fitted scikit-learn model to a ForestModel or LinearModel."""
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        exported = ForestModel.from_estimator(model)
+    else:
+        exported = LinearModel.from_estimator(model)
+    exported.metadata['model_class'] = type(model).__name__
+    return exported
+
+
+def save_artifact(model, path: str, compress: bool = False, **metadata) -> str:
+    """
+    Save a fitted scikit-learn model (or an exported one) as an artifact.
+
+    Args:
+        model: RandomForestRegressor, ExtraTreesRegressor or a linear model
+            (see LinearModel), or a ForestModel/LinearModel
+        path: Output file
+        compress: zlib-compress the arrays (see write_artifact)
+        **metadata: Extra JSON-serialisable metadata, e.g. target=...
+
+    Returns:
+        str: path
+    """
+    if not isinstance(model, tuple(KINDS.values())):
+        model = export_model(model)
+    write_artifact(path, model.kind, model.arrays, {**model.metadata, **metadata}, compress)
+    return path
+
+
+def load_artifact(source):
+    """Load a model saved with save_artifact from a path (memory-mapped) or bytes."""
+    header, arrays = read_artifact(source)
+    return KINDS[header['kind']](arrays, header['metadata'])
+
+
+def main():
+    """Compile pickled or joblib-saved models into artifacts next to them."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Compile scikit-learn models into NumPy model artifacts")
+    parser.add_argument('models', nargs='+', help=".pkl or .joblib files")
+    parser.add_argument('--compress', action='store_true', help="zlib-compress the arrays")
+    args = parser.parse_args()
+
+    for path in args.models:
+        if path.endswith('.joblib'):
+            import joblib
+
+            model = joblib.load(path)
+        else:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+        output = f'{os.path.splitext(path)[0]}{ARTIFACT_SUFFIX}'
+        save_artifact(model, output, compress=args.compress, name=os.path.basename(os.path.splitext(path)[0]))
+        logger.info(f"{path} ({os.path.getsize(path)} bytes) -> {output} ({os.path.getsize(output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+# nasa_api.py writes raw/nasa_raw_dataYYYYMMDD.json into its bucket
+RAW_DIR = 'raw'
+RAW_PREFIX = 'nasa_raw_data'
+DOWNLOAD_MAX_WORKERS = 8
+
+# Per-object values aggregated per day, in column order of the matrix built
+# by flatten_records(). Diameters are kept in both units because the
+# training table mixes them (see aggregate_daily).
+VALUE_COLUMNS = (
+    'relative_velocity',
+    'miss_distance',
+    'estimated_diameter_max_m',
+    'estimated_diameter_min_m',
+    'estimated_diameter_max_km',
+    'estimated_diameter_min_km',
+    'absolute_magnitude',
+)
+
+# Output columns, in the same order as training_combined
+FEATURE_COLUMNS = [
+    'date',
+    'avg_relative_velocity', 'max_relative_velocity', 'min_relative_velocity',
+    'avg_miss_distance', 'max_miss_distance', 'min_miss_distance',
+    'avg_estimated_diameter_max', 'max_estimated_diameter_max', 'min_estimated_diameter_max',
+    'avg_estimated_diameter_min', 'max_estimated_diameter_min', 'min_estimated_diameter_min',
+    'avg_estimated_diameter',
+    'avg_absolute_magnitude', 'max_absolute_magnitude', 'min_absolute_magnitude',
+    'total_asteroids', 'total_hazardous_asteroids', 'total_sentry_objects',
+]
+
+
+def iter_lines(data: bytes):
+    """Yield the non-empty lines of an NDJSON payload, gunzipping it if needed."""
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    for line in data.splitlines():
+        if line.strip():
+            yield line
+
+
+def list_sources(source: str, credentials_path: str = None):
+    """
+    Expand a source into the raw NDJSON objects it contains.
+
+    Args:
+        source: A file, a directory of nasa_raw_data*.json files (or a
+            bucket directory of the fetcher's local sink, holding them in
+            raw/), or a gs://bucket/prefix URI (raw/nasa_raw_data when
+            only the bucket is given)
+        credentials_path: Path to service account JSON file (GCS only)
+
+    Returns:
+        list: Local paths or GCS blobs, sorted by name
+    """
+    if source.startswith('gs://'):
+        from gcp_clients import get_storage_client
+
+        bucket_name, _, prefix = source[len('gs://'):].partition('/')
+        client = get_storage_client(credentials_path=credentials_path)
+        blobs = client.list_blobs(bucket_name, prefix=prefix or f'{RAW_DIR}/{RAW_PREFIX}')
+        return sorted(
+            (blob for blob in blobs if os.path.basename(blob.name).startswith(RAW_PREFIX)),
+            key=lambda blob: blob.name,
+        )
+    if os.path.isdir(source):
+        if os.path.isdir(os.path.join(source, RAW_DIR)):
+            source = os.path.join(source, RAW_DIR)
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.startswith(RAW_PREFIX)
+        )
+    return [source]
+
+
+def read_source(item) -> bytes:
+    """Read one local file or GCS blob as bytes."""
+    if isinstance(item, str):
+        with open(item, 'rb') as f:
+            return f.read()
+    return item.download_as_bytes()
+
+
+def iter_raw_records(sources, credentials_path: str = None, max_workers: int = DOWNLOAD_MAX_WORKERS):
+    """
+    Stream NeoWs objects from raw NDJSON files written by nasa_api.py.
+
+    Files are read ahead in the background while the oldest is parsed one
+    line at a time, and a new read only starts once a file is taken for
+    parsing, so at most max_workers files are held in memory at once.
+
+    Args:
+        sources: Iterable of sources accepted by list_sources()
+        credentials_path: Path to service account JSON file (GCS only)
+        max_workers: Number of files read concurrently
+
+    Yields:
+        dict: One NeoWs object, including the "date" key added by the fetcher
+    """
+    items = [item for source in sources for item in list_sources(source, credentials_path)]
+    logger.info(f"Reading {len(items)} raw NASA files")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map would submit, and so read, every file up front
+        pending = deque()
+        items = iter(items)
+        while True:
+            while len(pending) < max_workers:
+                item = next(items, None)
+                if item is None:
+                    break
+                pending.append(executor.submit(read_source, item))
+            if not pending:
+                return
+            data = pending.popleft().result()
+            for line in iter_lines(data):
+                yield json.loads(line)
+
+
+def to_float(value) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def flatten_records(records) -> dict:
+    """
+    Flatten NeoWs objects into column arrays.
+
+    Uses the close approach on the object's feed date (falling back to the
+    first approach), like the fetcher's Parquet output. Missing numbers
+    become NaN.
+
+    Args:
+        records: Iterable of NeoWs objects
+
+    Returns:
+        dict: 'date' (datetime64[D]), 'id' (int64), 'values' (float64 matrix
+            with one column per VALUE_COLUMNS entry), 'hazardous' and
+            'sentry' (bool)
+    """
+    dates, ids, values, hazardous, sentry = [], [], [], [], []
+
+    for obj in records:
+        approaches = obj.get('close_approach_data') or [{}]
+        approach = next(
+            (a for a in approaches if a.get('close_approach_date') == obj['date']),
+            approaches[0],
+        )
+        diameter = obj.get('estimated_diameter', {})
+        diameter_m = diameter.get('meters', {})
+        diameter_km = diameter.get('kilometers', {})
+
+        dates.append(obj['date'])
+        ids.append(obj.get('id') or -1)
+        values.append((
+            to_float(approach.get('relative_velocity', {}).get('kilometers_per_hour')),
+            to_float(approach.get('miss_distance', {}).get('kilometers')),
+            to_float(diameter_m.get('estimated_diameter_max')),
+            to_float(diameter_m.get('estimated_diameter_min')),
+            to_float(diameter_km.get('estimated_diameter_max')),
+            to_float(diameter_km.get('estimated_diameter_min')),
+            to_float(obj.get('absolute_magnitude_h')),
+        ))
+        hazardous.append(bool(obj.get('is_potentially_hazardous_asteroid')))
+        sentry.append(bool(obj.get('is_sentry_object')))
+
+    return {
+        'date': np.array(dates, dtype='datetime64[D]'),
+        'id': np.array(ids, dtype=np.int64),
+        'values': np.array(values, dtype=np.float64).reshape(-1, len(VALUE_COLUMNS)),
+        'hazardous': np.array(hazardous, dtype=bool),
+        'sentry': np.array(sentry, dtype=bool),
+    }
+
+
+def aggregate_daily(arrays: dict) -> pd.DataFrame:
+    """
+    Compute the per-day NASA features from flattened arrays.
+
+    Rows are sorted by day once and every aggregate is a single reduceat
+    over the contiguous day groups. Objects repeated within a day (e.g. the
+    same file read twice) are counted once. Units follow training_combined:
+    velocity in km/h, miss distance in km, diameter averages in metres,
+    diameter min/max and avg_estimated_diameter in kilometres.
+
+    Args:
+        arrays: Output of flatten_records()
+
+    Returns:
+        pandas.DataFrame: One row per day with FEATURE_COLUMNS
+    """
+    dates = arrays['date']
+    if len(dates) == 0:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    # Sort by (day, id) and drop repeated objects within a day
+    order = np.lexsort((arrays['id'], dates))
+    dates, ids = dates[order], arrays['id'][order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (dates[1:] != dates[:-1]) | (ids[1:] != ids[:-1])
+    order, dates = order[keep], dates[keep]
+
+    values = arrays['values'][order]
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present, starts, axis=0)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    maxes = np.fmax.reduceat(values, starts, axis=0)
+    mins = np.fmin.reduceat(values, starts, axis=0)
+
+    col = {name: i for i, name in enumerate(VALUE_COLUMNS)}
+
+    def stats(name, avg_name=None):
+        i, j = col[name], col[avg_name or name]
+        return means[:, j], maxes[:, i], mins[:, i]
+
+    features = {'date': dates[starts]}
+    for prefix, name, avg_name in (
+        ('relative_velocity', 'relative_velocity', None),
+        ('miss_distance', 'miss_distance', None),
+        ('estimated_diameter_max', 'estimated_diameter_max_km', 'estimated_diameter_max_m'),
+        ('estimated_diameter_min', 'estimated_diameter_min_km', 'estimated_diameter_min_m'),
+    ):
+        features[f'avg_{prefix}'], features[f'max_{prefix}'], features[f'min_{prefix}'] = stats(name, avg_name)
+    features['avg_estimated_diameter'] = (
+        means[:, col['estimated_diameter_max_km']] + means[:, col['estimated_diameter_min_km']]
+    ) / 2
+    (
+        features['avg_absolute_magnitude'],
+        features['max_absolute_magnitude'],
+        features['min_absolute_magnitude'],
+    ) = stats('absolute_magnitude')
+    features['total_asteroids'] = np.diff(np.r_[starts, len(dates)])
+    features['total_hazardous_asteroids'] = np.add.reduceat(arrays['hazardous'][order], starts).astype(np.int64)
+    features['total_sentry_objects'] = np.add.reduceat(arrays['sentry'][order], starts).astype(np.int64)
+
+    return pd.DataFrame(features, columns=FEATURE_COLUMNS)
+
+
+def build_nasa_features(sources, credentials_path: str = None) -> pd.DataFrame:
+    """
+    Build the daily NASA aggregate features from raw NeoWs NDJSON.
+
+    Args:
+        sources: Files, directories or gs://bucket/prefix URIs
+        credentials_path: Path to service account JSON file (GCS only)
+
+    Returns:
+        pandas.DataFrame: One row per day with FEATURE_COLUMNS
+    """
+    arrays = flatten_records(iter_raw_records(sources, credentials_path))
+    logger.info(f"Flattened {len(arrays['date'])} NeoWs objects")
+    return aggregate_daily(arrays)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Build daily NASA features from raw NeoWs NDJSON")
+    parser.add_argument('sources', nargs='+', help="Files, directories or gs://bucket/prefix URIs")
+    parser.add_argument('--output', help="Write the features to this CSV or Parquet file")
+    parser.add_argument('--credentials', help="Path to service account JSON file")
+    args = parser.parse_args()
+
+    df = build_nasa_features(args.sources, args.credentials)
+    print(f"Built features for {len(df)} days")
+    if args.output and args.output.endswith('.parquet'):
+        df.to_parquet(args.output, index=False)
+    elif args.output:
+        df.to_csv(args.output, index=False)
+    else:
+        print(df)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser(os.getenv('QUERY_CACHE_DIR', '~/.cache/query_cache'))
+CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', str(1024**3)))
+CACHE_ENABLED = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# Fully qualified `project.dataset.table` references in a query
+TABLE_REFERENCE = re.compile(r'`([A-Za-z0-9_-]+\.[A-Za-z0-9_]+\.[A-Za-z0-9_$]+)`')
+
+_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and drop a trailing semicolon so formatting doesn't change the key."""
+    return re.sub(r'\s+', ' ', query).strip().rstrip(';').strip()
+
+
+def referenced_tables(query: str) -> list:
+    """Tables referenced by a query, as sorted project.dataset.table IDs."""
+    return sorted(set(TABLE_REFERENCE.findall(query)))
+
+
+def cache_key(client, query: str, job_config=None):
+    """
+    Content-address a query.
+
+    The key covers the normalised query text, its parameters and the last
+    modified time of every table it reads, so any change to the data gives
+    a new key and stale results are never served.
+
+    Args:
+        client: BigQuery client used to look up table metadata
+        query: SQL query text
+        job_config: bigquery.QueryJobConfig with the query parameters (optional)
+
+    Returns:
+        str: Hex digest, or None if the query's tables can't be identified
+    """
+    tables = referenced_tables(query)
+    if not tables:
+        return None
+
+    params = []
+    if job_config is not None:
+        params = [param.to_api_repr() for param in job_config.query_parameters]
+
+    modified = {table: client.get_table(table).modified.isoformat() for table in tables}
+    payload = json.dumps(
+        {'query': normalize_query(query), 'params': params, 'tables': modified},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f'{key}.parquet')
+
+
+def read_cached(key: str):
+    """Read a cached result, marking it as recently used. Returns None on a miss."""
+    path = cache_path(key)
+    try:
+        df = pd.read_parquet(path)
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+    try:
+        os.utime(path)  # mtime is the LRU clock
+    except OSError:
+        pass
+    return df
+
+
+def write_cached(key: str, df: pd.DataFrame):
+    """Write a result atomically, then evict least recently used entries over the size limit."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(key)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Could not cache query result: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    evict(CACHE_MAX_BYTES)
+
+
+def evict(max_bytes: int = CACHE_MAX_BYTES):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    with _lock:
+        try:
+            entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith('.parquet')]
+        except FileNotFoundError:
+            return
+        stats = []
+        for entry in entries:
+            try:
+                stats.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except FileNotFoundError:
+                continue
+
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                logger.info(f"Evicted {os.path.basename(path)} from query cache")
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def cached_query(client, query: str, job_config=None, to_dataframe=None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Run a query, serving the result from the local Parquet cache when possible.
+
+    Args:
+        client: BigQuery client
+        query: SQL query text; tables must be fully qualified and backtick-quoted
+            to be cached
+        job_config: bigquery.QueryJobConfig (optional)
+        to_dataframe: Function turning a finished QueryJob into a DataFrame
+            (optional, defaults to job.to_dataframe())
+        use_cache: Set to False to always query the warehouse
+
+    Returns:
+        pandas.DataFrame: The query result
+    """
+    key = None
+    if use_cache and CACHE_ENABLED:
+        try:
+            key = cache_key(client, query, job_config)
+        except Exception as e:
+            logger.warning(f"Could not build query cache key, querying directly: {e}")
+        if key:
+            df = read_cached(key)
+            if df is not None:
+                logger.info(f"Query cache hit ({key[:12]}): {len(df)} rows")
+                return df
+
+    job = client.query(query, job_config=job_config)
+    df = to_dataframe(job) if to_dataframe else job.to_dataframe()
+
+    if key:
+        logger.info(f"Query cache miss ({key[:12]}), {job.total_bytes_processed or 0} bytes processed")
+        write_cached(key, df)
+    return df
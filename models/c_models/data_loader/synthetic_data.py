@@ -0,0 +1,123 @@
+import argparse
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from feature_schema import DATE_COLUMN, NASA_FEATURE_COLUMNS, TARGET_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+START_DATE = date(2000, 1, 1)
+
+# Albedos NASA uses for the max and min diameter estimates
+ALBEDO_MAX_DIAMETER = 0.05
+ALBEDO_MIN_DIAMETER = 0.25
+
+
+def diameter_km(magnitude, albedo):
+    """Estimated asteroid diameter in km from its absolute magnitude."""
+    return 1329 / np.sqrt(albedo) * 10 ** (-magnitude / 5)
+
+
+def generate_training_data(rows: int, start_date=START_DATE, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic rows with the training_combined schema, one per day.
+
+    Features follow the units and rough ranges of the real table (velocity
+    in km/h, miss distance in km, diameter averages in metres and min/max in
+    km). The counts depend on the hazardous/total asteroid counts plus a
+    weekly and yearly cycle and autocorrelated noise, so the models have
+    something to learn and the lag features carry signal. Every column is
+    generated vectorised, so a million rows take about a second.
+
+    Beyond ~100k rows the dates pass 2262, so they are kept as
+    datetime.date values rather than nanosecond timestamps.
+
+    Args:
+        rows: Number of days
+        start_date: Date of the first row
+        seed: Random seed; the same seed and size give the same frame
+
+    Returns:
+        pandas.DataFrame: date, the NASA feature columns and the targets
+    """
+    rng = np.random.default_rng(seed)
+    day = np.arange(rows)
+
+    total = np.maximum(rng.poisson(14, rows), 1)
+    hazardous = rng.binomial(total, 0.08)
+    sentry = rng.binomial(total, 0.01)
+
+    velocity = rng.lognormal(np.log(50000), 0.2, rows)
+    miss_distance = np.clip(rng.normal(38e6, 6e6, rows), 1e6, None)
+    magnitude = rng.normal(24, 1.2, rows)
+    min_magnitude = magnitude - rng.uniform(2, 5, rows)
+    max_magnitude = magnitude + rng.uniform(2, 6, rows)
+
+    # The mean diameter of a day sits well above the diameter at its mean
+    # magnitude, since diameters are skewed towards a few large objects
+    skew = rng.uniform(1.5, 3, rows)
+    avg_diameter_max = diameter_km(magnitude, ALBEDO_MAX_DIAMETER) * skew * 1000
+    avg_diameter_min = diameter_km(magnitude, ALBEDO_MIN_DIAMETER) * skew * 1000
+
+    columns = {
+        'avg_relative_velocity': velocity,
+        'max_relative_velocity': velocity * rng.uniform(1.5, 2, rows),
+        'min_relative_velocity': velocity * rng.uniform(0.2, 0.4, rows),
+        'avg_miss_distance': miss_distance,
+        'max_miss_distance': miss_distance * rng.uniform(1.5, 2, rows),
+        'min_miss_distance': miss_distance * rng.uniform(0.05, 0.5, rows),
+        'avg_estimated_diameter_max': avg_diameter_max,
+        'max_estimated_diameter_max': diameter_km(min_magnitude, ALBEDO_MAX_DIAMETER),
+        'min_estimated_diameter_max': diameter_km(max_magnitude, ALBEDO_MAX_DIAMETER),
+        'avg_estimated_diameter_min': avg_diameter_min,
+        'max_estimated_diameter_min': diameter_km(min_magnitude, ALBEDO_MIN_DIAMETER),
+        'min_estimated_diameter_min': diameter_km(max_magnitude, ALBEDO_MIN_DIAMETER),
+        # Mean of the max and min estimates, back in km
+        'avg_estimated_diameter': (avg_diameter_max + avg_diameter_min) / 2000,
+        'avg_absolute_magnitude': magnitude,
+        'max_absolute_magnitude': max_magnitude,
+        'min_absolute_magnitude': min_magnitude,
+        'total_asteroids': total,
+        'total_hazardous_asteroids': hazardous,
+        'total_sentry_objects': sentry,
+    }
+
+    # Shared interest level: weekly and yearly cycles plus AR(1)-like noise
+    # (an exponentially decaying filter, truncated after 30 days)
+    noise = np.convolve(rng.normal(0, 0.3, rows), 0.8 ** np.arange(30))[:rows]
+    interest = 0.3 * np.sin(2 * np.pi * day / 7) + 0.5 * np.sin(2 * np.pi * day / 365.25) + noise
+    level = 0.15 * hazardous + 0.02 * (total - 14) + 0.3 * sentry
+    targets = {
+        'reddit_count': rng.poisson(np.exp(1.2 + 0.5 * interest + level)),
+        'twitter_count': rng.poisson(np.exp(6 + 0.7 * interest + level) * rng.gamma(5, 0.2, rows)),
+    }
+
+    dates = np.datetime64(start_date, 'D') + day.astype('timedelta64[D]')
+    df = pd.DataFrame({DATE_COLUMN: pd.Series(dates, dtype='datetime64[s]').dt.date})
+    for name in NASA_FEATURE_COLUMNS:
+        df[name] = columns[name]
+    for name in TARGET_COLUMNS:
+        df[name] = targets[name]
+    return df
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Generate synthetic training_combined rows")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--output', default='synthetic_training_combined.parquet', help="Parquet or CSV file")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = generate_training_data(args.rows, seed=args.seed)
+    if args.output.endswith('.csv'):
+        df.to_csv(args.output)
+    else:
+        df.to_parquet(args.output, index=False)
+    logger.info(f"Wrote {len(df)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
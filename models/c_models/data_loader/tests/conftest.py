@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The training and inference code put this directory on sys.path, so import it the same way
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
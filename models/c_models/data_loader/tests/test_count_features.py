@@ -0,0 +1,130 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from count_features import (
+    EWMA_SPANS,
+    LAGS,
+    SERIES,
+    WINDOWS,
+    CountFeatureStore,
+    SeriesState,
+    add_count_features,
+    feature_columns,
+)
+
+
+def counts_frame(days=60, seed=0, gaps=(10, 11, 40)):
+    rng = np.random.default_rng(seed)
+    dates = [d for i, d in enumerate(pd.date_range('2024-01-01', periods=days).date) if i not in gaps]
+    return pd.DataFrame({
+        'date': [d.isoformat() for d in dates],
+        'reddit_count': rng.integers(0, 500, len(dates)),
+        'twitter_count': rng.integers(0, 50, len(dates)),
+    })
+
+
+def pandas_features(df):
+    """The same features with pandas, over a calendar index where missing days are NaN"""
+    daily = df.assign(date=pd.to_datetime(df['date'])).set_index('date').asfreq('D').astype(float)
+    features = {}
+    for name in SERIES:
+        series = daily[name]
+        for lag in LAGS:
+            features[f'{name}_lag_{lag}'] = series.shift(lag)
+        for window in WINDOWS:
+            features[f'{name}_mean_{window}d'] = series.rolling(window, min_periods=1).mean().shift(1)
+            features[f'{name}_var_{window}d'] = series.rolling(window, min_periods=2).var().shift(1)
+        for span in EWMA_SPANS:
+            features[f'{name}_ewma_{span}d'] = series.ewm(span=span, adjust=False, ignore_na=True).mean().shift(1)
+    features = pd.DataFrame(features)[feature_columns()].fillna(0.0)
+    return features.loc[pd.to_datetime(df['date'])].reset_index(drop=True)
+
+
+def test_series_state_matches_pandas():
+    df = counts_frame()
+    features = add_count_features(df)[feature_columns()]
+    np.testing.assert_allclose(features.to_numpy(), pandas_features(df).to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_series_state_round_trips():
+    state = SeriesState()
+    for value in (3.0, math.nan, 5.0, 8.0):
+        state.push(value)
+    restored = SeriesState.from_dict(state.to_dict())
+
+    assert restored.features() == state.features()
+    restored.push(1.0)
+    state.push(1.0)
+    assert restored.features() == state.features()
+
+
+def test_store_updates_incrementally(tmp_path):
+    df = counts_frame()
+    expected = add_count_features(df)
+
+    store = CountFeatureStore(str(tmp_path)).load()
+    store.update(df.iloc[:20])
+    # A later run sees overlapping days; only the new ones are absorbed
+    reloaded = CountFeatureStore(str(tmp_path)).load()
+    assert len(reloaded.update(df.iloc[15:])) == len(df) - 20
+
+    joined = add_count_features(df[['date']], CountFeatureStore(str(tmp_path)).load())
+    pd.testing.assert_frame_equal(joined, expected[joined.columns])
+
+
+def test_features_for_days_after_the_store(tmp_path):
+    df = counts_frame(gaps=())
+    store = CountFeatureStore(str(tmp_path)).load()
+    store.update(df)
+
+    next_day, later_day = store.last_date + pd.Timedelta(days=1), store.last_date + pd.Timedelta(days=3)
+    features = store.features_for([next_day, later_day]).set_index('date')
+
+    assert features.loc[next_day].tolist() == pytest.approx(store.next_features())
+    # Two unknown days in between: the lags fall on them, the windows skip them
+    later = features.loc[later_day]
+    assert later['reddit_count_lag_1'] == 0.0
+    assert later['reddit_count_lag_7'] == df['reddit_count'].iloc[-5]
+    assert later['reddit_count_mean_7d'] == pytest.approx(df['reddit_count'].iloc[-5:].mean())
+
+
+def test_in_memory_updates_serve_their_days(tmp_path):
+    df = counts_frame()
+    expected = add_count_features(df).set_index('date')[feature_columns()]
+
+    CountFeatureStore(str(tmp_path)).load().update(df.iloc[:30])
+    store = CountFeatureStore(str(tmp_path)).load()
+    store.update(df.iloc[30:], persist=False)
+
+    # Days up to last_date that were only absorbed in memory
+    days = df['date'].iloc[28:].tolist()
+    features = store.features_for(days).set_index('date')
+    np.testing.assert_allclose(features.to_numpy(), expected.loc[days].to_numpy(), rtol=1e-9)
+    assert (features['reddit_count_mean_7d'] > 0).all()
+    # Nothing was written, so a fresh load doesn't see them
+    assert CountFeatureStore(str(tmp_path)).load().last_date == pd.Timestamp(df['date'].iloc[29]).date()
+
+
+def test_persisted_update_writes_the_in_memory_days(tmp_path):
+    df = counts_frame()
+    expected = add_count_features(df)
+
+    store = CountFeatureStore(str(tmp_path)).load()
+    store.update(df.iloc[:20])
+    store.update(df.iloc[20:40], persist=False)
+    store.update(df.iloc[40:])
+
+    joined = add_count_features(df[['date']], CountFeatureStore(str(tmp_path)).load())
+    pd.testing.assert_frame_equal(joined, expected[joined.columns])
+
+
+def test_dates_past_the_nanosecond_range():
+    # Large synthetic datasets run past 2262, the limit of nanosecond timestamps
+    df = counts_frame(gaps=())
+    late = df.assign(date=[d + timedelta(days=100_000) for d in pd.to_datetime(df['date']).dt.date])
+
+    features = add_count_features(late)[feature_columns()]
+    pd.testing.assert_frame_equal(features, add_count_features(df)[feature_columns()])
@@ -0,0 +1,166 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+from model_artifact import (
+    ALIGNMENT,
+    FORMAT_VERSION,
+    MAGIC,
+    ForestModel,
+    LinearModel,
+    load_artifact,
+    read_artifact,
+    save_artifact,
+    write_artifact,
+)
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.linear_model import ElasticNet, Lasso, Ridge, SGDRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = (rng.normal(size=(400, 8)) * [1, 10, 100, 1, 1, 0.1, 5, 2]).astype(np.float32)
+    Y = np.column_stack([X[:, 0] * 3 + X[:, 1], np.abs(X[:, 2]) + X[:, 3] ** 2]) + rng.normal(size=(400, 2))
+    # Missing values in training, so the trees learn where they go
+    X_missing = X.copy()
+    X_missing[rng.random(X.shape) < 0.1] = np.nan
+    return X, Y, X_missing
+
+
+FORESTS = [
+    RandomForestRegressor(n_estimators=20, random_state=0),
+    RandomForestRegressor(n_estimators=10, max_depth=4, max_features=0.5, random_state=1),
+    ExtraTreesRegressor(n_estimators=20, random_state=0),
+]
+
+
+@pytest.mark.parametrize('forest', FORESTS, ids=lambda model: type(model).__name__)
+@pytest.mark.parametrize('outputs', [1, 2])
+def test_forest_predictions_equal_sklearn(data, forest, outputs):
+    X, Y, _ = data
+    model = forest.fit(X, Y[:, 0] if outputs == 1 else Y)
+    np.testing.assert_array_equal(ForestModel.from_estimator(model).predict(X), model.predict(X))
+
+
+def test_forest_sends_missing_values_where_sklearn_does(data):
+    _, Y, X_missing = data
+    model = RandomForestRegressor(n_estimators=20, random_state=0).fit(X_missing, Y[:, 0])
+    np.testing.assert_array_equal(ForestModel.from_estimator(model).predict(X_missing), model.predict(X_missing))
+
+
+def test_forest_prediction_in_chunks(data, monkeypatch):
+    X, Y, _ = data
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, Y)
+    monkeypatch.setattr(ForestModel, 'CHUNK_ROWS', 7)
+    np.testing.assert_array_equal(ForestModel.from_estimator(model).predict(X), model.predict(X))
+
+
+LINEAR = [
+    Ridge(alpha=1.0),
+    Lasso(alpha=0.1),
+    Pipeline([('scaler', StandardScaler()), ('model', Ridge(alpha=10.0))]),
+    Pipeline([('scaler', StandardScaler()), ('model', MultiOutputRegressor(ElasticNet(alpha=0.1)))]),
+    Pipeline([('scaler', StandardScaler()), ('model', SGDRegressor(random_state=0))]),
+    Pipeline([('scaler', StandardScaler(with_mean=False)), ('model', Ridge(alpha=10.0))]),
+    Pipeline([('scaler', StandardScaler(with_std=False)), ('model', Ridge(alpha=10.0))]),
+]
+
+
+@pytest.mark.parametrize('linear', LINEAR, ids=[
+    'ridge', 'lasso', 'scaled_ridge', 'scaled_multioutput_elasticnet', 'scaled_sgd',
+    'scaled_ridge_without_mean', 'scaled_ridge_without_std',
+])
+def test_linear_predictions_match_sklearn(data, linear):
+    X, Y, _ = data
+    single = isinstance(linear, Lasso) or isinstance(getattr(linear, 'steps', [[None, None]])[-1][1], SGDRegressor)
+    X = X.astype(np.float64)
+    model = linear.fit(X, Y[:, 0] if single else Y)
+
+    prediction = LinearModel.from_estimator(model).predict(X)
+    assert prediction.shape == model.predict(X).shape
+    np.testing.assert_allclose(prediction, model.predict(X), rtol=1e-9, atol=1e-9)
+
+
+def test_linear_predictions_on_float32_features(data):
+    # scikit-learn keeps float32 inputs in float32; the artifact computes in float64
+    X, Y, _ = data
+    model = Pipeline([('scaler', StandardScaler()), ('model', Ridge())]).fit(X, Y)
+    np.testing.assert_allclose(LinearModel.from_estimator(model).predict(X), model.predict(X), rtol=1e-5, atol=1e-4)
+
+
+def test_only_a_standard_scaler_is_folded(data):
+    X, Y, _ = data
+    model = Pipeline([('scaler', MinMaxScaler()), ('model', Ridge())]).fit(X, Y)
+    with pytest.raises(TypeError):
+        LinearModel.from_estimator(model)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_round_trip(data, tmp_path, compress):
+    X, Y, X_missing = data
+    forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X_missing, Y)
+    linear = Pipeline([('scaler', StandardScaler()), ('model', Ridge())]).fit(X.astype(np.float64), Y)
+
+    for model, X_test in ((forest, X_missing), (linear, X.astype(np.float64))):
+        path = save_artifact(model, str(tmp_path / 'model.artifact'), compress=compress, target='reddit_count')
+        with open(path, 'rb') as f:
+            from_bytes = load_artifact(f.read())
+        loaded = load_artifact(path)
+
+        assert loaded.metadata['target'] == 'reddit_count'
+        assert loaded.metadata['model_class'] == type(model).__name__
+        np.testing.assert_array_equal(loaded.predict(X_test), from_bytes.predict(X_test))
+        np.testing.assert_allclose(loaded.predict(X_test), model.predict(X_test), rtol=1e-9)
+
+
+def test_uncompressed_arrays_are_mapped_in_place(tmp_path):
+    arrays = {'a': np.arange(10, dtype=np.int32), 'b': np.ones((3, 5)), 'c': np.array([True, False])}
+    path = str(tmp_path / 'arrays.artifact')
+    write_artifact(path, 'linear', arrays, {'note': 'x' * 1000})
+
+    header, loaded = read_artifact(path)
+    assert header['format_version'] == FORMAT_VERSION and header['metadata']['note'] == 'x' * 1000
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert header['arrays'][name]['offset'] % ALIGNMENT == 0
+        assert not loaded[name].flags.owndata and not loaded[name].flags.writeable
+
+
+def test_version_1_forests_are_upgraded(data, tmp_path):
+    X, Y, _ = data
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, Y[:, 0])
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])[:-1]])
+
+    def children(attribute):
+        return np.concatenate([
+            np.where(getattr(tree, attribute) == -1, -1, getattr(tree, attribute) + offset)
+            for tree, offset in zip(trees, offsets)
+        ]).astype(np.int32)
+
+    # Version 1 stored scikit-learn's layout, without where missing values go
+    path = str(tmp_path / 'v1.artifact')
+    write_artifact(path, 'forest', {
+        'roots': offsets.astype(np.int32),
+        'left': children('children_left'),
+        'right': children('children_right'),
+        'feature': np.concatenate([tree.feature for tree in trees]),
+        'threshold': np.concatenate([tree.threshold for tree in trees]),
+        'value': np.concatenate([tree.value[:, :, 0] for tree in trees]),
+    }, {'n_features': 8, 'n_outputs': 1})
+
+    np.testing.assert_array_equal(load_artifact(path).predict(X), model.predict(X))
+
+
+def test_rejects_other_files_and_newer_versions():
+    with pytest.raises(ValueError, match='Not a model artifact'):
+        read_artifact(b'PK\x03\x04' + bytes(100))
+
+    header = json.dumps({'format_version': FORMAT_VERSION + 1, 'kind': 'forest', 'metadata': {}, 'arrays': {}}).encode()
+    with pytest.raises(ValueError, match='Unsupported artifact version'):
+        read_artifact(MAGIC + struct.pack('<I', len(header)) + header)
@@ -0,0 +1,110 @@
+import gzip
+import json
+import threading
+
+import gcp_clients
+import nasa_features
+import pytest
+
+
+def neo(day, id, velocity, hazardous=False):
+    return {
+        'date': day,
+        'id': id,
+        'absolute_magnitude_h': 20.0,
+        'is_potentially_hazardous_asteroid': hazardous,
+        'is_sentry_object': False,
+        'estimated_diameter': {
+            'meters': {'estimated_diameter_min': 100.0, 'estimated_diameter_max': 200.0},
+            'kilometers': {'estimated_diameter_min': 0.1, 'estimated_diameter_max': 0.2},
+        },
+        'close_approach_data': [{
+            'close_approach_date': day,
+            'relative_velocity': {'kilometers_per_hour': str(velocity)},
+            'miss_distance': {'kilometers': '1000'},
+        }],
+    }
+
+
+def ndjson(records, compress=False):
+    data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+    return gzip.compress(data) if compress else data
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    """A bucket directory laid out like the NASA fetcher's local sink"""
+    raw = tmp_path / 'nasa_api_bucket' / 'raw'
+    raw.mkdir(parents=True)
+    (raw / 'nasa_raw_data20240102.json').write_bytes(ndjson([neo('2024-01-01', 1, 10), neo('2024-01-01', 2, 30)], True))
+    (raw / 'nasa_raw_data20240103.json').write_bytes(ndjson([neo('2024-01-02', 3, 20, hazardous=True)]))
+    (raw / 'other.json').write_bytes(ndjson([neo('2024-01-02', 4, 99)]))
+    (tmp_path / 'nasa_api_bucket' / 'parquet').mkdir()
+    return tmp_path / 'nasa_api_bucket'
+
+
+def test_list_sources_reads_the_raw_directory_of_a_bucket(bucket):
+    expected = [
+        str(bucket / 'raw' / 'nasa_raw_data20240102.json'),
+        str(bucket / 'raw' / 'nasa_raw_data20240103.json'),
+    ]
+    assert nasa_features.list_sources(str(bucket)) == expected
+    assert nasa_features.list_sources(str(bucket / 'raw')) == expected
+    assert nasa_features.list_sources(expected[0]) == expected[:1]
+
+
+class FakeBlob:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeClient:
+    names = ['nasa_raw_data20231231.json', 'raw/nasa_raw_data20240103.json', 'raw/nasa_raw_data20240102.json',
+             'raw/other.json', 'parquet/dt=2024-01-01/neo.parquet']
+
+    def list_blobs(self, bucket_name, prefix=''):
+        return [FakeBlob(name) for name in self.names if name.startswith(prefix)]
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('gs://nasa_api_bucket', ['raw/nasa_raw_data20240102.json', 'raw/nasa_raw_data20240103.json']),
+    ('gs://nasa_api_bucket/raw/', ['raw/nasa_raw_data20240102.json', 'raw/nasa_raw_data20240103.json']),
+    ('gs://nasa_api_bucket/raw/nasa_raw_data202401', ['raw/nasa_raw_data20240102.json', 'raw/nasa_raw_data20240103.json']),
+])
+def test_list_sources_on_gcs(monkeypatch, source, expected):
+    monkeypatch.setattr(gcp_clients, 'get_storage_client', lambda credentials_path=None: FakeClient())
+    assert [blob.name for blob in nasa_features.list_sources(source)] == expected
+
+
+def test_iter_raw_records_bounds_the_files_read_ahead(monkeypatch):
+    started = []
+    lock = threading.Lock()
+
+    def read_source(item):
+        with lock:
+            started.append(item)
+        return ndjson([{'file': item}])
+
+    monkeypatch.setattr(nasa_features, 'list_sources', lambda source, credentials_path=None: [source])
+    monkeypatch.setattr(nasa_features, 'read_source', read_source)
+
+    records = nasa_features.iter_raw_records(range(20), max_workers=3)
+    for i, record in enumerate(records):
+        assert record == {'file': i}
+        # The file being parsed and the ones read ahead of it
+        assert len(started) <= i + 3
+    assert sorted(started) == list(range(20))
+
+
+def test_build_nasa_features_from_a_bucket(bucket):
+    # The first day's file is read twice; its objects are still counted once
+    df = nasa_features.build_nasa_features([str(bucket), str(bucket / 'raw' / 'nasa_raw_data20240102.json')])
+
+    assert list(df.columns) == nasa_features.FEATURE_COLUMNS
+    assert df['date'].astype(str).tolist() == ['2024-01-01', '2024-01-02']
+    assert df['total_asteroids'].tolist() == [2, 1]
+    assert df['total_hazardous_asteroids'].tolist() == [0, 1]
+    assert df['avg_relative_velocity'].tolist() == [20.0, 20.0]
+    assert df['max_relative_velocity'].tolist() == [30.0, 20.0]
+    assert df['avg_estimated_diameter_max'].tolist() == [200.0, 200.0]
+    assert df['max_estimated_diameter_max'].tolist() == [0.2, 0.2]
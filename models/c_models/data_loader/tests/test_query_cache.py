@@ -0,0 +1,97 @@
+import os
+from datetime import UTC, datetime
+
+import pandas as pd
+import pytest
+import query_cache
+from google.cloud import bigquery
+
+QUERY = 'SELECT date, count FROM `project.dataset.training_combined` WHERE date >= @start'
+
+
+class FakeTable:
+    def __init__(self, modified):
+        self.modified = modified
+
+
+class FakeJob:
+    total_bytes_processed = 1024
+
+    def __init__(self, df):
+        self.df = df
+
+    def to_dataframe(self):
+        return self.df
+
+
+class FakeClient:
+    def __init__(self):
+        self.modified = datetime(2024, 1, 1, tzinfo=UTC)
+        self.queries = 0
+
+    def get_table(self, table_id):
+        return FakeTable(self.modified)
+
+    def query(self, query, job_config=None):
+        self.queries += 1
+        return FakeJob(pd.DataFrame({'date': ['2024-01-01'], 'count': [self.queries]}))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(query_cache, 'CACHE_ENABLED', True)
+    return tmp_path
+
+
+def params(start):
+    return bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter('start', 'DATE', start)])
+
+
+def test_normalize_query():
+    assert query_cache.normalize_query('  SELECT *\n\tFROM `a.b.c` ;\n') == 'SELECT * FROM `a.b.c`'
+
+
+def test_referenced_tables():
+    query = 'SELECT * FROM `p.d.t2` JOIN `my-project.d.t1` USING (date) JOIN `p.d.t2` USING (date)'
+    assert query_cache.referenced_tables(query) == ['my-project.d.t1', 'p.d.t2']
+
+
+def test_cache_key():
+    client = FakeClient()
+    key = query_cache.cache_key(client, QUERY, params('2024-01-01'))
+
+    assert query_cache.cache_key(client, QUERY.replace(' ', '\n  ') + ';', params('2024-01-01')) == key
+    assert query_cache.cache_key(client, QUERY, params('2024-02-01')) != key
+    client.modified = datetime(2024, 1, 2, tzinfo=UTC)
+    assert query_cache.cache_key(client, QUERY, params('2024-01-01')) != key
+    # Unqualified tables can't be checked for changes, so they aren't cached
+    assert query_cache.cache_key(client, 'SELECT * FROM training_combined') is None
+
+
+def test_cached_query_serves_until_the_table_changes(cache_dir):
+    client = FakeClient()
+
+    first = query_cache.cached_query(client, QUERY, params('2024-01-01'))
+    assert query_cache.cached_query(client, QUERY, params('2024-01-01')).equals(first)
+    assert client.queries == 1
+
+    client.modified = datetime(2024, 1, 2, tzinfo=UTC)
+    assert query_cache.cached_query(client, QUERY, params('2024-01-01'))['count'].tolist() == [2]
+    assert query_cache.cached_query(client, QUERY, params('2024-01-01'), use_cache=False)['count'].tolist() == [3]
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_evict_removes_least_recently_used(cache_dir):
+    df = pd.DataFrame({'value': range(100)})
+    for i, key in enumerate(['a', 'b', 'c']):
+        query_cache.write_cached(key, df)
+        os.utime(query_cache.cache_path(key), (i, i))
+    size = os.path.getsize(query_cache.cache_path('a'))
+
+    # Reading 'a' makes 'b' the least recently used entry
+    assert query_cache.read_cached('a').equals(df)
+    query_cache.evict(2 * size)
+
+    assert sorted(os.listdir(cache_dir)) == ['a.parquet', 'c.parquet']
+    assert query_cache.read_cached('b') is None
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+import training_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(training_cache, 'CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(training_cache, 'CACHE_ENABLED', True)
+    return cache_dir
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / 'model.artifact'
+    path.write_bytes(b'weights')
+    return str(path)
+
+
+def test_data_fingerprint():
+    X = np.arange(12, dtype=np.float32).reshape(4, 3)
+    y = np.arange(4, dtype=np.float32)
+    fingerprint = training_cache.data_fingerprint(X, y)
+
+    assert training_cache.data_fingerprint(X.copy(), y.copy()) == fingerprint
+    # Non-contiguous views hash their values, not their memory layout
+    assert training_cache.data_fingerprint(np.asfortranarray(X), y) == fingerprint
+
+    changed = X.copy()
+    changed[2, 1] += 1
+    assert training_cache.data_fingerprint(changed, y) != fingerprint
+    assert training_cache.data_fingerprint(X.astype(np.float64), y) != fingerprint
+    assert training_cache.data_fingerprint(X.reshape(3, 4), y) != fingerprint
+
+
+def test_code_version_follows_the_source(tmp_path):
+    source = tmp_path / 'model.py'
+    source.write_text('alpha = 1\n')
+    version = training_cache.code_version(str(source))
+
+    assert training_cache.code_version(str(source)) == version
+    source.write_text('alpha = 2\n')
+    assert training_cache.code_version(str(source)) != version
+
+
+def test_training_key():
+    key = training_cache.training_key('data', {'model': 'ridge', 'alphas': [0.1, 1]}, 'code')
+
+    assert training_cache.training_key('data', {'alphas': [0.1, 1], 'model': 'ridge'}, 'code') == key
+    assert training_cache.training_key('other', {'model': 'ridge', 'alphas': [0.1, 1]}, 'code') != key
+    assert training_cache.training_key('data', {'model': 'ridge', 'alphas': [0.1]}, 'code') != key
+    assert training_cache.training_key('data', {'model': 'ridge', 'alphas': [0.1, 1]}, 'other') != key
+
+
+def test_record_and_lookup(artifact):
+    assert training_cache.lookup_artifact('key') is None
+
+    training_cache.record_artifact('key', artifact, test_mse=0.5)
+    assert training_cache.lookup_artifact('key') == os.path.abspath(artifact)
+    assert training_cache.lookup_artifact('other') is None
+
+
+def test_replaced_artifact_misses(artifact):
+    training_cache.record_artifact('key', artifact)
+    with open(artifact, 'ab') as f:
+        f.write(b' retrained')
+
+    assert training_cache.lookup_artifact('key') is None
+    assert not os.path.exists(training_cache.entry_path('key'))
+
+
+def test_deleted_artifact_misses(artifact):
+    training_cache.record_artifact('key', artifact)
+    os.remove(artifact)
+
+    assert training_cache.lookup_artifact('key') is None
+    assert not os.path.exists(training_cache.entry_path('key'))
+
+
+def test_unreadable_entry_misses(cache_dir):
+    cache_dir.mkdir()
+    (cache_dir / 'key.json').write_text('{not json')
+
+    assert training_cache.lookup_artifact('key') is None
+
+
+def test_disabled_cache(artifact, cache_dir, monkeypatch):
+    monkeypatch.setattr(training_cache, 'CACHE_ENABLED', False)
+
+    training_cache.record_artifact('key', artifact)
+    assert not cache_dir.exists()
+    assert training_cache.lookup_artifact('key') is None
@@ -0,0 +1,41 @@
+import pandas as pd
+from training_sync import iter_parquet_batches, spool_batches
+
+
+def batches(rows=25, batch_size=10):
+    df = pd.DataFrame({
+        'date': [f'2024-01-{i % 28 + 1:02d}' for i in range(rows)],
+        'value': range(rows),
+        'count': pd.array([None if i < batch_size else i for i in range(rows)], dtype='Int64'),
+    })
+    for start in range(0, rows, batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def test_spooled_stream_is_read_back_in_batches(tmp_path):
+    path = str(tmp_path / 'spool.parquet')
+    consumed = []
+
+    def source():
+        for df in batches():
+            consumed.append(len(df))
+            yield df
+
+    assert spool_batches(source(), path) == 25
+    expected = pd.concat(batches(), ignore_index=True)
+
+    # Every pass reads the local file; the source was consumed once
+    for _ in range(3):
+        read = list(iter_parquet_batches(path, batch_size=7))
+        assert [len(df) for df in read] == [7, 7, 7, 4]
+        pd.testing.assert_frame_equal(pd.concat(read, ignore_index=True), expected)
+    assert consumed == [10, 10, 5]
+
+    read = next(iter_parquet_batches(path, batch_size=7, columns=['value']))
+    assert list(read.columns) == ['value']
+
+
+def test_empty_stream_spools_nothing(tmp_path):
+    path = str(tmp_path / 'spool.parquet')
+    assert spool_batches(batches(0), path) == 0
+    assert list(iter_parquet_batches(path)) == []
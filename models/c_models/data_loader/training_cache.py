@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from importlib import metadata
+
+import numpy as np
+from feature_schema import FEATURE_COLUMNS, FEATURE_DTYPE, TARGET_COLUMNS, TARGET_DTYPE
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser(os.getenv('TRAINING_CACHE_DIR', '~/.cache/training_cache'))
+CACHE_ENABLED = os.getenv('TRAINING_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# Libraries whose version changes what training produces
+LIBRARIES = ('numpy', 'scikit-learn')
+
+HASH_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def data_fingerprint(*arrays) -> str:
+    """
+    Hash the contents, dtypes and shapes of the training arrays.
+
+    Features are built deterministically from the synced data, so this is
+    the snapshot of the data a model would be trained on.
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.dtype.str}{array.shape}'.encode())
+        data = memoryview(array.reshape(-1)).cast('B')
+        for start in range(0, len(data), HASH_CHUNK_BYTES):
+            digest.update(data[start:start + HASH_CHUNK_BYTES])
+    return digest.hexdigest()
+
+
+def code_version(*paths) -> str:
+    """Hash the source files of the training code and the versions of the libraries it uses."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    for library in LIBRARIES:
+        try:
+            digest.update(f'{library}=={metadata.version(library)}'.encode())
+        except metadata.PackageNotFoundError:
+            pass
+    return digest.hexdigest()
+
+
+def training_key(data: str, params: dict, code: str) -> str:
+    """
+    Content-address a training run.
+
+    The key covers the data snapshot, the feature schema, the
+    hyperparameters and the code version, so changing any of them trains
+    a new model.
+
+    Args:
+        data: data_fingerprint() of the training arrays
+        params: Everything else that decides the model (target, family, seed,
+            hyperparameters, split settings); must be JSON serialisable
+        code: code_version() of the training code
+
+    Returns:
+        str: Hex digest
+    """
+    schema = {
+        'features': list(FEATURE_COLUMNS),
+        'targets': list(TARGET_COLUMNS),
+        'dtypes': [np.dtype(FEATURE_DTYPE).str, np.dtype(TARGET_DTYPE).str],
+    }
+    payload = json.dumps(
+        {'data': data, 'schema': schema, 'params': params, 'code': code},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f'{key}.json')
+
+
+def lookup_artifact(key: str):
+    """
+    Path of the artifact trained for a key, or None on a miss.
+
+    An entry only hits while its artifact is still the file that was
+    recorded (same size and modification time); entries whose artifact was
+    deleted or overwritten are dropped.
+    """
+    if not CACHE_ENABLED:
+        return None
+    try:
+        with open(entry_path(key)) as f:
+            entry = json.load(f)
+        stat = os.stat(entry['path'])
+    except FileNotFoundError:
+        stat = None
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable training cache entry {key[:12]}: {e}")
+        return None
+
+    if stat is None or (stat.st_size, stat.st_mtime_ns) != (entry.get('size'), entry.get('mtime_ns')):
+        try:
+            os.remove(entry_path(key))
+        except FileNotFoundError:
+            pass
+        return None
+    return entry['path']
+
+
+def record_artifact(key: str, path: str, **info):
+    """Record the artifact trained for a key, with any extra info (e.g. its test MSE)."""
+    if not CACHE_ENABLED:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    entry = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, **info}
+    tmp_path = f'{entry_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, entry_path(key))
+    except OSError as e:
+        logger.warning(f"Could not record training cache entry: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,189 @@
+import logging
+import os
+import shutil
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from data_loader import load_data_from_bigquery
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.getenv('TRAINING_STORE_DIR', 'data/training_combined')
+LATE_ARRIVAL_DAYS = int(os.getenv('TRAINING_LATE_ARRIVAL_DAYS', '3'))
+PARTITION_FILE = 'part.parquet'
+
+
+def partition_dir(store_dir: str, day: str) -> str:
+    return os.path.join(store_dir, f'dt={day}')
+
+
+def stored_dates(store_dir: str) -> list:
+    """Dates with a partition in the local store, as sorted YYYY-MM-DD strings."""
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        name[len('dt='):]
+        for name in os.listdir(store_dir)
+        if name.startswith('dt=') and os.path.exists(os.path.join(store_dir, name, PARTITION_FILE))
+    )
+
+
+def write_partition(store_dir: str, day: str, df: pd.DataFrame):
+    """Replace one day's partition atomically."""
+    path = partition_dir(store_dir, day)
+    os.makedirs(path, exist_ok=True)
+    tmp_path = os.path.join(path, f'{PARTITION_FILE}.tmp')
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(path, PARTITION_FILE))
+
+
+def sync_training_data(table_id: str, store_dir: str = STORE_DIR, late_arrival_days: int = LATE_ARRIVAL_DAYS,
+                       date_column: str = 'date', **kwargs) -> dict:
+    """
+    Bring the local date-partitioned copy of a table up to date.
+
+    The first sync downloads the whole table. Later syncs only fetch rows
+    from the last stored date minus late_arrival_days onwards, and replace
+    those days locally, so restated days are picked up and days dropped
+    upstream within the window are removed.
+
+    Args:
+        table_id: Full table ID (project.dataset.table)
+        store_dir: Directory holding one dt=YYYY-MM-DD partition per day
+        late_arrival_days: Number of already stored days to re-fetch
+        date_column: Column the table is partitioned by
+        **kwargs: Passed to load_data_from_bigquery (project_id, credentials_path)
+
+    Returns:
+        dict: 'start_date' fetched from (None for a full sync), 'rows' fetched,
+            'written' and 'removed' partition dates
+    """
+    dates = stored_dates(store_dir)
+    start_date = None
+    if dates:
+        start_date = date.fromisoformat(dates[-1]) - timedelta(days=late_arrival_days)
+        logger.info(f"Syncing {table_id} from {start_date} ({len(dates)} days stored)")
+    else:
+        logger.info(f"No local copy of {table_id}, downloading the full table")
+
+    # Incremental fetches are always new data, so skip the query cache
+    df = load_data_from_bigquery(table_id, start_date=start_date, date_column=date_column, use_cache=False, **kwargs)
+
+    days = pd.to_datetime(df[date_column].astype(str)).dt.strftime('%Y-%m-%d')
+    written = []
+    for day, rows in df.groupby(days.values, sort=True):
+        write_partition(store_dir, day, rows)
+        written.append(day)
+
+    # Days inside the re-fetched window that no longer exist upstream; an
+    # empty result is more likely a table being rebuilt, so keep everything
+    removed = []
+    if start_date is not None and written:
+        window_start = start_date.isoformat()
+        for day in dates:
+            if day >= window_start and day not in written:
+                shutil.rmtree(partition_dir(store_dir, day))
+                removed.append(day)
+
+    logger.info(f"Synced {len(df)} rows: {len(written)} days written, {len(removed)} removed")
+    return {
+        'start_date': start_date.isoformat() if start_date else None,
+        'rows': len(df),
+        'written': written,
+        'removed': removed,
+    }
+
+
+def read_training_data(store_dir: str = STORE_DIR, columns=None) -> pd.DataFrame:
+    """
+    Read the local store into one DataFrame, ordered by date.
+
+    Args:
+        store_dir: Directory written by sync_training_data
+        columns: Columns to read (optional, all columns if not provided)
+
+    Returns:
+        pandas.DataFrame: All stored rows
+    """
+    paths = [os.path.join(partition_dir(store_dir, day), PARTITION_FILE) for day in stored_dates(store_dir)]
+    if not paths:
+        return pd.DataFrame(columns=columns)
+    # One dataset over all partition files is read with multiple threads
+    return ds.dataset(paths, format='parquet').to_table(columns=columns).to_pandas()
+
+
+def iter_training_batches(store_dir: str = STORE_DIR, batch_size: int = 10000, columns=None):
+    """
+    Stream the local store as DataFrames of at most batch_size rows, in date order.
+
+    Only one batch is materialised at a time, so the store can be larger
+    than memory.
+    """
+    paths = [os.path.join(partition_dir(store_dir, day), PARTITION_FILE) for day in stored_dates(store_dir)]
+    if not paths:
+        return
+
+    # Each partition holds a single day, so coalesce small record batches
+    pending, pending_rows = [], 0
+    for batch in ds.dataset(paths, format='parquet').to_batches(columns=columns, batch_size=batch_size):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= batch_size:
+            table = pa.Table.from_batches(pending)
+            for start in range(0, table.num_rows - batch_size + 1, batch_size):
+                yield table.slice(start, batch_size).to_pandas()
+            remainder = table.num_rows % batch_size
+            pending = table.slice(table.num_rows - remainder).to_batches() if remainder else []
+            pending_rows = remainder
+    if pending_rows:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def spool_batches(batches, path: str) -> int:
+    """
+    Write a stream of DataFrames to one local Parquet file, a row group per batch.
+
+    Lets a stream that is expensive to produce (a BigQuery scan) be read
+    several times from disk; only one batch is held in memory. Nothing is
+    written for an empty stream.
+
+    Returns:
+        int: Number of rows written
+    """
+    writer, rows = None, 0
+    try:
+        for df in batches:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            # Later batches may infer narrower types (e.g. all-null columns)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def iter_parquet_batches(path: str, batch_size: int = 10000, columns=None):
+    """Stream a file written by spool_batches as DataFrames of at most batch_size rows."""
+    if not os.path.exists(path):
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def load_synced_training_data(table_id: str, store_dir: str = STORE_DIR,
+                              late_arrival_days: int = LATE_ARRIVAL_DAYS, **kwargs) -> pd.DataFrame:
+    """Sync the local store with the table, then return its full history."""
+    sync_training_data(table_id, store_dir, late_arrival_days, **kwargs)
+    return read_training_data(store_dir)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = sync_training_data("team-tinfoil.training_data.training_combined")
+    print(result)
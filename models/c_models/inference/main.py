@@ -2,12 +2,30 @@ import json
 import logging
 import os
 import pickle
-from datetime import datetime
+import re
+import sys
+import threading
+from datetime import date, datetime, timedelta
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data_loader'))
+
+from count_features import (
+    STORE_LOCATION,
+    CountFeatureStore,
+    add_count_features,
+    refresh_count_features,
+)
+from data_loader import load_data_from_bigquery
 from dotenv import load_dotenv
+from feature_schema import (
+    DATE_COLUMN,
+    NASA_FEATURE_COLUMNS,
+    apply_schema,
+    feature_matrix,
+)
 from flask import Flask, Response, jsonify
-from google.cloud import bigquery, storage
-from google.oauth2 import service_account
+from gcp_clients import get_storage_client
+from model_artifact import ARTIFACT_SUFFIX, load_artifact
 
 # Load environment variables
 load_dotenv()
@@ -18,90 +36,218 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-def load_models_from_gcs():
-    """Load models from GCS bucket."""
+# Local copies of the artifacts, memory-mapped by every worker on this host
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', '/tmp/model_cache')
+# How often the model blobs are checked for new generations
+MODEL_REFRESH_SECONDS = int(os.getenv('MODEL_REFRESH_SECONDS', '60'))
+# File names of the default models training saves; other families and seeds are named differently
+MODEL_FILENAME = re.compile(r'model_(reddit|twitter)_count_(\d{8}_\d{6})\.(artifact|pkl)')
+
+def load_model_blob(blob):
+    """Load one model blob: an artifact (via the local cache) or a legacy pickle."""
+    if not blob.name.endswith(ARTIFACT_SUFFIX):
+        # Pickles need scikit-learn, which the service no longer installs
+        try:
+            return pickle.loads(blob.download_as_bytes())
+        except ImportError:
+            logger.error(f"Skipping {blob.name}: convert it with data_loader/model_artifact.py")
+            return None
+
+    # Each generation of a blob is downloaded once, then only mapped
+    name = os.path.basename(blob.name)
+    path = os.path.join(MODEL_CACHE_DIR, f"{blob.generation}_{name}")
+    if not os.path.exists(path):
+        os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        blob.download_to_filename(tmp_path)
+        os.replace(tmp_path, path)
+        # Drop older generations of the same blob
+        for cached in os.listdir(MODEL_CACHE_DIR):
+            if cached.endswith(f"_{name}") and cached != os.path.basename(path):
+                os.remove(os.path.join(MODEL_CACHE_DIR, cached))
+    return load_artifact(path)
+
+def list_model_blobs():
+    """List the default models' files (artifacts and older .pkl files) in the c_models folder, without downloading them."""
 
     bucket_name = os.getenv('GCS_MODEL_BUCKET')
     project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
     
-    # Setup credentials
-    credentials = None
-    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-        credentials = service_account.Credentials.from_service_account_file(
-            os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        )
-    
-    # Initialize storage client
-    storage_client = storage.Client(project=project_id, credentials=credentials)
+    # Reuse the process-wide storage client
+    storage_client = get_storage_client(project_id)
     bucket = storage_client.bucket(bucket_name)
     
-    models = {}
-    
-    # List and load all .pkl files from the c_models folder
-    blobs = bucket.list_blobs(prefix="c_models/")
+    return [
+        blob for blob in bucket.list_blobs(prefix="c_models/")
+        if MODEL_FILENAME.fullmatch(os.path.basename(blob.name))
+    ]
 
-    for blob in blobs:
-        if blob.name.endswith('.pkl'):
-            logger.info(f"Loading model: {blob.name}")
-            
-            # Download and load model
-            model_data = blob.download_as_bytes()
-            model = pickle.loads(model_data)
+def load_models_from_gcs(blobs=None, loaded=None):
+    """
+    Load models from GCS bucket.
+
+    Args:
+        blobs: Model blobs to load (default: list_model_blobs())
+        loaded: {blob name: (generation, model)} from an earlier call; blobs
+            whose generation hasn't changed reuse that model
+
+    Returns:
+        tuple: (models by name, {blob name: (generation, model)} for the next call)
+    """
+    if blobs is None:
+        blobs = list_model_blobs()
+    loaded = loaded or {}
+
+    # Oldest first, so the newest model of each target wins (an artifact over a
+    # pickle of the same run)
+    def trained_at(blob):
+        match = MODEL_FILENAME.fullmatch(os.path.basename(blob.name))
+        return match.group(2), match.group(3) == 'artifact'
+
+    models = {}
+    current = {}
+    for blob in sorted(blobs, key=trained_at):
+        generation, model = loaded.get(blob.name, (None, None))
+        if generation != blob.generation:
+            logger.info(f"Loading model: {blob.name} (generation {blob.generation})")
             
-            # Identify model type by filename
-            if 'reddit' in blob.name.lower():
-                models['reddit'] = model
-                logger.info(f"✓ Loaded Reddit model from {blob.name}")
-            elif 'twitter' in blob.name.lower():
-                models['twitter'] = model
-                logger.info(f"✓ Loaded Twitter model from {blob.name}")
+            # Download (if not cached) and load model
+            model = load_model_blob(blob)
+        current[blob.name] = (blob.generation, model)
+        if model is None:
+            continue
+        
+        # Identify model type by filename
+        if MODEL_FILENAME.fullmatch(os.path.basename(blob.name)).group(1) == 'reddit':
+            models['reddit'] = model
+            logger.info(f"✓ Loaded Reddit model from {blob.name}")
+        else:
+            models['twitter'] = model
+            logger.info(f"✓ Loaded Twitter model from {blob.name}")
     
     logger.info(f"Loaded {len(models)} models: {list(models.keys())}")
-    return models
+    return models, current
+
+def load_count_features():
+    """
+    Load the count feature store written by the training job.
+
+    Days the training job hasn't absorbed yet are queried once here and
+    only added in memory; the service never writes the store.
+    """
+    store = CountFeatureStore(STORE_LOCATION).load()
+    refresh_count_features(os.getenv('BIGQUERY_TABLE'), store, persist=False)
+    return store
+
+class ModelRegistry:
+    """
+    The models being served, loaded once and hot-swapped when their blobs change.
 
-def load_data_from_bigquery():
-    """Load data from BigQuery."""
+    A background thread lists the model blobs every MODEL_REFRESH_SECONDS
+    and only downloads blobs whose generation changed. The new set of models
+    replaces the old one in a single assignment, so a request sees either
+    the old or the new models, never a mix. The count feature store is
+    reloaded along with them, since the training job that publishes models
+    also updates it.
+    """
+
+    def __init__(self, refresh_seconds: int = MODEL_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.models = {}
+        self.count_features = None
+        self.loaded = {}
+        # Reentrant: start() holds it through the first refresh, so concurrent first requests wait for the models
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> bool:
+        """Reload the models if any blob was added, removed or overwritten. Returns True if they were swapped."""
+        with self._lock:
+            blobs = list_model_blobs()
+            versions = {blob.name: blob.generation for blob in blobs}
+            unchanged = versions == {name: generation for name, (generation, _) in self.loaded.items()}
+            if unchanged and self.count_features is not None:
+                return False
+            models, loaded = load_models_from_gcs(blobs, self.loaded)
+            count_features = load_count_features()
+            self.loaded = loaded
+            self.models, self.count_features = models, count_features
+            return True
+
+    def start(self):
+        """Load the models, then watch for new versions in the background. Safe to call more than once."""
+        # A local store would be lost with the container and never see the training job's updates
+        if not STORE_LOCATION.startswith('gs://'):
+            raise ValueError(
+                f"COUNT_FEATURE_STORE must be the gs://bucket/prefix the training job writes, got {STORE_LOCATION!r}"
+            )
+        with self._lock:
+            if self._thread is not None:
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep retrying in the background rather than failing to start
+                logger.error(f"Could not load models at startup: {e}")
+            self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                if self.refresh():
+                    logger.info(f"Swapped in new models: {list(self.models.keys())}")
+            except Exception as e:
+                logger.error(f"Model refresh failed, still serving the previous models: {e}")
+
+    def get_models(self) -> dict:
+        """The current models; starts the registry if nothing has yet (e.g. under another WSGI server)."""
+        if self._thread is None:
+            self.start()
+        return self.models
+
+    def get_count_features(self) -> CountFeatureStore:
+        """The count feature store loaded with the current models."""
+        if self._thread is None:
+            self.start()
+        if self.count_features is None:
+            raise RuntimeError("Count features are not loaded yet")
+        return self.count_features
+
+model_registry = ModelRegistry()
+
+def load_inference_data():
+    """Load the model feature columns from BigQuery."""
 
     table_id = os.getenv('BIGQUERY_TABLE')
-    project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
     limit = int(os.getenv('INFERENCE_LIMIT', '100'))
-    
-    # Setup credentials
-    credentials = None
-    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-        credentials = service_account.Credentials.from_service_account_file(
-            os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        )
-    
-    # Initialize BigQuery client
-    bigquery_client = bigquery.Client(project=project_id, credentials=credentials)
-    
-    # Query data
-    query = f"SELECT * FROM `{table_id}` LIMIT {limit}"
-    df = bigquery_client.query(query).to_dataframe()
+    lookback_days = os.getenv('INFERENCE_LOOKBACK_DAYS')
+    start_date = date.today() - timedelta(days=int(lookback_days)) if lookback_days else None
+
+    # Only scan the columns (and days) the models need
+    columns = [DATE_COLUMN, *NASA_FEATURE_COLUMNS]
+    df = load_data_from_bigquery(table_id, limit=limit, columns=columns, start_date=start_date)
+
+    # Join the lag/rolling features from the store loaded with the models
+    df = apply_schema(add_count_features(df, model_registry.get_count_features()), include_targets=False)
     
     logger.info(f"Loaded {len(df)} rows from BigQuery")
     return df
 
 def prepare_features(df):
-    """Prepare features by excluding target columns."""
-    exclude_cols = ['reddit_count', 'twitter_count', 'date']
-    feature_cols = [col for col in df.columns if col not in exclude_cols]
-    return df[feature_cols]
+    """Feature matrix in the same column order the models were trained with."""
+    return feature_matrix(df)
 
 def upload_to_gcs(data, bucket_name, filename):
     """Upload data to GCS bucket as NDJSON."""
     project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
     
-    # Setup credentials
-    credentials = None
-    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-        credentials = service_account.Credentials.from_service_account_file(
-            os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        )
-    
-    # Initialize storage client
-    storage_client = storage.Client(project=project_id, credentials=credentials)
+    # Reuse the process-wide storage client
+    storage_client = get_storage_client(project_id)
     bucket = storage_client.bucket(bucket_name)
     
     # Convert data to NDJSON string
@@ -124,11 +270,11 @@ def predict():
     try:
         logger.info("Starting inference...")
         
-        # Load models from GCS
-        models = load_models_from_gcs()
+        # Models already in memory, kept up to date by the watcher
+        models = model_registry.get_models()
         
         # Load data from BigQuery
-        df = load_data_from_bigquery()
+        df = load_inference_data()
         
         # Prepare features
         features = prepare_features(df)
@@ -173,11 +319,11 @@ def predict_and_upload():
     try:
         logger.info("Starting inference and upload...")
         
-        # Load models from GCS
-        models = load_models_from_gcs()
+        # Models already in memory, kept up to date by the watcher
+        models = model_registry.get_models()
         
         # Load data from BigQuery
-        df = load_data_from_bigquery()
+        df = load_inference_data()
         
         # Prepare features
         features = prepare_features(df)
@@ -232,4 +378,5 @@ def health():
 
 if __name__ == '__main__':
     logger.info("Starting Flask inference app...")
+    model_registry.start()
     app.run(host='0.0.0.0', port=8080)
\ No newline at end of file
@@ -0,0 +1,19 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+MAIN = os.path.join(os.path.dirname(__file__), '..', 'main.py')
+
+# main.py imports the shared modules from ../data_loader the same way
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data_loader'))
+
+
+@pytest.fixture(scope='session')
+def inference():
+    # Loaded from its path: the training code has a main.py too
+    spec = importlib.util.spec_from_file_location('inference_main', MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
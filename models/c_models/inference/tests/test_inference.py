@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from count_features import CountFeatureStore
+from feature_schema import FEATURE_COLUMNS, NASA_FEATURE_COLUMNS
+
+
+class FakeBlob:
+    def __init__(self, name, generation):
+        self.name = name
+        self.generation = generation
+
+
+@pytest.fixture
+def registry(inference, monkeypatch):
+    blobs = [FakeBlob('c_models/model_reddit_count_20240101_000000.artifact', 1)]
+    loads = []
+
+    def load_models_from_gcs(blobs, loaded=None):
+        return {'reddit': object()}, {blob.name: (blob.generation, None) for blob in blobs}
+
+    def load_count_features():
+        loads.append(CountFeatureStore(''))
+        return loads[-1]
+
+    monkeypatch.setattr(inference, 'list_model_blobs', lambda: list(blobs))
+    monkeypatch.setattr(inference, 'load_models_from_gcs', load_models_from_gcs)
+    monkeypatch.setattr(inference, 'load_count_features', load_count_features)
+    registry = inference.ModelRegistry()
+    registry.blobs, registry.loads = blobs, loads
+    return registry
+
+
+def test_count_features_are_loaded_with_the_models(registry):
+    assert registry.refresh()
+    assert not registry.refresh()
+    assert not registry.refresh()
+    assert len(registry.loads) == 1
+
+    registry.blobs[0] = FakeBlob(registry.blobs[0].name, 2)
+    assert registry.refresh()
+    assert len(registry.loads) == 2
+    assert registry.count_features is registry.loads[-1]
+
+
+def test_service_needs_a_gcs_count_feature_store(inference, registry, monkeypatch):
+    monkeypatch.setattr(inference, 'STORE_LOCATION', 'data/count_features')
+    with pytest.raises(ValueError, match='COUNT_FEATURE_STORE'):
+        registry.start()
+
+
+def test_requests_only_read_the_count_features(inference, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('count features refreshed during a request')
+
+    # The last refreshed day and the next one
+    rows = pd.DataFrame({'date': ['2024-02-29', '2024-03-01'], **{col: [1.0, 1.0] for col in NASA_FEATURE_COLUMNS}})
+    store = CountFeatureStore('')
+    store.update(pd.DataFrame({'date': ['2024-02-28', '2024-02-29'], 'reddit_count': [10, 20], 'twitter_count': [1, 2]}),
+                 persist=False)
+
+    monkeypatch.setattr(inference, 'refresh_count_features', fail)
+    monkeypatch.setattr(inference, 'load_data_from_bigquery', lambda *args, **kwargs: rows)
+    monkeypatch.setattr(inference.model_registry, '_thread', object())
+    monkeypatch.setattr(inference.model_registry, 'count_features', store)
+
+    df = inference.load_inference_data()
+    assert list(df.columns) == ['date', *FEATURE_COLUMNS]
+    assert df['reddit_count_lag_1'].tolist() == [10.0, 20.0]
+    assert inference.prepare_features(df).dtype == np.float32
+
+
+def test_only_the_newest_default_models_are_served(inference, monkeypatch):
+    names = [
+        'c_models/model_reddit_count_20240102_000000.artifact',
+        'c_models/model_reddit_count_extra_trees_seed7_20240103_000000.artifact',
+        'c_models/model_reddit_count_20240101_000000.artifact',
+        'c_models/model_twitter_count_20240101_000000.pkl',
+        'c_models/model_twitter_count_20240101_000000.artifact',
+        'c_models/model_twitter_count_random_forest_seed1_20240105_000000.artifact',
+        'c_models/predictions/predictions_20240105_000000.ndjson',
+    ]
+
+    class FakeBucket:
+        def list_blobs(self, prefix):
+            return [FakeBlob(name, 1) for name in names if name.startswith(prefix)]
+
+    class FakeClient:
+        def bucket(self, name):
+            return FakeBucket()
+
+    monkeypatch.setattr(inference, 'get_storage_client', lambda project_id=None: FakeClient())
+    monkeypatch.setattr(inference, 'load_model_blob', lambda blob: blob.name)
+
+    blobs = inference.list_model_blobs()
+    assert sorted(blob.name for blob in blobs) == sorted(names[i] for i in (0, 2, 3, 4))
+
+    models, _ = inference.load_models_from_gcs(blobs)
+    assert models == {
+        'reddit': 'c_models/model_reddit_count_20240102_000000.artifact',
+        'twitter': 'c_models/model_twitter_count_20240101_000000.artifact',
+    }
+
+
+def test_artifacts_are_cached_per_generation(inference, tmp_path, monkeypatch):
+    from model_artifact import save_artifact
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 5)).astype(np.float32)
+    forest = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0] * 2 + X[:, 1])
+    source = save_artifact(forest, str(tmp_path / 'model.artifact'))
+
+    class ArtifactBlob(FakeBlob):
+        downloads = 0
+
+        def download_to_filename(self, path):
+            ArtifactBlob.downloads += 1
+            with open(source, 'rb') as src, open(path, 'wb') as dst:
+                dst.write(src.read())
+
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(inference, 'MODEL_CACHE_DIR', str(cache_dir))
+    name = 'c_models/model_reddit_count_20240101_000000.artifact'
+
+    model = inference.load_model_blob(ArtifactBlob(name, 1))
+    inference.load_model_blob(ArtifactBlob(name, 1))
+    assert ArtifactBlob.downloads == 1
+    np.testing.assert_array_equal(model.predict(X), forest.predict(X))
+
+    inference.load_model_blob(ArtifactBlob(name, 2))
+    assert ArtifactBlob.downloads == 2
+    assert sorted(path.name for path in cache_dir.iterdir()) == ['2_model_reddit_count_20240101_000000.artifact']
@@ -0,0 +1,247 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data_loader'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'j_models', 'tuning'))
+
+import numpy as np
+import sklearn
+from count_features import add_count_features
+from feature_schema import TARGET_COLUMNS, apply_schema, feature_matrix, target_vector
+from main import save_model, split_data
+from model_artifact import load_artifact
+from scheduler import FAMILIES
+from sklearn.linear_model import ElasticNet, Lasso, Ridge
+from sklearn.metrics import mean_squared_error
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from synthetic_data import generate_training_data
+from tuning import tune_elastic_net, tune_ridge
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.getenv('BENCHMARK_RESULTS_DIR', 'benchmark_results')
+SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+# The Random Forest and Extra Trees models are trained one per target, like
+# main.py; the linear models are the j_models pipelines, fitted on both
+# targets at once
+TREE_FAMILIES = tuple(FAMILIES)
+LINEAR_FAMILIES = ('ridge', 'lasso', 'elasticnet')
+
+# The grids searched by the j_models scripts
+TUNING_GRIDS = {
+    'ridge': {'alphas': [0.01, 0.05, 0.1, 0.5, 1]},
+    'lasso': {'alphas': [0.0001, 0.001, 0.01, 0.1, 1, 10], 'l1_ratios': [1.0]},
+    'elasticnet': {'alphas': [0.001, 0.01, 0.1, 1, 10], 'l1_ratios': [0.2, 0.5, 0.8]},
+}
+
+# Batch sizes predict latency is measured at: one row, and /predict's default INFERENCE_LIMIT
+PREDICT_ROWS = (1, 100)
+PREDICT_REPEATS = 20
+LOAD_REPEATS = 3
+
+FIELDS = (
+    'family', 'rows', 'train_rows', 'fit_seconds', 'tune_seconds', 'predict_1_ms', 'predict_100_ms',
+    'load_ms', 'artifact_bytes', 'data_rss_mb', 'peak_rss_mb', 'test_mse',
+)
+
+
+def make_models(family: str) -> dict:
+    """Unfitted models of a family, keyed by the targets each one predicts."""
+    if family in TREE_FAMILIES:
+        return {(target,): FAMILIES[family](n_estimators=100, random_state=42) for target in TARGET_COLUMNS}
+    if family == 'ridge':
+        model = Ridge(alpha=0.1)
+    elif family == 'lasso':
+        model = Pipeline([('scaler', StandardScaler()), ('model', MultiOutputRegressor(Lasso(alpha=0.1, max_iter=10000)))])
+    elif family == 'elasticnet':
+        model = Pipeline([
+            ('scaler', StandardScaler()),
+            ('model', MultiOutputRegressor(ElasticNet(alpha=0.1, l1_ratio=0.5, max_iter=10000))),
+        ])
+    else:
+        raise ValueError(f"Unknown model family: {family}")
+    return {TARGET_COLUMNS: model}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def median_ms(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000
+
+
+def prepare_data(rows: int, data_dir: str, seed: int = 0) -> str:
+    """Generate, featurise and split a synthetic dataset; save the arrays as .npy files."""
+    df = apply_schema(add_count_features(generate_training_data(rows, seed=seed)))
+    X = feature_matrix(df)
+    y = np.column_stack([target_vector(df, target) for target in TARGET_COLUMNS])
+    path = os.path.join(data_dir, str(rows))
+    os.makedirs(path, exist_ok=True)
+    for name, array in zip(('X_train', 'X_test', 'y_train', 'y_test'), split_data(X, y)):
+        np.save(os.path.join(path, f'{name}.npy'), array)
+    return path
+
+
+def run_case(family: str, rows: int, path: str) -> dict:
+    """
+    Benchmark one family at one size. Runs in a fresh process so the peak RSS is its own.
+    """
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy')) for name in ('X_train', 'X_test', 'y_train', 'y_test')}
+    X_train, X_test, y_train, y_test = arrays['X_train'], arrays['X_test'], arrays['y_train'], arrays['y_test']
+    result = {'family': family, 'rows': rows, 'train_rows': len(X_train), 'data_rss_mb': peak_rss_mb()}
+
+    def columns(targets):
+        return [TARGET_COLUMNS.index(target) for target in targets]
+
+    models = make_models(family)
+    started = time.perf_counter()
+    for targets, model in models.items():
+        index = columns(targets)
+        model.fit(X_train, y_train[:, index[0]] if len(index) == 1 else y_train[:, index])
+    result['fit_seconds'] = time.perf_counter() - started
+
+    result['tune_seconds'] = None
+    if family in TUNING_GRIDS:
+        tune = tune_ridge if family == 'ridge' else tune_elastic_net
+        started = time.perf_counter()
+        tune(X_train, y_train, fit_intercepts=[True, False], cv=3, **TUNING_GRIDS[family])
+        result['tune_seconds'] = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        # Artifacts as main.py's save_model writes them, loaded as the inference service does
+        files = [save_model(model, '_'.join(targets), artifact_dir) for targets, model in models.items()]
+        result['artifact_bytes'] = sum(os.path.getsize(file) for file in files)
+        result['load_ms'] = median_ms(lambda: [load_artifact(file) for file in files], LOAD_REPEATS)
+        served = [load_artifact(file) for file in files]
+
+        def predict(X):
+            return [model.predict(X) for model in served]
+
+        predictions = np.column_stack(predict(X_test))
+        result['test_mse'] = float(mean_squared_error(y_test, predictions))
+        for n in PREDICT_ROWS:
+            X = np.ascontiguousarray(X_test[:n])
+            result[f'predict_{n}_ms'] = median_ms(lambda: predict(X), PREDICT_REPEATS)
+
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(families, sizes, results_dir: str = RESULTS_DIR, seed: int = 0) -> str:
+    """
+    Run every family at every size and write the results as JSON and CSV.
+
+    Cases run one at a time, each in a new process, so timings don't compete
+    for cores and the peak RSS belongs to that case alone.
+
+    Returns:
+        str: Path of the JSON results file
+    """
+    metadata = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sklearn': sklearn.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'seed': seed,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn'), max_tasks_per_child=1) as executor:
+            for rows in sizes:
+                path = prepare_data(rows, data_dir, seed)
+                for family in families:
+                    result = executor.submit(run_case, family, rows, path).result()
+                    logger.info(
+                        f"{family} @ {rows} rows: fit {result['fit_seconds']:.2f}s, "
+                        f"predict {result['predict_1_ms']:.2f}ms, {result['artifact_bytes'] / 1e6:.2f}MB, "
+                        f"peak RSS {result['peak_rss_mb']:.0f}MB"
+                    )
+                    results.append(result)
+
+    os.makedirs(results_dir, exist_ok=True)
+    name = f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{metadata['commit']}"
+    json_path = os.path.join(results_dir, f'{name}.json')
+    with open(json_path, 'w') as f:
+        json.dump({'metadata': metadata, 'results': results}, f, indent=2)
+    with open(os.path.join(results_dir, f'{name}.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    logger.info(f"Results written to {json_path}")
+    return json_path
+
+
+def compare(baseline_path: str, results_path: str):
+    """Log each metric of a run relative to a baseline run (current / baseline)."""
+    with open(baseline_path) as f:
+        baseline = {(r['family'], r['rows']): r for r in json.load(f)['results']}
+    with open(results_path) as f:
+        results = json.load(f)['results']
+
+    metrics = ('fit_seconds', 'tune_seconds', 'predict_1_ms', 'predict_100_ms', 'load_ms', 'artifact_bytes', 'peak_rss_mb')
+    for result in results:
+        before = baseline.get((result['family'], result['rows']))
+        if before is None:
+            continue
+        ratios = [
+            f"{metric} x{result[metric] / before[metric]:.2f}"
+            for metric in metrics if result.get(metric) and before.get(metric)
+        ]
+        logger.info(f"{result['family']} @ {result['rows']} rows: {', '.join(ratios)}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark training and inference on synthetic training_combined data")
+    parser.add_argument('--families', nargs='+', choices=TREE_FAMILIES + LINEAR_FAMILIES,
+                        default=list(TREE_FAMILIES + LINEAR_FAMILIES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES), help="Dataset sizes in rows")
+    parser.add_argument('--output', default=RESULTS_DIR, help="Directory for the JSON and CSV results")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare this run against")
+    args = parser.parse_args()
+
+    results_path = run_benchmarks(args.families, args.sizes, args.output, args.seed)
+    if args.baseline:
+        compare(args.baseline, results_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data_loader'))
+
+from count_features import CountFeatureStore, add_count_features, refresh_count_features
+from data_loader import iter_data_from_bigquery
+from feature_schema import (
+    DATE_COLUMN,
+    NASA_FEATURE_COLUMNS,
+    TARGET_COLUMNS,
+    apply_schema,
+    feature_matrix,
+)
+from main import save_model
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from training_sync import (
+    STORE_DIR,
+    iter_parquet_batches,
+    iter_training_batches,
+    spool_batches,
+    sync_training_data,
+)
+
+logger = logging.getLogger(__name__)
+
+TABLE_ID = "team-tinfoil.training_data.training_combined"
+BATCH_SIZE = int(os.getenv('TRAINING_BATCH_SIZE', '10000'))
+
+# SGD penalties matching the j_models Ridge, Lasso and ElasticNet objectives
+PENALTIES = {'ridge': 'l2', 'lasso': 'l1', 'elasticnet': 'elasticnet'}
+
+# Every HOLDOUT_EVERY-th row is kept out of training for evaluation
+HOLDOUT_EVERY = 5
+
+
+def iter_schema_batches(make_batches, store: CountFeatureStore):
+    """
+    Yield (X, targets, holdout mask) for each batch of a fresh batch stream.
+
+    Args:
+        make_batches: Callable returning an iterator of DataFrames; called
+            once per pass over the data
+        store: Up-to-date count feature store the batches are joined with
+
+    Yields:
+        tuple: (float32 feature matrix, dict of target arrays, boolean holdout mask)
+    """
+    offset = 0
+    for df in make_batches():
+        df = apply_schema(add_count_features(df, store))
+        X = feature_matrix(df)
+        y = {target: df[target].to_numpy(dtype=np.float64) for target in TARGET_COLUMNS}
+        holdout = (np.arange(offset, offset + len(df)) % HOLDOUT_EVERY) == 0
+        offset += len(df)
+        yield X, y, holdout
+
+
+def fit_scaler(make_batches, store: CountFeatureStore) -> StandardScaler:
+    """Fit feature scaling from running mean and variance over one pass of the data."""
+    scaler = StandardScaler()
+    for X, _, holdout in iter_schema_batches(make_batches, store):
+        if (~holdout).any():
+            scaler.partial_fit(X[~holdout])
+    logger.info(f"Fitted scaler on {int(scaler.n_samples_seen_)} rows")
+    return scaler
+
+
+def train_incremental(make_batches, store: CountFeatureStore, penalty: str = 'elasticnet', alpha: float = 0.0001, l1_ratio: float = 0.5,
+                      epochs: int = 5, random_state: int = 42) -> dict:
+    """
+    Train one linear model per target with partial_fit, a batch at a time.
+
+    Memory use is bounded by the batch size, not the dataset: the data is
+    streamed once to fit the scaler, once per epoch to train and once more
+    to evaluate on the held out rows, so make_batches should read a local
+    copy rather than re-run a query.
+
+    Args:
+        make_batches: Callable returning an iterator of DataFrames (see
+            iter_schema_batches)
+        store: Count feature store already holding every day in the batches
+        penalty: 'ridge', 'lasso' or 'elasticnet'
+        alpha: Regularisation strength, per sample as in SGDRegressor
+        l1_ratio: L1/L2 mix for 'elasticnet'
+        epochs: Number of passes over the training rows
+        random_state: Seed for the SGD shuffling
+
+    Returns:
+        dict: Target name to fitted Pipeline (scaler + SGDRegressor)
+    """
+    if penalty not in PENALTIES:
+        raise ValueError(f"Unknown penalty: {penalty}")
+
+    scaler = fit_scaler(make_batches, store)
+    regressors = {
+        target: SGDRegressor(
+            penalty=PENALTIES[penalty], alpha=alpha, l1_ratio=l1_ratio, random_state=random_state,
+        )
+        for target in TARGET_COLUMNS
+    }
+
+    for epoch in range(epochs):
+        for X, y, holdout in iter_schema_batches(make_batches, store):
+            train = ~holdout
+            if not train.any():
+                continue
+            X_train = scaler.transform(X[train])
+            for target, regressor in regressors.items():
+                regressor.partial_fit(X_train, y[target][train])
+        logger.info(f"Finished epoch {epoch + 1}/{epochs}")
+
+    # Streaming MSE on the held out rows
+    squared_error = dict.fromkeys(TARGET_COLUMNS, 0.0)
+    rows = 0
+    for X, y, holdout in iter_schema_batches(make_batches, store):
+        if not holdout.any():
+            continue
+        X_test = scaler.transform(X[holdout])
+        for target, regressor in regressors.items():
+            squared_error[target] += float(np.sum((regressor.predict(X_test) - y[target][holdout]) ** 2))
+        rows += int(holdout.sum())
+    for target in TARGET_COLUMNS:
+        logger.info(f"{target} holdout MSE: {squared_error[target] / max(rows, 1):.2f} ({rows} rows)")
+
+    return {
+        target: Pipeline([('scaler', scaler), ('model', regressor)])
+        for target, regressor in regressors.items()
+    }
+
+
+def main():
+    """Train the incremental models from the local store or a single BigQuery scan."""
+    parser = argparse.ArgumentParser(description="Out-of-core training with partial_fit")
+    parser.add_argument('--source', choices=['store', 'bigquery'], default='store',
+                        help="Stream from the synced local store (default) or from one BigQuery scan")
+    parser.add_argument('--penalty', choices=sorted(PENALTIES), default='elasticnet')
+    parser.add_argument('--alpha', type=float, default=0.0001)
+    parser.add_argument('--l1-ratio', type=float, default=0.5)
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    columns = [DATE_COLUMN, *NASA_FEATURE_COLUMNS, *TARGET_COLUMNS]
+
+    # Bring the count features up to date once, so batches only read them
+    store = CountFeatureStore().load()
+    refresh_count_features(TABLE_ID, store)
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        if args.source == 'store':
+            sync_training_data(TABLE_ID)
+
+            def make_batches():
+                return iter_training_batches(STORE_DIR, args.batch_size, columns)
+        else:
+            # Scan the table once into a local file; every pass reads that copy
+            spool_path = os.path.join(spool_dir, 'training_combined.parquet')
+            rows = spool_batches(iter_data_from_bigquery(TABLE_ID, args.batch_size, columns=columns), spool_path)
+            logger.info(f"Streamed {rows} rows from {TABLE_ID} to a local copy")
+
+            def make_batches():
+                return iter_parquet_batches(spool_path, args.batch_size, columns)
+
+        models = train_incremental(make_batches, store, args.penalty, args.alpha, args.l1_ratio, args.epochs)
+    for target, model in models.items():
+        model_filename = save_model(model, f'{target}_{args.penalty}')
+        logger.info(f"{target} model trained and saved to '{model_filename}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import logging
 import os
 import pickle
@@ -6,19 +7,52 @@ from datetime import datetime
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data_loader'))
 
-from data_loader import load_data_from_bigquery
+import numpy as np
+from count_features import CountFeatureStore, add_count_features
+from feature_schema import (
+    FEATURE_COLUMNS,
+    TARGET_COLUMNS,
+    apply_schema,
+    feature_matrix,
+    target_vector,
+)
+from model_artifact import ARTIFACT_SUFFIX, export_model, save_artifact
+from scheduler import FAMILIES, job_name, make_job, train_jobs
+from search import RESOURCES, search_hyperparameters
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
+from training_cache import (
+    code_version,
+    data_fingerprint,
+    lookup_artifact,
+    record_artifact,
+    training_key,
+)
+from training_sync import load_synced_training_data
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Models other than the default random forest (extra families, seeds); inference
+# only loads the default models from trained_models/
+EXPERIMENT_MODEL_DIR = 'trained_models/experiments'
 
-def load_training_data(table_name: str, limit: int = 1000):
-    """Load training data from BigQuery."""
+# Source files whose changes retrain every model instead of reusing cached artifacts
+TRAINING_CODE = [
+    os.path.join(os.path.dirname(__file__), name) for name in ('main.py', 'scheduler.py', 'search.py')
+] + [
+    os.path.join(os.path.dirname(__file__), '..', 'data_loader', name)
+    for name in ('feature_schema.py', 'count_features.py', 'model_artifact.py')
+]
 
-    df = load_data_from_bigquery(table_name, limit=limit)
+
+def load_training_data(table_name: str):
+    """Load the full training history, syncing only new days from BigQuery."""
+
+    df = load_synced_training_data(table_name)
+    # Only the new days are added to the count feature store
+    df = apply_schema(add_count_features(df, CountFeatureStore().load()))
     logger.info(f"Loaded {len(df)} rows")
     return df
 
@@ -26,11 +60,9 @@ def load_training_data(table_name: str, limit: int = 1000):
 def prepare_features_and_target(df, target_col):
     """Prepare features and target variable for training."""
 
-    exclude_cols = ['reddit_count', 'twitter_count', 'date']
-    feature_cols = [col for col in df.columns if col not in exclude_cols]
-    X = df[feature_cols]
-    y = df[target_col]
-    return X, y, feature_cols
+    X = feature_matrix(df)
+    y = target_vector(df, target_col)
+    return X, y, list(FEATURE_COLUMNS)
 
 
 def split_data(X, y, test_size=0.2, random_state=42):
@@ -39,27 +71,41 @@ def split_data(X, y, test_size=0.2, random_state=42):
     return train_test_split(X, y, test_size=test_size, random_state=random_state)
 
 
-def train_model(X_train, y_train, target_name, n_estimators=100, random_state=42):
-    """Train a RandomForestRegressor model."""
+def train_model(X_train, y_train, target_name, n_estimators=100, random_state=42, **params):
+    """Train a RandomForestRegressor model, e.g. with parameters from search_hyperparameters()."""
 
     logger.info(f"Training model for {target_name}...")
-    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, **params)
     model.fit(X_train, y_train)
     return model
 
 
-def save_model(model, target_name, model_dir='trained_models'):
-    """Save the trained model to a pickle file."""
+def save_model(model, target_name, model_dir='trained_models', compress=False):
+    """
+    Save the trained model as a compact artifact (see model_artifact.py).
+
+    Forests and linear models are stored as flat NumPy arrays the inference
+    service memory-maps; any other model is pickled.
+    """
     # Create directory if it doesn't exist
     os.makedirs(model_dir, exist_ok=True)
     
     # Generate filename with timestamp
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    model_filename = f'{model_dir}/model_{target_name}_{timestamp}.pkl'
-    
-    # Save model
-    with open(model_filename, 'wb') as f:
-        pickle.dump(model, f)
+
+    try:
+        exported = export_model(model)
+    except TypeError:
+        exported = None
+
+    if exported is not None:
+        model_filename = f'{model_dir}/model_{target_name}_{timestamp}{ARTIFACT_SUFFIX}'
+        save_artifact(exported, model_filename, compress=compress, name=target_name, feature_columns=list(FEATURE_COLUMNS))
+    else:
+        logger.warning(f"{type(model).__name__} has no artifact format, saving it as a pickle")
+        model_filename = f'{model_dir}/model_{target_name}_{timestamp}.pkl'
+        with open(model_filename, 'wb') as f:
+            pickle.dump(model, f)
     
     logger.info(f"Model saved to '{model_filename}'")
     return model_filename
@@ -84,22 +130,74 @@ def train_single_model(df, target_col):
 
 def main():
     """Main function to orchestrate the training process."""
+    parser = argparse.ArgumentParser(description="Train the count models")
+    parser.add_argument('--families', nargs='+', choices=sorted(FAMILIES), default=['random_forest'],
+                        help="Model families to train for every target")
+    parser.add_argument('--seeds', nargs='+', type=int, default=[42], help="Random seeds to train for every family")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per model, up to the CPU count)")
+    parser.add_argument('--tune', choices=['halving', 'hyperband'],
+                        help="Tune depth, max_features and leaf size per target and family before training")
+    parser.add_argument('--tune-resource', choices=RESOURCES, default='trees',
+                        help="Budget the search grows per rung: trees in the forest or training rows")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Retrain even if a model was already trained on the same data, code and parameters")
+    args = parser.parse_args()
+
     # Load data
-    df = load_training_data("team-tinfoil.training_data.training_combined", limit=1000)
-    
-    # Train reddit_count model
-    reddit_model, reddit_filename = train_single_model(df, 'reddit_count')
-    logger.info(f"Reddit model trained and saved to '{reddit_filename}'")
-    
-    # Train twitter_count model
-    twitter_model, twitter_filename = train_single_model(df, 'twitter_count')
-    logger.info(f"Twitter model trained and saved to '{twitter_filename}'")
-    
-    logger.info("Both models trained successfully!")
-    logger.debug(f"Reddit model: {reddit_model}")
-    logger.debug(f"Twitter model: {twitter_model}")
+    df = load_training_data("team-tinfoil.training_data.training_combined")
+
+    # One split shared by every model
+    X = feature_matrix(df)
+    y = np.column_stack([target_vector(df, target) for target in TARGET_COLUMNS])
+    X_train, X_test, y_train, y_test = split_data(X, y)
+
+    # Content-addressed training cache: a model trained on the same data, schema,
+    # parameters and code is reused instead of trained and saved again
+    data, code = data_fingerprint(X, y), code_version(*TRAINING_CODE)
+    keys = {
+        (target, family, seed): training_key(data, {
+            'target': target, 'family': family, 'seed': seed,
+            'tune': args.tune, 'tune_resource': args.tune_resource if args.tune else None,
+        }, code)
+        for target in TARGET_COLUMNS for family in args.families for seed in args.seeds
+    }
+    pending = []
+    for (target, family, seed), key in keys.items():
+        cached = None if args.no_cache else lookup_artifact(key)
+        if cached:
+            logger.info(f"{target}_{family}_seed{seed} unchanged, reusing '{cached}'")
+        else:
+            pending.append((target, family, seed))
+
+    # Tuned parameters per family and target; only the training rows are searched
+    params = {family: {target: {} for target in TARGET_COLUMNS} for family in args.families}
+    if args.tune:
+        for family in args.families:
+            targets = [target for target in TARGET_COLUMNS if any(p[:2] == (target, family) for p in pending)]
+            if not targets:
+                continue
+            best = search_hyperparameters(
+                X_train, y_train[:, [TARGET_COLUMNS.index(target) for target in targets]], targets,
+                args.tune, family, args.tune_resource, max_workers=args.workers, seed=args.seeds[0],
+            )
+            params[family].update({target: result['params'] for target, result in best.items()})
+
+    # Train all targets (and any extra families/seeds) concurrently
+    jobs = [make_job(target, family, seed, **params[family][target]) for target, family, seed in pending]
+    results = train_jobs(X_train, X_test, y_train, y_test, TARGET_COLUMNS, jobs, args.workers) if jobs else []
+
+    for job, model, mse in results:
+        # The default model keeps the model_<target>_<timestamp> name inference expects;
+        # other families and seeds go to a subdirectory so they are never deployed by accident
+        if job['family'] == 'random_forest' and job['seed'] == 42:
+            model_filename = save_model(model, job['target'])
+        else:
+            model_filename = save_model(model, job_name(job), model_dir=EXPERIMENT_MODEL_DIR)
+        record_artifact(keys[job['target'], job['family'], job['seed']], model_filename, test_mse=float(mse))
+        logger.info(f"{job_name(job)} trained (test MSE {mse:.2f}) and saved to '{model_filename}'")
+
+    logger.info(f"Trained {len(results)} models, reused {len(keys) - len(results)} from the training cache")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+
+logger = logging.getLogger(__name__)
+
+FAMILIES = {
+    'random_forest': RandomForestRegressor,
+    'extra_trees': ExtraTreesRegressor,
+}
+
+
+def make_job(target: str, family: str = 'random_forest', seed: int = 42, **params) -> dict:
+    """One model to fit: a target, a model family, a seed and extra estimator parameters."""
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown model family: {family}")
+    return {'target': target, 'family': family, 'seed': seed, 'params': params}
+
+
+def job_name(job: dict) -> str:
+    return f"{job['target']}_{job['family']}_seed{job['seed']}"
+
+
+class SharedArrays:
+    """
+    NumPy arrays placed in shared memory for the lifetime of a with block.
+
+    Workers attach to them by name (see attach_arrays) and get views, so the
+    feature matrix exists once in memory however many processes read it.
+    """
+
+    def __init__(self, **arrays):
+        self.arrays = arrays
+        self.blocks = []
+        self.specs = {}
+
+    def __enter__(self):
+        for key, array in self.arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+        return self.specs
+
+    def __exit__(self, *exc):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+def attach_arrays(specs: dict):
+    """Map shared memory blocks back to read-only arrays. Returns (blocks, arrays)."""
+    blocks, arrays = [], {}
+    for key, (name, shape, dtype) in specs.items():
+        # The parent owns the blocks, so don't let this process' tracker unlink them
+        block = shared_memory.SharedMemory(name=name, track=False)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        blocks.append(block)
+        arrays[key] = array
+    return blocks, arrays
+
+
+def fit_job(job: dict, specs: dict, target_index: int, n_jobs: int):
+    """Fit one job in a worker process against the shared arrays."""
+    blocks, arrays = attach_arrays(specs)
+    try:
+        started = time.perf_counter()
+        model = FAMILIES[job['family']](random_state=job['seed'], n_jobs=n_jobs, **job['params'])
+        model.fit(arrays['X_train'], arrays['y_train'][:, target_index])
+        mse = mean_squared_error(arrays['y_test'][:, target_index], model.predict(arrays['X_test']))
+        # Threads were sized for this pool; predict with the estimator's default
+        model.set_params(n_jobs=None)
+        return model, mse, time.perf_counter() - started
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def train_jobs(X_train, X_test, y_train, y_test, targets, jobs, max_workers: int = None) -> list:
+    """
+    Fit several models concurrently on a process pool.
+
+    The train/test matrices are copied once into shared memory; each worker
+    maps them instead of receiving a pickled copy. Cores are split between
+    the workers, and each model's trees are built with the remaining cores.
+
+    Args:
+        X_train, X_test: float32 feature matrices
+        y_train, y_test: Target matrices with one column per entry in targets
+        targets: Target column names, in the column order of y_train/y_test
+        jobs: Jobs from make_job()
+        max_workers: Number of worker processes (default: one per job, up to the CPU count)
+
+    Returns:
+        list: (job, fitted model, test MSE) in the order of jobs
+    """
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(max_workers or cpus, len(jobs), cpus))
+    n_jobs = max(1, cpus // workers)
+    logger.info(f"Training {len(jobs)} models on {workers} processes x {n_jobs} threads")
+
+    results = [None] * len(jobs)
+    started = time.perf_counter()
+    with SharedArrays(X_train=X_train, X_test=X_test, y_train=y_train, y_test=y_test) as specs:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            futures = {
+                executor.submit(fit_job, job, specs, list(targets).index(job['target']), n_jobs): i
+                for i, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                model, mse, elapsed = future.result()
+                logger.info(f"{job_name(jobs[i])}: test MSE {mse:.2f} ({elapsed:.1f}s)")
+                results[i] = (jobs[i], model, mse)
+    logger.info(f"Trained {len(jobs)} models in {time.perf_counter() - started:.1f}s")
+    return results
@@ -0,0 +1,194 @@
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+from scheduler import FAMILIES, SharedArrays, attach_arrays
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import ParameterGrid, train_test_split
+
+logger = logging.getLogger(__name__)
+
+# Hyperparameters searched for the forests; every combination is a candidate
+PARAM_GRID = {
+    'max_depth': [None, 8, 16, 32],
+    'max_features': [1.0, 0.5, 0.3, 'sqrt'],
+    'min_samples_leaf': [1, 2, 5, 10],
+}
+
+# What a candidate's budget counts: trees in the forest, or training rows
+# (fitted with n_estimators trees). Trees are grown on top of the previous
+# rung's forest with warm_start; rows refit on a larger sample.
+RESOURCES = ('trees', 'rows')
+MIN_TREES = 4
+# The rows budget starts at the fit split divided by eta per extra rung, up to
+# MAX_ROW_RUNGS rungs, but never below MIN_ROWS rows
+MAX_ROW_RUNGS = 4
+MIN_ROWS = 30
+
+ETA = 3
+N_ESTIMATORS = 100
+VALIDATION_SIZE = 0.2
+
+
+def fit_candidate(family: str, params: dict, specs: dict, target_index: int, resource: str, budget: int,
+                  seed: int, n_jobs: int, model=None):
+    """
+    Fit one candidate at one budget in a worker process and score it on the validation rows.
+
+    Returns:
+        tuple: (model to continue from in the next rung or None, validation MSE, seconds)
+    """
+    blocks, arrays = attach_arrays(specs)
+    try:
+        started = time.perf_counter()
+        X, y = arrays['X_fit'], arrays['y_fit'][:, target_index]
+        if resource == 'trees':
+            if model is None:
+                model = FAMILIES[family](random_state=seed, warm_start=True, **params)
+            # Only the trees beyond the previous rung's are built
+            model.set_params(n_estimators=budget, n_jobs=n_jobs)
+            model.fit(X, y)
+        else:
+            # The same seeded permutation in every worker, so larger budgets extend smaller ones
+            rows = np.sort(np.random.default_rng(seed).permutation(len(X))[:budget])
+            model = FAMILIES[family](n_estimators=N_ESTIMATORS, random_state=seed, n_jobs=n_jobs, **params)
+            model.fit(X[rows], y[rows])
+        mse = mean_squared_error(arrays['y_val'][:, target_index], model.predict(arrays['X_val']))
+        model.set_params(n_jobs=None)
+        return (model if resource == 'trees' else None), mse, time.perf_counter() - started
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def rung_budgets(min_budget: int, max_budget: int, eta: int = ETA) -> list:
+    """Budgets of the rungs from min_budget up to max_budget, each eta times the last."""
+    rungs = int(math.log(max_budget / min_budget, eta) + 1e-9) + 1 if max_budget > min_budget else 1
+    return [max(1, round(max_budget / eta ** (rungs - 1 - i))) for i in range(rungs)]
+
+
+def min_row_budget(n_rows: int, eta: int = ETA) -> int:
+    """Smallest rows budget for a fit split of n_rows: the most rungs that keep at least MIN_ROWS rows."""
+    for rungs in range(MAX_ROW_RUNGS, 1, -1):
+        budget = n_rows // eta ** (rungs - 1)
+        if budget >= MIN_ROWS:
+            return budget
+    raise ValueError(
+        f"{n_rows} fit rows are too few to tune on rows (at least {eta * MIN_ROWS} needed); tune trees instead"
+    )
+
+
+def successive_halving(executor, workers: int, specs: dict, target_index: int, candidates: list, family: str,
+                       resource: str, min_budget: int, max_budget: int, eta: int = ETA, seed: int = 42) -> list:
+    """
+    Run successive halving over candidates.
+
+    Every rung fits the remaining candidates concurrently at the rung's budget
+    and keeps the best 1/eta of them by validation MSE; the rest are stopped.
+    Only the last rung runs at max_budget.
+
+    Returns:
+        list: (params, validation MSE) of the candidates that reached the last rung, best first
+    """
+    alive = [(params, None) for params in candidates]
+    budgets = rung_budgets(min_budget, max_budget, eta)
+    for rung, budget in enumerate(budgets):
+        # Cores left over when fewer candidates than workers remain go to the forests' own threads
+        n_jobs = max(1, (os.cpu_count() or 1) // min(workers, len(alive)))
+        started = time.perf_counter()
+        futures = [
+            executor.submit(fit_candidate, family, params, specs, target_index, resource, budget, seed, n_jobs, model)
+            for params, model in alive
+        ]
+        results = [future.result() for future in futures]
+        order = sorted(range(len(alive)), key=lambda i: results[i][1])
+        logger.info(
+            f"Rung {rung + 1}/{len(budgets)}: {len(alive)} candidates at {budget} {resource}, "
+            f"best validation MSE {results[order[0]][1]:.2f} ({time.perf_counter() - started:.1f}s)"
+        )
+        if rung == len(budgets) - 1:
+            return [(alive[i][0], results[i][1]) for i in order]
+        alive = [(alive[i][0], results[i][0]) for i in order[:max(1, math.ceil(len(alive) / eta))]]
+
+
+def hyperband_brackets(min_budget: int, max_budget: int, eta: int = ETA) -> list:
+    """(number of candidates, starting budget) of each Hyperband bracket, most aggressive first."""
+    s_max = len(rung_budgets(min_budget, max_budget, eta)) - 1
+    return [
+        (math.ceil((s_max + 1) / (s + 1) * eta ** s), max(1, round(max_budget / eta ** s)))
+        for s in range(s_max, -1, -1)
+    ]
+
+
+def search_hyperparameters(X_train, y_train, targets, method: str = 'halving', family: str = 'random_forest',
+                           resource: str = 'trees', eta: int = ETA, max_workers: int = None, seed: int = 42) -> dict:
+    """
+    Tune a forest family's PARAM_GRID per target with successive halving or Hyperband.
+
+    A validation split is held out of the training rows. 'halving' starts
+    every grid combination at the smallest budget; 'hyperband' runs several
+    halving brackets on random samples of the grid, from many candidates at
+    a small budget to a few at the full budget, which hedges against small
+    budgets ranking candidates badly. Candidates of a rung are fitted in
+    parallel on a process pool sharing the arrays like train_jobs.
+
+    Args:
+        X_train: float32 feature matrix
+        y_train: Target matrix with one column per entry in targets
+        targets: Target column names, in the column order of y_train
+        method: 'halving' or 'hyperband'
+        family: Forest family from scheduler.FAMILIES
+        resource: Budget of a candidate, 'trees' (up to N_ESTIMATORS) or 'rows' (up to the fit
+            split, from a fraction of it set by min_row_budget())
+        eta: Factor the budget grows and the candidates shrink by per rung
+        max_workers: Number of worker processes (default: the CPU count)
+        seed: Seed of the validation split, the forests and the Hyperband samples
+
+    Returns:
+        dict: Target name to {'params': best parameters for the family's estimator
+        (n_estimators included when tuning trees), 'score': its validation MSE}
+    """
+    if method not in ('halving', 'hyperband'):
+        raise ValueError(f"Unknown search method: {method}")
+    if resource not in RESOURCES:
+        raise ValueError(f"Unknown search resource: {resource}")
+
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=seed)
+    max_budget = N_ESTIMATORS if resource == 'trees' else len(X_fit)
+    min_budget = min(MIN_TREES, max_budget) if resource == 'trees' else min_row_budget(max_budget, eta)
+    grid = list(ParameterGrid(PARAM_GRID))
+    rng = np.random.default_rng(seed)
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(max_workers or cpus, cpus))
+    best = {}
+    started = time.perf_counter()
+    with SharedArrays(X_fit=X_fit, X_val=X_val, y_fit=y_fit, y_val=y_val) as specs:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            for target_index, target in enumerate(targets):
+                if method == 'halving':
+                    brackets = [(grid, min_budget)]
+                else:
+                    brackets = [
+                        ([grid[i] for i in rng.choice(len(grid), min(n, len(grid)), replace=False)], budget)
+                        for n, budget in hyperband_brackets(min_budget, max_budget, eta)
+                    ]
+                finalists = []
+                for bracket, (candidates, budget) in enumerate(brackets):
+                    logger.info(f"{target}: {method} bracket {bracket + 1}/{len(brackets)}, {len(candidates)} {family} candidates")
+                    finalists += successive_halving(
+                        executor, workers, specs, target_index, candidates, family,
+                        resource, budget, max_budget, eta, seed,
+                    )[:1]
+                params, score = min(finalists, key=lambda finalist: finalist[1])
+                if resource == 'trees':
+                    params = {**params, 'n_estimators': max_budget}
+                best[target] = {'params': params, 'score': score}
+                logger.info(f"{target}: best {family} parameters {params} (validation MSE {score:.2f})")
+    logger.info(f"Searched hyperparameters in {time.perf_counter() - started:.1f}s")
+    return best
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The training scripts run from this directory and import ../data_loader, so import them the same way
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data_loader'))
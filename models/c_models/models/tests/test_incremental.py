@@ -0,0 +1,28 @@
+import sys
+
+import incremental
+from count_features import CountFeatureStore
+from synthetic_data import generate_training_data
+
+
+def test_bigquery_source_is_scanned_once(tmp_path, monkeypatch):
+    df = generate_training_data(200)
+    scans, saved = [], {}
+
+    def iter_data_from_bigquery(table_id, batch_size, columns=None):
+        scans.append(table_id)
+        for start in range(0, len(df), batch_size):
+            yield df[columns].iloc[start:start + batch_size]
+
+    store = CountFeatureStore(str(tmp_path / 'count_features'))
+    monkeypatch.setattr(incremental, 'CountFeatureStore', lambda: store)
+    monkeypatch.setattr(incremental, 'refresh_count_features', lambda table_id, store: store.update(df))
+    monkeypatch.setattr(incremental, 'iter_data_from_bigquery', iter_data_from_bigquery)
+    monkeypatch.setattr(incremental, 'save_model', lambda model, name: saved.setdefault(name, model))
+    monkeypatch.setattr(sys, 'argv', ['incremental.py', '--source', 'bigquery', '--epochs', '3', '--batch-size', '64'])
+
+    incremental.main()
+
+    # Scaler, three epochs and evaluation all read the local copy
+    assert scans == [incremental.TABLE_ID]
+    assert sorted(saved) == ['reddit_count_elasticnet', 'twitter_count_elasticnet']
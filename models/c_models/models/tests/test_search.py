@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import search
+
+
+@pytest.mark.parametrize('min_budget, max_budget, expected', [
+    # Rungs start at the largest eta-fraction of max_budget that isn't below min_budget
+    (4, 100, [11, 33, 100]),
+    (4, 108, [4, 12, 36, 108]),
+    (33, 300, [33, 100, 300]),
+    (100, 100, [100]),
+    (200, 100, [100]),
+])
+def test_rung_budgets(min_budget, max_budget, expected):
+    assert search.rung_budgets(min_budget, max_budget) == expected
+
+
+def test_hyperband_brackets():
+    assert search.hyperband_brackets(4, 100) == [(9, 11), (5, 33), (3, 100)]
+
+
+@pytest.mark.parametrize('n_rows, expected', [
+    # A few hundred days: as many rungs as keep 30 rows
+    (240, 80),
+    (300, 33),
+    (100_000, 3703),
+    (90, 30),
+])
+def test_min_row_budget(n_rows, expected):
+    assert search.min_row_budget(n_rows) == expected
+    assert len(search.rung_budgets(expected, n_rows)) <= search.MAX_ROW_RUNGS
+
+
+def test_min_row_budget_refuses_small_data():
+    with pytest.raises(ValueError, match='tune trees instead'):
+        search.min_row_budget(89)
+
+
+@pytest.mark.parametrize('resource', search.RESOURCES)
+def test_search_on_a_few_hundred_days(monkeypatch, resource):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(365, 5)).astype(np.float32)
+    y = np.column_stack([X[:, 0] * 10 + rng.normal(size=365), X[:, 1] ** 2])
+    monkeypatch.setattr(search, 'PARAM_GRID', {'max_depth': [None, 2], 'min_samples_leaf': [1, 20]})
+
+    best = search.search_hyperparameters(X, y, ['a', 'b'], resource=resource, max_workers=2)
+
+    assert set(best) == {'a', 'b'}
+    for result in best.values():
+        assert {'max_depth', 'min_samples_leaf'} <= set(result['params'])
+        assert result['score'] >= 0
+    assert ('n_estimators' in best['a']['params']) == (resource == 'trees')
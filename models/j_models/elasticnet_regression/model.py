@@ -1,47 +1,94 @@
-import joblib
+import os
+import sys
+
 import pandas as pd
 from sklearn.linear_model import ElasticNet
 from sklearn.metrics import mean_squared_error
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import train_test_split
 from sklearn.multioutput import MultiOutputRegressor
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "c_models", "data_loader"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tuning"))
+
+from count_features import add_count_features
+from feature_schema import FEATURE_COLUMNS, TARGET_COLUMNS, apply_schema, feature_matrix
+from model_artifact import save_artifact
+from training_cache import (
+    code_version,
+    data_fingerprint,
+    lookup_artifact,
+    record_artifact,
+    training_key,
+)
+from tuning import tune_elastic_net
+
+DATA_LOADER = os.path.join(os.path.dirname(__file__), "..", "..", "c_models", "data_loader")
+# Source files whose changes retrain the model even if the data is unchanged
+TRAINING_CODE = [
+    __file__,
+    os.path.join(os.path.dirname(__file__), "..", "tuning", "tuning.py"),
+    os.path.join(DATA_LOADER, "feature_schema.py"),
+    os.path.join(DATA_LOADER, "count_features.py"),
+    os.path.join(DATA_LOADER, "model_artifact.py"),
+]
+
 # --- Load dataset ---
-df = pd.read_csv("data/local_copy.csv")
+df = apply_schema(add_count_features(pd.read_csv("data/local_copy.csv")))
 
 # Features and targets
-X = df.drop(columns=["date", "reddit_count", "twitter_count"])
-y = df[["reddit_count", "twitter_count"]]
+X = feature_matrix(df)
+y = df[list(TARGET_COLUMNS)]
 
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=4333
 )
 
-# --- Define pipeline ---
-enet = MultiOutputRegressor(ElasticNet(max_iter=10000))
-pipe = Pipeline([("scaler", StandardScaler()), ("model", enet)])
-
-# --- Parameter grid ---
-# Parameters for the base estimator inside MultiOutputRegressor
-param_grid = {
-    "model__estimator__alpha": [0.001, 0.01, 0.1, 1, 10],
+search = {
+    "alphas": [0.001, 0.01, 0.1, 1, 10],
     # 0=ridge-like, 1=lasso-like
-    "model__estimator__l1_ratio": [0.2, 0.5, 0.8],
-    "model__estimator__fit_intercept": [True, False],
+    "l1_ratios": [0.2, 0.5, 0.8],
+    "fit_intercepts": [True, False],
+    "cv": 3,
 }
 
-# --- Grid search ---
-grid = GridSearchCV(pipe, param_grid, cv=3, scoring="neg_mean_squared_error")
-grid.fit(X_train, y_train)
+# --- Skip training if nothing changed ---
+# Same data, feature schema, search grid and code as an earlier run: keep its artifact
+key = training_key(
+    data_fingerprint(X, y.to_numpy()),
+    {"model": "elasticnet", "test_size": 0.2, "random_state": 4333, **search},
+    code_version(*TRAINING_CODE),
+)
+cached = lookup_artifact(key)
+if cached:
+    print("Data, parameters and code unchanged, keeping", cached)
+    sys.exit()
+
+# --- Tune along the regularisation path ---
+# One warm-started alpha path per l1_ratio and fold, scaling on the training
+# fold like the StandardScaler step below
+result = tune_elastic_net(X_train, y_train, **search)
 
-print("Best parameters:", grid.best_params_)
-print("Best CV score (neg MSE):", grid.best_score_)
+print("Best parameters:", result["params"])
+print("Best CV score (neg MSE):", result["score"])
+
+# --- Refit the best model ---
+enet = MultiOutputRegressor(ElasticNet(max_iter=10000, **result["params"]))
+pipe = Pipeline([("scaler", StandardScaler()), ("model", enet)])
+pipe.fit(X_train, y_train)
 
 # --- Evaluate on test set ---
-best_model = grid.best_estimator_
+best_model = pipe
 y_pred = best_model.predict(X_test)
 mse = mean_squared_error(y_test, y_pred)
 print("Test set MSE:", mse)
 
-joblib.dump(best_model, "model.joblib")
+# Flat coefficient arrays the inference service can memory-map
+save_artifact(
+    best_model,
+    "model.artifact",
+    targets=list(TARGET_COLUMNS),
+    feature_columns=list(FEATURE_COLUMNS),
+)
+record_artifact(key, "model.artifact", test_mse=float(mse))
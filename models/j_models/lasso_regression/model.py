@@ -1,45 +1,87 @@
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import pandas as pd
 from sklearn.linear_model import Lasso
 from sklearn.metrics import mean_squared_error
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import train_test_split
 from sklearn.multioutput import MultiOutputRegressor
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "c_models", "data_loader"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tuning"))
+
+from count_features import add_count_features
+from feature_schema import FEATURE_COLUMNS, TARGET_COLUMNS, apply_schema, feature_matrix
+from model_artifact import save_artifact
+from training_cache import (
+    code_version,
+    data_fingerprint,
+    lookup_artifact,
+    record_artifact,
+    training_key,
+)
+from tuning import tune_elastic_net
+
+DATA_LOADER = os.path.join(os.path.dirname(__file__), "..", "..", "c_models", "data_loader")
+# Source files whose changes retrain the model even if the data is unchanged
+TRAINING_CODE = [
+    __file__,
+    os.path.join(os.path.dirname(__file__), "..", "tuning", "tuning.py"),
+    os.path.join(DATA_LOADER, "feature_schema.py"),
+    os.path.join(DATA_LOADER, "count_features.py"),
+    os.path.join(DATA_LOADER, "model_artifact.py"),
+]
+
 # --- Load dataset ---
-df = pd.read_csv("data/local_copy.csv")
+df = apply_schema(add_count_features(pd.read_csv("data/local_copy.csv")))
 
 # Features and targets
-X = df.drop(columns=["date", "reddit_count", "twitter_count"])
-y = df[["reddit_count", "twitter_count"]]
+X = feature_matrix(df)
+y = df[list(TARGET_COLUMNS)]
 
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=42
 )
 
-# --- Define pipeline ---
-# StandardScaler → MultiOutputRegressor(Lasso)
-lasso = MultiOutputRegressor(Lasso(max_iter=10000))
-pipe = Pipeline([("scaler", StandardScaler()), ("model", lasso)])
-
-# --- Parameter grid ---
-# Note: parameters must be prefixed with "model__estimator__"
-# because MultiOutputRegressor wraps Lasso
-param_grid = {
-    "model__estimator__alpha": [0.0001, 0.001, 0.01, 0.1, 1, 10],
-    "model__estimator__fit_intercept": [True, False],
+search = {
+    "alphas": [0.0001, 0.001, 0.01, 0.1, 1, 10],
+    "l1_ratios": [1.0],
+    "fit_intercepts": [True, False],
+    "cv": 3,
 }
 
-# --- Grid search ---
-grid = GridSearchCV(pipe, param_grid, cv=3, scoring="neg_mean_squared_error")
-grid.fit(X_train, y_train)
+# --- Skip training if nothing changed ---
+# Same data, feature schema, search grid and code as an earlier run: keep its artifact
+key = training_key(
+    data_fingerprint(X, y.to_numpy()),
+    {"model": "lasso", "test_size": 0.2, "random_state": 42, **search},
+    code_version(*TRAINING_CODE),
+)
+cached = lookup_artifact(key)
+if cached:
+    print("Data, parameters and code unchanged, keeping", cached)
+    sys.exit()
+
+# --- Tune alpha along the Lasso path ---
+# Each fold fits every alpha in one warm-started path (l1_ratio=1 is the Lasso),
+# scaling on the training fold like the StandardScaler step below
+result = tune_elastic_net(X_train, y_train, **search)
+del result["params"]["l1_ratio"]
 
-print("Best parameters:", grid.best_params_)
-print("Best CV score (neg MSE):", grid.best_score_)
+print("Best parameters:", result["params"])
+print("Best CV score (neg MSE):", result["score"])
+
+# --- Refit the best model ---
+# StandardScaler → MultiOutputRegressor(Lasso)
+lasso = MultiOutputRegressor(Lasso(max_iter=10000, **result["params"]))
+pipe = Pipeline([("scaler", StandardScaler()), ("model", lasso)])
+pipe.fit(X_train, y_train)
 
 # --- Evaluate on test set ---
-best_model = grid.best_estimator_
+best_model = pipe
 y_pred = best_model.predict(X_test)
 mse = mean_squared_error(y_test, y_pred)
 print("Test set MSE:", mse)
@@ -52,6 +94,15 @@ for i, target in enumerate(y.columns):
     print("  Coefficients:", estimators[i].coef_)
     print("  Intercept:", estimators[i].intercept_)
 
+# Flat coefficient arrays the inference service can memory-map
+save_artifact(
+    best_model,
+    "model.artifact",
+    targets=list(TARGET_COLUMNS),
+    feature_columns=list(FEATURE_COLUMNS),
+)
+record_artifact(key, "model.artifact", test_mse=float(mse))
+
 # --- Visualization: true vs predicted scatter ---
 fig, axes = plt.subplots(1, y.shape[1], figsize=(10, 4))
 
@@ -1,10 +1,17 @@
+import os
+import sys
+
 import pandas as pd
 from google.cloud import bigquery
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'c_models', 'data_loader'))
+
+from query_cache import cached_query
+
 
-def fetch_data(project_id: str, query: str) -> pd.DataFrame:
+def fetch_data(project_id: str, query: str, use_cache: bool = True) -> pd.DataFrame:
     client = bigquery.Client(project=project_id)
-    df = client.query(query).to_dataframe()
+    df = cached_query(client, query, use_cache=use_cache)
     return df
 
 
@@ -1,31 +1,71 @@
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import pandas as pd
 from sklearn.linear_model import Ridge
 from sklearn.metrics import mean_squared_error
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "c_models", "data_loader"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tuning"))
+
+from count_features import add_count_features
+from feature_schema import FEATURE_COLUMNS, TARGET_COLUMNS, apply_schema, feature_matrix
+from model_artifact import save_artifact
+from training_cache import (
+    code_version,
+    data_fingerprint,
+    lookup_artifact,
+    record_artifact,
+    training_key,
+)
+from tuning import tune_ridge
 
-df = pd.read_csv("data/local_copy.csv")
+DATA_LOADER = os.path.join(os.path.dirname(__file__), "..", "..", "c_models", "data_loader")
+# Source files whose changes retrain the model even if the data is unchanged
+TRAINING_CODE = [
+    __file__,
+    os.path.join(os.path.dirname(__file__), "..", "tuning", "tuning.py"),
+    os.path.join(DATA_LOADER, "feature_schema.py"),
+    os.path.join(DATA_LOADER, "count_features.py"),
+    os.path.join(DATA_LOADER, "model_artifact.py"),
+]
 
-X = df.drop(columns=["date", "reddit_count", "twitter_count"])
-y = df[["reddit_count", "twitter_count"]]
+df = apply_schema(add_count_features(pd.read_csv("data/local_copy.csv")))
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
+X = feature_matrix(df)
+y = df[list(TARGET_COLUMNS)]
 
-param_grid = {
-    "alpha": [0.01, 0.05, 0.1, 0.5, 1],
-    "fit_intercept": [True, False],
-    "solver": ["auto", "svd", "lsqr", "saga"],
+# Seeded so an unchanged run trains the same model and can be skipped
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+search = {
+    "alphas": [0.01, 0.05, 0.1, 0.5, 1],
+    "fit_intercepts": [True, False],
+    "cv": 3,
 }
 
-model = Ridge()
+# --- Skip training if nothing changed ---
+# Same data, feature schema, search grid and code as an earlier run: keep its artifact
+key = training_key(
+    data_fingerprint(X, y.to_numpy()),
+    {"model": "ridge", "test_size": 0.2, "random_state": 42, **search},
+    code_version(*TRAINING_CODE),
+)
+cached = lookup_artifact(key)
+if cached:
+    print("Data, parameters and code unchanged, keeping", cached)
+    sys.exit()
 
-grid = GridSearchCV(model, param_grid, cv=3, scoring="neg_mean_squared_error")
-grid.fit(X_train, y_train)
+# Every solver reaches the same solution, so only alpha and the intercept are tuned.
+# All alphas are solved from one SVD per fold, for both targets at once.
+result = tune_ridge(X_train, y_train, **search)
 
-print("Best parameters:", grid.best_params_)
-print("Best CV score (negative MSE):", grid.best_score_)
+print("Best parameters:", result["params"])
+print("Best CV score (negative MSE):", result["score"])
 
-best_model = grid.best_estimator_
+best_model = Ridge(**result["params"]).fit(X_train, y_train)
 # Predictions
 y_pred = best_model.predict(X_test)
 
@@ -35,6 +75,15 @@ print("Mean Squared Error:", mse)
 print("Coefficients:", best_model.coef_)
 print("Intercept:", best_model.intercept_)
 
+# Flat coefficient arrays the inference service can memory-map
+save_artifact(
+    best_model,
+    "model.artifact",
+    targets=list(TARGET_COLUMNS),
+    feature_columns=list(FEATURE_COLUMNS),
+)
+record_artifact(key, "model.artifact", test_mse=float(mse))
+
 fig, axes = plt.subplots(1, y.shape[1], figsize=(10, 4))
 
 for i, col in enumerate(y.columns):
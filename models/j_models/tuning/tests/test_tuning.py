@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import ElasticNet, Ridge
+from sklearn.model_selection import GridSearchCV
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from tuning import tune_elastic_net, tune_ridge
+
+ALPHAS = [0.01, 0.1, 1.0, 10.0, 100.0]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(150, 6)) * [1, 10, 100, 1, 1, 0.1] + 5
+    coef = rng.normal(size=(6, 2))
+    Y = X @ coef + 3 + rng.normal(scale=5, size=(150, 2))
+    return X, Y
+
+
+def grid_scores(search, names):
+    results = search.cv_results_
+    return {
+        tuple((name, results[f"param_{prefix}{name}"][i]) for prefix, name in names): score
+        for i, score in enumerate(results["mean_test_score"])
+    }
+
+
+def test_tune_ridge_matches_grid_search(data):
+    X, Y = data
+    search = GridSearchCV(
+        Ridge(),
+        {"alpha": ALPHAS, "fit_intercept": [True, False]},
+        scoring="neg_mean_squared_error",
+        cv=3,
+    ).fit(X, Y)
+
+    result = tune_ridge(X, Y, ALPHAS)
+
+    expected = grid_scores(search, [("", "alpha"), ("", "fit_intercept")])
+    assert result["scores"].keys() == expected.keys()
+    for params, score in expected.items():
+        assert result["scores"][params] == pytest.approx(score, rel=1e-8)
+    assert result["params"] == search.best_params_
+    assert result["score"] == pytest.approx(search.best_score_, rel=1e-8)
+
+
+def test_tune_elastic_net_matches_grid_search(data):
+    X, Y = data
+    l1_ratios = [0.2, 1.0]
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("model", MultiOutputRegressor(ElasticNet(max_iter=100000, tol=1e-10))),
+    ])
+    search = GridSearchCV(
+        pipeline,
+        {
+            "model__estimator__alpha": ALPHAS,
+            "model__estimator__l1_ratio": l1_ratios,
+            "model__estimator__fit_intercept": [True, False],
+        },
+        scoring="neg_mean_squared_error",
+        cv=3,
+    ).fit(X, Y)
+
+    result = tune_elastic_net(X, Y, ALPHAS, l1_ratios, max_iter=100000, tol=1e-10)
+
+    prefix = "model__estimator__"
+    expected = grid_scores(search, [(prefix, "alpha"), (prefix, "fit_intercept"), (prefix, "l1_ratio")])
+    assert result["scores"].keys() == expected.keys()
+    for params, score in expected.items():
+        assert result["scores"][params] == pytest.approx(score, rel=1e-6)
+    assert result["params"] == {
+        name.removeprefix(prefix): value for name, value in search.best_params_.items()
+    }
+
+
+def test_single_target_vector(data):
+    X, Y = data
+    assert tune_ridge(X, Y[:, 0], ALPHAS)["scores"] == tune_ridge(X, Y[:, :1], ALPHAS)["scores"]
@@ -0,0 +1,147 @@
+import numpy as np
+from sklearn.linear_model import enet_path
+from sklearn.model_selection import KFold
+
+
+def _as_2d(Y):
+    Y = np.asarray(Y, dtype=np.float64)
+    return Y.reshape(-1, 1) if Y.ndim == 1 else Y
+
+
+def _folds(X, cv):
+    # Same splits GridSearchCV uses for a regressor with an integer cv
+    return KFold(n_splits=cv).split(X)
+
+
+def _best(scores):
+    params = max(scores, key=scores.get)
+    return {"params": dict(params), "score": scores[params], "scores": scores}
+
+
+def tune_ridge(X, Y, alphas, fit_intercepts=(True, False), cv=3):
+    """
+    Cross-validate Ridge over every alpha from one SVD per fold.
+
+    With X = U S V^T, the Ridge solution for any alpha is
+    V diag(s / (s^2 + alpha)) U^T Y, so each fold is decomposed once and all
+    alphas and all targets are solved together. Matches GridSearchCV over
+    Ridge(alpha, fit_intercept) with neg_mean_squared_error scoring; the
+    solver choice doesn't change the solution, so it isn't searched.
+
+    Returns:
+        dict: "params" (best Ridge parameters), "score" (mean negative MSE)
+            and "scores" for every combination
+    """
+    X = np.asarray(X, dtype=np.float64)
+    Y = _as_2d(Y)
+    alphas = np.asarray(alphas, dtype=np.float64)
+    totals = {
+        (fit_intercept, alpha): 0.0
+        for fit_intercept in fit_intercepts
+        for alpha in alphas
+    }
+
+    for train, test in _folds(X, cv):
+        for fit_intercept in fit_intercepts:
+            X_train, Y_train = X[train], Y[train]
+            x_mean = X_train.mean(axis=0) if fit_intercept else np.zeros(X.shape[1])
+            y_mean = Y_train.mean(axis=0) if fit_intercept else np.zeros(Y.shape[1])
+
+            U, s, Vt = np.linalg.svd(X_train - x_mean, full_matrices=False)
+            UtY = U.T @ (Y_train - y_mean)
+            X_test = X[test] - x_mean
+            for alpha in alphas:
+                coef = Vt.T @ ((s / (s**2 + alpha))[:, None] * UtY)
+                error = X_test @ coef + y_mean - Y[test]
+                totals[(fit_intercept, alpha)] -= float(np.mean(error**2)) / cv
+
+    scores = {
+        (("alpha", float(alpha)), ("fit_intercept", fit_intercept)): score
+        for (fit_intercept, alpha), score in totals.items()
+    }
+    return _best(scores)
+
+
+def tune_elastic_net(
+    X,
+    Y,
+    alphas,
+    l1_ratios=(1.0,),
+    fit_intercepts=(True, False),
+    cv=3,
+    scale=True,
+    max_iter=10000,
+    tol=1e-4,
+):
+    """
+    Cross-validate Lasso/ElasticNet along the regularisation path.
+
+    For each fold and l1_ratio, every alpha is fitted in one coordinate
+    descent path from the largest alpha down, warm-starting each fit from
+    the previous solution. The Gram matrix is computed once per fold and
+    shared by all targets and l1_ratios. Targets are fitted independently,
+    as MultiOutputRegressor does. l1_ratio=1 is the Lasso.
+
+    Matches GridSearchCV over Pipeline(StandardScaler,
+    MultiOutputRegressor(ElasticNet)) with neg_mean_squared_error scoring:
+    scaling is fitted on each training fold.
+
+    Returns:
+        dict: "params" (best ElasticNet parameters), "score" (mean negative
+            MSE) and "scores" for every combination
+    """
+    X = np.asarray(X, dtype=np.float64)
+    Y = _as_2d(Y)
+    path_alphas = np.sort(np.asarray(alphas, dtype=np.float64))[::-1]
+    totals = {
+        (fit_intercept, l1_ratio, alpha): 0.0
+        for fit_intercept in fit_intercepts
+        for l1_ratio in l1_ratios
+        for alpha in path_alphas
+    }
+
+    for train, test in _folds(X, cv):
+        X_train, X_test = X[train], X[test]
+        if scale:
+            mean, std = X_train.mean(axis=0), X_train.std(axis=0)
+            std[std == 0] = 1.0
+            X_train, X_test = (X_train - mean) / std, (X_test - mean) / std
+
+        for fit_intercept in fit_intercepts:
+            x_mean = X_train.mean(axis=0) if fit_intercept else np.zeros(X.shape[1])
+            y_mean = Y[train].mean(axis=0) if fit_intercept else np.zeros(Y.shape[1])
+            X_fold = np.asfortranarray(X_train - x_mean)
+            Y_fold = Y[train] - y_mean
+            # Shared by every target, l1_ratio and alpha of this fold
+            gram = X_fold.T @ X_fold
+            Xy = X_fold.T @ Y_fold
+
+            for l1_ratio in l1_ratios:
+                predictions = np.empty((len(path_alphas), len(test), Y.shape[1]))
+                for j in range(Y.shape[1]):
+                    _, coefs, _ = enet_path(
+                        X_fold,
+                        np.ascontiguousarray(Y_fold[:, j]),
+                        l1_ratio=l1_ratio,
+                        alphas=path_alphas,
+                        precompute=gram,
+                        Xy=np.ascontiguousarray(Xy[:, j]),
+                        max_iter=max_iter,
+                        tol=tol,
+                        check_input=False,
+                    )
+                    # coefs is (n_features, n_alphas)
+                    predictions[:, :, j] = ((X_test - x_mean) @ coefs).T + y_mean[j]
+                errors = np.mean((predictions - Y[test]) ** 2, axis=(1, 2))
+                for alpha, error in zip(path_alphas, errors):
+                    totals[(fit_intercept, l1_ratio, alpha)] -= float(error) / cv
+
+    scores = {
+        (
+            ("alpha", float(alpha)),
+            ("fit_intercept", fit_intercept),
+            ("l1_ratio", float(l1_ratio)),
+        ): score
+        for (fit_intercept, l1_ratio, alpha), score in totals.items()
+    }
+    return _best(scores)